@@ -0,0 +1,77 @@
+class InventoryAggregates:
+    """
+    Running totals for dashboards, updated from InventoryManager's change hook
+    so every figure can be read without walking the inventory.
+
+    Low stock is judged on an item's total across all sections against its
+    reorder point (or default_reorder_point when it has none).
+    """
+    def __init__(self, reorder_points=None, default_reorder_point=None):
+        self.total_units = 0
+        self.section_units = {}
+        self.section_skus = {}     # rows with stock > 0 per section
+        self.item_units = {}
+        self.reorder_points = dict(reorder_points or {})
+        self.default_reorder_point = default_reorder_point
+        self.low_stock = set()
+
+    def rebuild(self, rows):
+        """Recompute everything from (section, item, quantity) rows."""
+        self.total_units = 0
+        self.section_units = {}
+        self.section_skus = {}
+        self.item_units = {}
+        self.low_stock = set()
+        for section, item, quantity in rows:
+            self.total_units += quantity
+            self.section_units[section] = self.section_units.get(section, 0) + quantity
+            self.section_skus[section] = self.section_skus.get(section, 0) + (quantity > 0)
+            self.item_units[item] = self.item_units.get(item, 0) + quantity
+        for item, units in self.item_units.items():
+            self._check_reorder_point(item, units)
+
+    def update(self, section, item, old_quantity, new_quantity):
+        """Apply one row change (old_quantity is None for a new row)."""
+        old_quantity = old_quantity or 0
+        delta = new_quantity - old_quantity
+        self.total_units += delta
+        self.section_units[section] = self.section_units.get(section, 0) + delta
+        self.section_skus[section] = (
+            self.section_skus.get(section, 0) + (new_quantity > 0) - (old_quantity > 0)
+        )
+        units = self.item_units[item] = self.item_units.get(item, 0) + delta
+        self._check_reorder_point(item, units)
+
+    def set_reorder_point(self, item, threshold):
+        if threshold is None:
+            self.reorder_points.pop(item, None)
+        else:
+            self.reorder_points[item] = threshold
+        self._check_reorder_point(item, self.item_units.get(item, 0))
+
+    def set_default_reorder_point(self, threshold):
+        self.default_reorder_point = threshold
+        for item, units in self.item_units.items():
+            self._check_reorder_point(item, units)
+
+    def _check_reorder_point(self, item, units):
+        threshold = self.reorder_points.get(item, self.default_reorder_point)
+        if threshold is not None and units <= threshold:
+            self.low_stock.add(item)
+        else:
+            self.low_stock.discard(item)
+
+    def differences(self, other):
+        """Describe where two aggregates disagree (zero totals count as missing)."""
+        problems = []
+        if self.total_units != other.total_units:
+            problems.append(f"total_units: {self.total_units} != {other.total_units}")
+        for name in ("section_units", "section_skus", "item_units"):
+            mine = {key: value for key, value in getattr(self, name).items() if value}
+            theirs = {key: value for key, value in getattr(other, name).items() if value}
+            for key in mine.keys() | theirs.keys():
+                if mine.get(key, 0) != theirs.get(key, 0):
+                    problems.append(f"{name}[{key!r}]: {mine.get(key, 0)} != {theirs.get(key, 0)}")
+        if self.low_stock != other.low_stock:
+            problems.append(f"low_stock: {sorted(self.low_stock ^ other.low_stock)} differ")
+        return problems
@@ -0,0 +1,95 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# How often the Tk thread picks up finished jobs and notifications (milliseconds)
+POLL_MS = 20
+# Longest the Tk thread spends running queued callbacks per poll, so typing and
+# scrolling stay responsive while a big job floods it with notifications.
+UI_BUDGET_SECONDS = 0.01
+
+
+class BackgroundWorker:
+    """
+    Runs inventory operations off the Tk thread.
+
+    submit() hands a call to a small thread pool and returns its Future;
+    on_done / on_error are then called back on the Tk thread. Results,
+    progress reports and anything passed to call_in_ui() go through a queue
+    that an after() loop drains, because Tk widgets may only be touched from
+    the thread that created them.
+
+    on_progress(description, done, total) is called on the Tk thread as jobs
+    start, report progress and finish; description is None once all jobs are
+    done, and total is None when the job can't tell how much work remains.
+    """
+    def __init__(self, root, max_workers=1, on_progress=None):
+        self.root = root
+        self.on_progress = on_progress
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inventory-worker")
+        self._ui_calls = queue.SimpleQueue()
+        self._running = []   # descriptions of unfinished jobs, oldest first (Tk thread only)
+        self._closed = False
+        self._poll_job = root.after(POLL_MS, self._drain)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, description="Working", with_progress=False, **kwargs):
+        """
+        Run fn(*args, **kwargs) on a worker thread.
+
+        With with_progress=True, fn also gets progress=callable(done, total=None)
+        to report how far it has got.
+        """
+        if with_progress:
+            kwargs["progress"] = lambda done, total=None: self.call_in_ui(self._report, description, done, total)
+        self._running.append(description)
+        self._report(description, 0, None)
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self.call_in_ui(self._finished, description, f, on_done, on_error))
+        return future
+
+    def call_in_ui(self, fn, *args):
+        """Queue fn(*args) to run on the Tk thread; safe to call from any thread."""
+        if not self._closed:
+            self._ui_calls.put((fn, args))
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def shutdown(self):
+        """Wait for running jobs to finish and stop polling."""
+        self._executor.shutdown(wait=True)
+        self._closed = True
+        self.root.after_cancel(self._poll_job)
+
+    def _drain(self):
+        deadline = time.perf_counter() + UI_BUDGET_SECONDS
+        while time.perf_counter() < deadline:
+            try:
+                fn, args = self._ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+        self._poll_job = self.root.after(POLL_MS, self._drain)
+
+    def _finished(self, description, future, on_done, on_error):
+        self._running.remove(description)
+        if self._running:
+            self._report(self._running[-1], 0, None)
+        else:
+            self._report(None, 0, None)
+        error = future.exception()
+        if error is None:
+            if on_done is not None:
+                on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    def _report(self, description, done, total):
+        if self.on_progress is not None:
+            self.on_progress(description, done, total)
@@ -1,13 +1,27 @@
 class InventoryItem:
+    # quantity is a slot on RegularItem and a cached lot total on PerishableItem
+    __slots__ = ("name",)
+    expiry_date = None  # PerishableItem reports its earliest lot's date here
+    lot_count = 1
+
     def __init__(self, name, quantity):
         self.name = name
         self.quantity = quantity
 
-    def add_stock(self, amount):
+    @property
+    def lots(self):
+        """[(expiry_date, quantity)] for every lot; regular stock is one lot without a date."""
+        return [(self.expiry_date, self.quantity)]
+
+    def add_stock(self, amount, expiry_date=None):
         raise NotImplementedError("Subclasses must implement add_stock method.")
 
     def remove_stock(self, amount):
         raise NotImplementedError("Subclasses must implement remove_stock method.")
 
+    def take_stock(self, amount):
+        """Remove amount and return what was taken as [(expiry_date, quantity)] lots."""
+        raise NotImplementedError("Subclasses must implement take_stock method.")
+
     def __str__(self):
         return f"{self.name}: {self.quantity}"
\ No newline at end of file
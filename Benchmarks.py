@@ -0,0 +1,704 @@
+"""
+Benchmarks for the inventory data structures.
+
+Run from the repository root, e.g.:
+
+    python Benchmarks.py suite --sizes 10 1000 100000 --output results.json
+    python Benchmarks.py suite --baseline results.json --threshold 0.25
+    python Benchmarks.py memory --items 1000000
+    python Benchmarks.py concurrency --threads 1 2 4 8
+    python Benchmarks.py shards --shards 1 2 4 --clients 8
+    python Benchmarks.py server --clients 50 --requests 200
+    python Benchmarks.py recovery --items 1000000 --tail 50000
+    python Benchmarks.py search --items 500000
+    python Benchmarks.py reads --items 1000000
+    python Benchmarks.py startup --items 100000 --budget 2.0
+    python Benchmarks.py forecast --items 200000 --days 56
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from BackgroundWorker import BackgroundWorker
+from InventoryManagement import InventoryManager
+from InventoryServer import InventoryServer
+from MovementHistory import CONSUMED_SUFFIX, SECONDS_PER_DAY, MovementHistory, segment_day
+from OperationLog import OperationLogStorage
+from OverviewModel import InventoryTableModel
+from ShardedInventory import ShardedInventoryManager
+from Sections import ColumnarSection, InventorySection
+from Storage import SQLiteStorage
+
+
+def synthetic_rows(count, perishable_ratio=0.3, seed=1):
+    """Return [(name, quantity, expiry_date or None)] for a synthetic catalog."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        expiry = None
+        if rng.random() < perishable_ratio:
+            expiry = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        rows.append((f"SKU-{i:07d}", rng.randint(1, 5000), expiry))
+    return rows
+
+
+def synthetic_warehouse(item_count, perishable_ratio=0.3, seed=1):
+    """
+    Return [(section, item, quantity, expiry_date or None)] for a synthetic warehouse.
+
+    Section sizes are skewed (section k gets weight 1/k), so a few sections
+    hold most of the stock, as in a real site.
+    """
+    section_count = max(1, item_count // 200)
+    rng = random.Random(seed)
+    sections = [f"Section {number:04d}" for number in range(section_count)]
+    weights = [1 / (rank + 1) for rank in range(section_count)]
+    placement = rng.choices(sections, weights, k=item_count)
+    return [
+        (section, name, quantity, expiry)
+        for section, (name, quantity, expiry) in zip(placement, synthetic_rows(item_count, perishable_ratio, seed))
+    ]
+
+
+def traced_bytes(build, rows):
+    """Bytes still allocated after build(rows) returns (the rows themselves are excluded)."""
+    tracemalloc.start()
+    result = build(rows)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def build_manager_dicts(rows):
+    # The dict-per-row layout InventoryManager used before it held item objects
+    items = {}
+    for name, quantity, expiry in rows:
+        items[name] = {"quantity": quantity, "expiry_date": expiry}
+    return items
+
+
+def build_item_objects(rows):
+    section = InventorySection("Bench")
+    for name, quantity, expiry in rows:
+        section.add_stock(name, quantity, expiry)
+    return section
+
+
+def build_columnar(rows):
+    section = ColumnarSection("Bench")
+    for name, quantity, expiry in rows:
+        section.add_stock(name, quantity, expiry)
+    return section
+
+
+def measure_memory(count):
+    """Compare bytes per item for each representation (item names not counted)."""
+    rows = synthetic_rows(count)
+    results = {"items": count}
+    for label, build in (
+        ("manager_dicts", build_manager_dicts),
+        ("item_objects", build_item_objects),
+        ("columnar", build_columnar),
+    ):
+        results[f"{label}_bytes_per_item"] = round(traced_bytes(build, rows) / count, 1)
+    results["columnar_reduction"] = round(
+        results["manager_dicts_bytes_per_item"] / results["columnar_bytes_per_item"], 2
+    )
+    return results
+
+
+def measure_concurrency(thread_counts, increments_per_thread=20000, sections=64):
+    """
+    Increments/sec on a concurrent InventoryManager for each thread count.
+
+    Threads pick random sections, so they mostly hold different locks.
+    """
+    results = {"increments_per_thread": increments_per_thread, "sections": sections}
+    for thread_count in thread_counts:
+        manager = InventoryManager(concurrent=True)
+        for number in range(sections):
+            manager.add_section(f"Section {number}")
+            manager.add_item(f"Section {number}", "SKU", 1)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(increments_per_thread):
+                manager.increment(f"Section {rng.randrange(sections)}", "SKU", 1)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(thread_count)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        results[f"{thread_count}_threads_ops_per_sec"] = round(thread_count * increments_per_thread / elapsed)
+    return results
+
+
+def measure_sharding(shard_counts, clients=8, increments_per_client=5000, sections=64):
+    """
+    Increments/sec through a ShardedInventoryManager for each shard count,
+    with client threads updating random sections.
+    """
+    results = {"clients": clients, "increments_per_client": increments_per_client, "cpus": os.cpu_count()}
+    for shard_count in shard_counts:
+        with ShardedInventoryManager(shards=shard_count) as manager:
+            for number in range(sections):
+                manager.add_section(f"Section {number}")
+                manager.add_item(f"Section {number}", "SKU", 1)
+
+            def client(seed):
+                rng = random.Random(seed)
+                for _ in range(increments_per_client):
+                    manager.increment(f"Section {rng.randrange(sections)}", "SKU", 1)
+
+            threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        results[f"{shard_count}_shards_ops_per_sec"] = round(clients * increments_per_client / elapsed)
+    return results
+
+
+def measure_server(clients=50, requests_per_client=200):
+    """
+    Requests/sec for keep-alive clients posting scans to a local InventoryServer.
+
+    Clients run in the same process and event loop as the server, so the
+    figure is for one core doing both sides.
+    """
+    async def client(port, number):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for step in range(requests_per_client):
+            body = json.dumps({"section": f"Dock {number % 10}", "item": f"SKU{step}", "quantity": 1}).encode()
+            writer.write(
+                b"POST /items HTTP/1.1\r\nHost: localhost\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+        writer.close()
+
+    async def run():
+        server = InventoryServer(InventoryManager(), port=0)
+        await server.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(client(server.port, number) for number in range(clients)))
+        elapsed = time.perf_counter() - start
+        await server.close()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    total = clients * requests_per_client
+    return {"clients": clients, "requests": total, "requests_per_sec": round(total / elapsed)}
+
+
+def measure_recovery(items=1_000_000, tail=50000):
+    """Seconds to reopen an operation log holding a snapshot of items rows plus tail changes."""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = InventoryManager(OperationLogStorage(directory, snapshot_every=items + tail + 1, fsync=False))
+        with manager.batch():
+            for number in range(100):
+                manager.add_section(f"Section {number}")
+            for name, quantity, expiry in synthetic_rows(items):
+                manager.add_item(f"Section {hash(name) % 100}", name, quantity, expiry)
+        manager.storage.snapshot()
+        with manager.batch():
+            for section, item_names in list((s, list(i.items)) for s, i in manager.sections.items()):
+                for item in item_names[:tail // 100]:
+                    manager.modify_item_quantity(section, item, 1)
+        manager.close()
+
+        start = time.perf_counter()
+        recovered = InventoryManager(OperationLogStorage(directory))
+        elapsed = time.perf_counter() - start
+        recovered.close()
+    return {"items": items, "tail_records": tail, "recovery_seconds": round(elapsed, 3)}
+
+
+def measure_search(items=500_000, page=50):
+    """Index build time and the slowest page lookup while typing a few queries letter by letter."""
+    manager = build_manager(synthetic_warehouse(items))
+    start = time.perf_counter()
+    manager.search_items()
+    build_seconds = time.perf_counter() - start
+
+    worst = 0
+    for query, section in [("sku-00123", None), ("0042", None), ("77", "Section 0000")]:
+        for length in range(1, len(query) + 1):
+            start = time.perf_counter()
+            manager.search_items(query[:length], section=section, limit=page)
+            worst = max(worst, time.perf_counter() - start)
+    return {"items": items, "index_build_seconds": round(build_seconds, 2), "worst_keystroke_ms": round(worst * 1000, 2)}
+
+
+# startup_probe() exits with this when Tk can't open a display.
+NO_DISPLAY_EXIT = 3
+
+
+def startup_probe(launched):
+    """
+    Run by measure_startup() in a fresh interpreter: start the app the way
+    main.py does and print the wall-clock seconds since launch at each stage.
+    Exits with NO_DISPLAY_EXIT when there is no display to build the window on.
+    """
+    import tkinter
+
+    import main
+
+    stages = {"imported": time.time() - launched}
+    try:
+        app = main.WarehouseApp()
+    except tkinter.TclError as e:
+        print(f"no display: {e}", file=sys.stderr)
+        sys.exit(NO_DISPLAY_EXIT)
+    app.update()
+    stages["first_frame"] = time.time() - launched
+    app.start()
+    while not app.inventory_overview_frame.model.loaded:
+        app.update()
+        time.sleep(0.005)
+    stages["rows_loaded"] = time.time() - launched
+    app.on_close()
+    print(json.dumps(stages))
+
+
+@contextmanager
+def virtual_display():
+    """
+    Yield a DISPLAY for the startup probes: the current one, a private Xvfb
+    server started for the duration on a headless Linux box, or None.
+    """
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        yield os.environ.get("DISPLAY")
+        return
+    if shutil.which("Xvfb") is None:
+        yield None
+        return
+    read_end, write_end = os.pipe()
+    server = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_end), "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+        pass_fds=(write_end,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_end)
+    try:
+        with os.fdopen(read_end) as f:
+            number = f.readline().strip()   # written once the server accepts connections
+        yield f":{number}" if number else None
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure_startup(items=100_000, runs=3, budget=None):
+    """
+    Cold-start timings of main.py against a database of the given size.
+
+    The first run starts with an empty image cache; the rest reuse it. The
+    time to a usable window is the first frame drawn. Without a display
+    (and no Xvfb to provide one) this raises RuntimeError rather than
+    timing something other than the window.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "warehouse.db")
+        manager = InventoryManager(SQLiteStorage(database))
+        rows = synthetic_warehouse(items)
+        with manager.batch():
+            for section in dict.fromkeys(section for section, _, _, _ in rows):
+                manager.add_section(section)
+            for section, item, quantity, expiry in rows:
+                manager.add_item(section, item, quantity, expiry)
+        manager.close()
+
+        env = dict(os.environ, WAREHOUSE_DB=database, WAREHOUSE_CACHE_DIR=os.path.join(directory, "cache"))
+        here = os.path.dirname(os.path.abspath(__file__))
+        samples = []
+        with virtual_display() as display:
+            if display is None:
+                raise RuntimeError("no display: run with DISPLAY set or install Xvfb to measure startup")
+            env["DISPLAY"] = display
+            for _ in range(runs):
+                launched = time.time()
+                probe = subprocess.run(
+                    [sys.executable, "-c", f"import Benchmarks; Benchmarks.startup_probe({launched!r})"],
+                    cwd=here, env=env, capture_output=True, text=True,
+                )
+                if probe.returncode == NO_DISPLAY_EXIT:
+                    raise RuntimeError(probe.stderr.strip())
+                probe.check_returncode()
+                samples.append(json.loads(probe.stdout.strip().splitlines()[-1]))
+
+    cold, warm = samples[0], samples[1:] or samples
+    best = {stage: round(min(sample[stage] for sample in warm), 3) for stage in warm[0]}
+    results = {
+        "items": items,
+        "cold": {stage: round(seconds, 3) for stage, seconds in cold.items()},
+        "warm": best,
+        "time_to_window_seconds": best["first_frame"],
+    }
+    if budget is not None:
+        results["budget_seconds"] = budget
+        results["over_budget"] = best["first_frame"] > budget
+    return results
+
+
+def peak_bytes(read):
+    """Peak bytes allocated while read() runs."""
+    tracemalloc.start()
+    read()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def measure_reads(items=1_000_000):
+    """Time and peak allocation of a full inventory read through each API."""
+    manager = build_manager(synthetic_warehouse(items))
+    reads = {
+        "get_inventory_data": manager.get_inventory_data,
+        "inventory_view": lambda: collections.deque(manager.inventory_view(), maxlen=0),
+        "inventory_view_quantity": lambda: sum(quantity for (quantity,) in manager.inventory_view(columns=("quantity",))),
+    }
+    try:
+        import numpy  # noqa: F401
+        reads["to_numpy"] = lambda: manager.inventory_view().to_numpy()
+    except ImportError:
+        pass
+    results = {"items": items}
+    for label, read in reads.items():
+        start = time.perf_counter()
+        read()
+        results[f"{label}_seconds"] = round(time.perf_counter() - start, 3)
+        results[f"{label}_peak_mb"] = round(peak_bytes(read) / 1e6, 1)
+    return results
+
+
+def measure_history(days=60, movements_per_day=10000, items=2000):
+    """
+    Per-movement cost of add_item with and without a MovementHistory, and
+    the time to fetch one item's last 30 days from a history of days days.
+    """
+    rng = random.Random(1)
+    names = [f"sku-{i:05d}" for i in range(items)]
+    with tempfile.TemporaryDirectory() as directory:
+        history = MovementHistory(directory, user="bench")
+        now = time.time()
+        for day in range(days):
+            base = now - (days - day) * SECONDS_PER_DAY
+            for i in range(movements_per_day):
+                history.record(rng.choice(names), "Dock", f"Section {i % 50}", 1, "move", timestamp=base + i)
+            history.flush()
+
+        results = {"days": days, "movements": days * movements_per_day}
+        for label, manager_history in (("without_history", None), ("with_history", history)):
+            manager = InventoryManager(history=manager_history)
+            manager.add_section("Dock")
+            start = time.perf_counter()
+            for i in range(5000):
+                manager.add_item("Dock", names[i % items], 1)
+            results[f"add_item_{label}_us"] = round((time.perf_counter() - start) / 5000 * 1e6, 2)
+
+        start = time.perf_counter()
+        found = history.movements(item=names[0], start=now - 30 * SECONDS_PER_DAY)
+        results["item_30_days_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        results["item_30_days_rows"] = len(found)
+        start = time.perf_counter()
+        history.compact(now - 30 * SECONDS_PER_DAY)
+        results["compact_seconds"] = round(time.perf_counter() - start, 2)
+        history.close()
+    return results
+
+
+def measure_forecast(items=200_000, days=56, active=0.3):
+    """
+    Time a nightly reorder forecast over items SKUs: reading days days of
+    consumption files, building the matrix, forecasting and listing the
+    suggestions. About active of the SKUs are used on any one day.
+    """
+    from Forecast import consumption_matrix, forecast
+
+    rng = random.Random(1)
+    names = [f"sku-{i:06d}" for i in range(items)]
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        history = MovementHistory(directory)
+        for day in range(days, 0, -1):
+            consumed = {name: rng.randint(1, 20) for name in rng.sample(names, int(items * active))}
+            path = os.path.join(directory, segment_day(now - day * SECONDS_PER_DAY) + CONSUMED_SUFFIX)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(consumed, f)
+        stock = {name: rng.randint(0, 500) for name in names}
+
+        results = {"items": items, "days": days}
+        start = time.perf_counter()
+        daily = history.daily_consumption(now - days * SECONDS_PER_DAY, now - SECONDS_PER_DAY)
+        results["read_seconds"] = round(time.perf_counter() - start, 3)
+        history.close()
+
+    start = time.perf_counter()
+    forecast_items, _, matrix = consumption_matrix(daily)
+    results["matrix_seconds"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    result = forecast(forecast_items, matrix, [stock[name] for name in forecast_items])
+    results["forecast_seconds"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    results["suggestions"] = len(result.suggestions())
+    results["suggestions_seconds"] = round(time.perf_counter() - start, 3)
+    results["total_seconds"] = round(
+        sum(value for key, value in results.items() if key.endswith("_seconds")), 3
+    )
+    return results
+
+
+# ---- TIMING SUITE ----
+def seconds_per_op(run, repeat=3, min_time=0.05):
+    """
+    Best-of-repeat seconds per operation. run() performs some operations and
+    returns how many; it is called repeatedly until min_time has passed so
+    tiny inputs still give stable figures.
+    """
+    best = None
+    for _ in range(repeat):
+        operations = 0
+        start = time.perf_counter()
+        while True:
+            operations += run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        per_op = elapsed / operations
+        best = per_op if best is None else min(best, per_op)
+    return best
+
+
+def build_manager(rows):
+    manager = InventoryManager()
+    for section, item, quantity, expiry in rows:
+        if section not in manager.sections:
+            manager.add_section(section)
+        manager.add_item(section, item, quantity, expiry)
+    return manager
+
+
+def time_overview_frame(manager, edits):
+    """Seconds per refresh of the real InventoryOverviewFrame, or None without a display."""
+    try:
+        import main as app_module
+        root = app_module.ctk.CTk()
+    except Exception:
+        return None
+    worker = frame = None
+    try:
+        root.withdraw()
+        worker = BackgroundWorker(root)
+        frame = app_module.InventoryOverviewFrame(root, manager, worker)
+        # The frame starts empty (the app loads it on the worker); load it
+        # here so the timed refreshes redraw real rows.
+        frame.model.set_rows(frame.model.read_rows())
+        frame.update_inventory()
+
+        def refresh():
+            for section, item in edits:
+                manager.modify_item_quantity(section, item, 1)
+            frame.update_inventory()
+            root.update_idletasks()
+            return 1
+        return seconds_per_op(refresh)
+    finally:
+        if frame is not None:
+            frame.model.close()
+        if worker is not None:
+            worker.shutdown()
+        root.destroy()
+
+
+def run_suite(sizes):
+    """Time the core operations on synthetic warehouses of each size; returns a JSON-able dict."""
+    results = {}
+    for size in sizes:
+        rows = synthetic_warehouse(size)
+        rng = random.Random(size)
+        sample = [(section, item) for section, item, _, _ in rng.sample(rows, min(size, 1000))]
+        key = f"n={size}"
+
+        results[f"add_item[{key}]"] = seconds_per_op(lambda: build_manager(rows) and len(rows), repeat=1 if size > 10000 else 3)
+        manager = build_manager(rows)
+
+        def modify():
+            for section, item in sample:
+                manager.modify_item_quantity(section, item, 7)
+            return len(sample)
+        results[f"modify_item_quantity[{key}]"] = seconds_per_op(modify)
+        results[f"get_inventory_data[{key}]"] = seconds_per_op(lambda: manager.get_inventory_data() and 1)
+
+        def read_view():
+            collections.deque(manager.inventory_view(), maxlen=0)
+            return 1
+        results[f"inventory_view[{key}]"] = seconds_per_op(read_view)
+
+        section = InventorySection("Bench")
+        for _, item, quantity, expiry in rows:
+            section.add_stock(item, quantity, expiry)
+        sample_names = [item for _, item in sample]
+
+        def section_add():
+            for item in sample_names:
+                section.add_stock(item, 2)
+            return len(sample_names)
+
+        def section_remove():
+            for item in sample_names:
+                section.remove_stock(item, 1)
+            return len(sample_names)
+        results[f"section_add_stock[{key}]"] = seconds_per_op(section_add)
+        results[f"section_remove_stock[{key}]"] = seconds_per_op(section_remove)
+
+        # What update_inventory does after an edit, minus the Tk label updates.
+        model = InventoryTableModel(manager)
+        edits = sample[:5]
+
+        def overview_refresh():
+            for section_name, item in edits:
+                manager.modify_item_quantity(section_name, item, 1)
+            model.take_changes()
+            model.visible_rows(len(model) // 2, 15)
+            return 1
+        results[f"overview_refresh[{key}]"] = seconds_per_op(overview_refresh)
+        model.close()
+
+        # A page from the middle of the inventory sorted by quantity (the index is built first).
+        manager.sorted_rows("quantity", limit=0)
+        results[f"sorted_page[{key}]"] = seconds_per_op(
+            lambda: manager.sorted_rows("quantity", descending=True, offset=size // 2, limit=50) and 1
+        )
+
+        frame_time = time_overview_frame(manager, edits)
+        if frame_time is not None:
+            results[f"overview_frame_refresh[{key}]"] = frame_time
+
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "sizes": list(sizes),
+        "seconds_per_op": results,
+    }
+
+
+def compare_to_baseline(current, baseline, threshold=0.25):
+    """Return [(benchmark, baseline seconds, current seconds)] that got slower than threshold allows."""
+    slower = []
+    old = baseline["seconds_per_op"]
+    for name, seconds in current["seconds_per_op"].items():
+        if name in old and seconds > old[name] * (1 + threshold):
+            slower.append((name, old[name], seconds))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    suite_parser = subparsers.add_parser("suite", help="time the core operations at several sizes")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    suite_parser.add_argument("--output", help="write the results JSON here")
+    suite_parser.add_argument("--baseline", help="results JSON to compare against")
+    suite_parser.add_argument("--threshold", type=float, default=0.25,
+                              help="allowed slowdown before failing, as a fraction (default 0.25)")
+    memory_parser = subparsers.add_parser("memory", help="bytes per item for each representation")
+    memory_parser.add_argument("--items", type=int, default=1_000_000)
+    concurrency_parser = subparsers.add_parser("concurrency", help="increment throughput by thread count")
+    concurrency_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    concurrency_parser.add_argument("--increments", type=int, default=20000)
+    shards_parser = subparsers.add_parser("shards", help="increment throughput by shard process count")
+    shards_parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    shards_parser.add_argument("--clients", type=int, default=8)
+    shards_parser.add_argument("--increments", type=int, default=5000)
+    server_parser = subparsers.add_parser("server", help="HTTP requests/sec against a local server")
+    server_parser.add_argument("--clients", type=int, default=50)
+    server_parser.add_argument("--requests", type=int, default=200)
+    recovery_parser = subparsers.add_parser("recovery", help="operation log restart time")
+    recovery_parser.add_argument("--items", type=int, default=1_000_000)
+    recovery_parser.add_argument("--tail", type=int, default=50000)
+    search_parser = subparsers.add_parser("search", help="search index build time and per-keystroke latency")
+    search_parser.add_argument("--items", type=int, default=500_000)
+    startup_parser = subparsers.add_parser("startup", help="cold-start time of main.py, optionally against a budget")
+    startup_parser.add_argument("--items", type=int, default=100_000)
+    startup_parser.add_argument("--runs", type=int, default=3)
+    startup_parser.add_argument("--budget", type=float, help="fail when the time to a usable window exceeds this (seconds)")
+    reads_parser = subparsers.add_parser("reads", help="time and peak memory of a full inventory read")
+    reads_parser.add_argument("--items", type=int, default=1_000_000)
+    history_parser = subparsers.add_parser("history", help="movement history write overhead, queries and compaction")
+    history_parser.add_argument("--days", type=int, default=60)
+    history_parser.add_argument("--per-day", type=int, default=10000)
+    forecast_parser = subparsers.add_parser("forecast", help="nightly reorder forecast over many SKUs")
+    forecast_parser.add_argument("--items", type=int, default=200_000)
+    forecast_parser.add_argument("--days", type=int, default=56)
+    args = parser.parse_args()
+
+    if args.command == "suite":
+        # Check the baseline before spending minutes on the suite; a missing
+        # one must not let a regression check pass without comparing anything.
+        if args.baseline and not os.path.exists(args.baseline):
+            print(f"Baseline file not found: {args.baseline}", file=sys.stderr)
+            sys.exit(2)
+        results = run_suite(args.sizes)
+        print(json.dumps(results, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        if args.baseline:
+            with open(args.baseline) as f:
+                slower = compare_to_baseline(results, json.load(f), args.threshold)
+            for name, before, after in slower:
+                print(f"SLOWER: {name} {before * 1e6:.2f}us -> {after * 1e6:.2f}us", file=sys.stderr)
+            if slower:
+                sys.exit(1)
+    elif args.command == "memory":
+        print(json.dumps(measure_memory(args.items), indent=2))
+    elif args.command == "concurrency":
+        print(json.dumps(measure_concurrency(args.threads, args.increments), indent=2))
+    elif args.command == "shards":
+        print(json.dumps(measure_sharding(args.shards, args.clients, args.increments), indent=2))
+    elif args.command == "server":
+        print(json.dumps(measure_server(args.clients, args.requests), indent=2))
+    elif args.command == "recovery":
+        print(json.dumps(measure_recovery(args.items, args.tail), indent=2))
+    elif args.command == "search":
+        print(json.dumps(measure_search(args.items), indent=2))
+    elif args.command == "startup":
+        try:
+            results = measure_startup(args.items, args.runs, args.budget)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(results, indent=2))
+        if results.get("over_budget"):
+            print(f"SLOWER: startup {results['time_to_window_seconds']}s > budget {args.budget}s", file=sys.stderr)
+            sys.exit(1)
+    elif args.command == "reads":
+        print(json.dumps(measure_reads(args.items), indent=2))
+    elif args.command == "history":
+        print(json.dumps(measure_history(args.days, args.per_day), indent=2))
+    elif args.command == "forecast":
+        print(json.dumps(measure_forecast(args.items, args.days), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from ExpiryIndex import format_expiry_date, parse_expiry_date
+
+FIELDS = ("section", "item", "quantity", "expiry_date")
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportReport:
+    """Outcome of a bulk import, including throughput figures."""
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []  # first MAX_REPORTED_ERRORS (row number, message) pairs
+        self.elapsed_seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.rows_read / self.elapsed_seconds
+
+    def reject(self, row_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+    def __str__(self):
+        return (
+            f"Imported {self.imported} of {self.rows_read} rows "
+            f"({self.rejected} rejected) in {self.elapsed_seconds:.2f}s "
+            f"[{self.rows_per_second:,.0f} rows/sec]"
+        )
+
+
+# ---- READERS ----
+def read_csv(path):
+    """Yield one dict per data row of a CSV file with a header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def read_jsonl(path):
+    """Yield one dict per line of a JSON-lines file (bad lines are yielded as raw text)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+
+
+def read_rows(path):
+    """Pick a reader from the file extension."""
+    if path.endswith((".jsonl", ".ndjson")):
+        return read_jsonl(path)
+    if path.endswith(".csv"):
+        return read_csv(path)
+    raise ValueError(f"Unsupported file type for '{path}' (expected .csv or .jsonl).")
+
+
+# ---- IMPORT ----
+def validate_row(row):
+    """Return (section, item, quantity, expiry) for a raw row or raise ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("Row is not a record.")
+    section = str(row.get("section") or "").strip()
+    item = str(row.get("item") or "").strip()
+    if not section:
+        raise ValueError("Section name is required.")
+    if not item:
+        raise ValueError("Item name is required.")
+    try:
+        quantity = int(row.get("quantity"))
+    except (TypeError, ValueError):
+        raise ValueError("Quantity must be a positive integer.") from None
+    if quantity <= 0:
+        raise ValueError("Quantity must be greater than zero.")
+    return section, item, quantity, parse_expiry_date(row.get("expiry_date") or None)
+
+
+def import_rows(inventory_manager, rows, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Add stock from an iterable of row dicts, one chunk at a time.
+
+    Each chunk is validated first and then applied inside one
+    InventoryManager.batch(), so only chunk_size rows are held in memory.
+    progress(rows_read) is called after every chunk.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    numbered_rows = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered_rows, chunk_size))
+        if not chunk:
+            break
+        report.rows_read += len(chunk)
+
+        valid_rows = []
+        for row_number, row in chunk:
+            try:
+                valid_rows.append(validate_row(row))
+            except ValueError as e:
+                report.reject(row_number, str(e))
+
+        with inventory_manager.batch():
+            for section, item, quantity, expiry in valid_rows:
+                if section not in inventory_manager.sections:
+                    inventory_manager.add_section(section)
+                inventory_manager.add_item(section, item, quantity, expiry)
+        report.imported += len(valid_rows)
+        if progress is not None:
+            progress(report.rows_read)
+
+    report.elapsed_seconds = time.perf_counter() - start
+    return report
+
+
+# ---- EXPORT ----
+def export_rows(inventory_manager, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the inventory as text chunks of CSV (with header) or JSON lines.
+    Each lot is a row of its own, so importing the export keeps every lot's date.
+    """
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported export format '{fmt}' (expected 'csv' or 'jsonl').")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(FIELDS)
+
+    pending = 0
+    for section_name, item_name, quantity, expiry_date in inventory_manager.inventory_view(by_lot=True):
+        expiry = format_expiry_date(expiry_date)
+        if fmt == "csv":
+            writer.writerow((section_name, item_name, quantity, expiry or ""))
+        else:
+            buffer.write(json.dumps({
+                "section": section_name,
+                "item": item_name,
+                "quantity": quantity,
+                "expiry_date": expiry,
+            }))
+            buffer.write("\n")
+        pending += 1
+        if pending == chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_export(inventory_manager, path, fmt=None):
+    """Stream the inventory to a file; the format defaults to the file extension."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for chunk in export_rows(inventory_manager, fmt):
+            f.write(chunk)
@@ -0,0 +1,170 @@
+"""
+Typed change events and a small publish/subscribe bus to fan them out.
+
+InventoryManager publishes an event for every change once it is applied
+and committed (see InventoryManager.events). Subscribers pick the event
+types they want and are called either:
+
+- sync: on the publishing thread, as soon as the change is made, or
+- async (queue_size=N): on a thread of their own, fed through a queue of at
+  most N deliveries; publishers wait while it is full, so a slow subscriber
+  holds changes back instead of using unbounded memory.
+
+Inside transaction() (InventoryManager.batch() opens one) events are held
+per thread and delivered together when the outermost transaction ends, so
+a batched subscriber gets a single call with every event of the batch.
+"""
+import queue
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+# reason is the movement reason: "add", "remove", "adjust", "move", "undo", ...
+SectionCreated = namedtuple("SectionCreated", "section")
+ItemAdded = namedtuple("ItemAdded", "section item quantity reason")
+QuantityChanged = namedtuple("QuantityChanged", "section item old_quantity new_quantity reason")
+# Comes with the ItemAdded / QuantityChanged events of the rows it touched.
+StockTransferred = namedtuple("StockTransferred", "source target item quantity")
+
+EVENT_TYPES = (SectionCreated, ItemAdded, QuantityChanged, StockTransferred)
+# Events that change one (section, item) row.
+ROW_EVENTS = (ItemAdded, QuantityChanged)
+
+
+class _ThreadTransaction(threading.local):
+    events = None   # events held by this thread's open transaction
+
+
+def _report_error(error):
+    sys.excepthook(type(error), error, error.__traceback__)
+
+
+class Subscription:
+    """One subscriber, as returned by EventBus.subscribe()."""
+    def __init__(self, callback, event_types, batched, queue_size, on_error):
+        self.callback = callback
+        self.event_types = frozenset(event_types or EVENT_TYPES)
+        self._every_type = self.event_types == frozenset(EVENT_TYPES)
+        self.batched = batched
+        self.on_error = on_error or _report_error
+        self._queue = None
+        if queue_size is not None:
+            if queue_size < 1:
+                raise ValueError("An async subscriber's queue must hold at least one delivery.")
+            self._queue = queue.Queue(queue_size)
+            self._thread = threading.Thread(target=self._run, name="event-subscriber", daemon=True)
+            self._thread.start()
+
+    @property
+    def is_async(self):
+        return self._queue is not None
+
+    def deliver(self, events):
+        if not self._every_type:
+            events = [event for event in events if type(event) in self.event_types]
+            if not events:
+                return
+        if self._queue is None:
+            self._call(events)
+        else:
+            self._queue.put(events)   # waits while the queue is full
+
+    def _call(self, events):
+        # A failing subscriber mustn't undo a committed change for the caller
+        # or keep the events from other subscribers.
+        for argument in [events] if self.batched else events:
+            try:
+                self.callback(argument)
+            except Exception as e:
+                self.on_error(e)
+
+    def _run(self):
+        while True:
+            events = self._queue.get()
+            try:
+                if events is None:
+                    return
+                self._call(events)
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until an async subscriber has handled everything delivered so far."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+
+class EventBus:
+    """
+    Delivers published events to every matching subscriber. Subscriptions
+    are kept in a list that is replaced, never changed in place, so
+    publish() doesn't need a lock.
+    """
+    def __init__(self):
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._transaction = _ThreadTransaction()
+
+    def subscribe(self, callback, *event_types, batched=False, queue_size=None, on_error=None):
+        """
+        Call callback(event) for each published event of the given types (all
+        types if none are given); with batched=True call callback([events])
+        once per transaction instead. With queue_size the callback runs on its
+        own thread. If the callback raises, on_error(exception) is called
+        (by default the exception is reported through sys.excepthook) and
+        the publisher carries on.
+        """
+        subscription = Subscription(callback, event_types, batched, queue_size, on_error)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering to a subscription; an async one finishes its queue first."""
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+        subscription.close()
+
+    @contextmanager
+    def transaction(self):
+        """Hold this thread's events until the outermost transaction ends, then deliver them together."""
+        if self._transaction.events is not None:
+            yield
+            return
+        self._transaction.events = pending = []
+        try:
+            yield
+        finally:
+            self._transaction.events = None
+            self._deliver(pending)
+
+    def publish(self, *events):
+        """Deliver events now, or when the current thread's transaction ends."""
+        pending = self._transaction.events
+        if pending is not None:
+            pending.extend(events)
+        else:
+            self._deliver(events)
+
+    def _deliver(self, events):
+        if events:
+            for subscription in self._subscriptions:
+                subscription.deliver(events)
+
+    def join(self):
+        """Wait until every async subscriber has caught up."""
+        for subscription in self._subscriptions:
+            subscription.join()
+
+    def close(self):
+        """Unsubscribe everyone, letting async subscribers finish their queues."""
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.close()
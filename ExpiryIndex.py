@@ -0,0 +1,112 @@
+import datetime
+from bisect import bisect_left, insort
+
+
+def parse_expiry_date(value):
+    """Turn an expiry date (YYYY-MM-DD string or date) into a datetime.date, or None."""
+    if value is None or isinstance(value, datetime.date):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Expiry date '{value}' is not a valid date (use YYYY-MM-DD).") from None
+
+
+_iso_dates = {}
+
+
+def format_expiry_date(date):
+    """Inverse of parse_expiry_date: YYYY-MM-DD text for a date, or None."""
+    if date is None:
+        return None
+    text = _iso_dates.get(date)
+    if text is None:
+        # Only a few thousand distinct dates are in stock, so remember their text.
+        text = _iso_dates[date] = date.isoformat()
+    return text
+
+
+def format_lots(lots):
+    """[(expiry_date, quantity)] lots as "YYYY-MM-DD=quantity;..." text, as stored and logged."""
+    return ";".join(f"{format_expiry_date(expiry)}={quantity}" for expiry, quantity in lots)
+
+
+def parse_lots(text):
+    """Inverse of format_lots."""
+    lots = []
+    for lot in text.split(";"):
+        expiry, _, quantity = lot.partition("=")
+        lots.append((parse_expiry_date(expiry), int(quantity)))
+    return lots
+
+
+class ExpiryIndex:
+    """
+    Sorted index of in-stock lots by expiry date, one (expiry, section, item)
+    entry per lot, so stock is found by every date it expires on and not
+    only by its row's earliest one.
+
+    Lookups use bisect, so finding where a date range starts is O(log n)
+    regardless of how many lots are indexed.
+    """
+    def __init__(self):
+        self._entries = []   # sorted [(expiry, section, item)], one per lot
+        self._by_item = {}   # item -> sorted [(expiry, section)], one per lot
+        self._dates = {}     # (section, item) -> indexed expiry dates of its lots
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rebuild(self, rows):
+        """Index every (section, item, [(expiry, quantity)] lots) row in one pass."""
+        self._entries = []
+        self._by_item = {}
+        self._dates = {}
+        for section, item, lots in rows:
+            dates = [expiry for expiry, quantity in lots if expiry is not None and quantity > 0]
+            if dates:
+                self._entries.extend((expiry, section, item) for expiry in dates)
+                self._by_item.setdefault(item, []).extend((expiry, section) for expiry in dates)
+                self._dates[(section, item)] = dates
+        self._entries.sort()
+        for item_lots in self._by_item.values():
+            item_lots.sort()
+
+    def update(self, section, item, lots):
+        """Re-index one row's lots; lots without an expiry or with no stock are dropped."""
+        for old_expiry in self._dates.pop((section, item), ()):
+            self._remove(self._entries, (old_expiry, section, item))
+            item_lots = self._by_item[item]
+            self._remove(item_lots, (old_expiry, section))
+            if not item_lots:
+                del self._by_item[item]
+        dates = [expiry for expiry, quantity in lots if expiry is not None and quantity > 0]
+        if dates:
+            item_lots = self._by_item.setdefault(item, [])
+            for expiry in dates:
+                insort(self._entries, (expiry, section, item))
+                insort(item_lots, (expiry, section))
+            self._dates[(section, item)] = dates
+
+    @staticmethod
+    def _remove(entries, entry):
+        index = bisect_left(entries, entry)
+        if index < len(entries) and entries[index] == entry:
+            del entries[index]
+
+    def expiring_before(self, date):
+        """Return [(expiry, section, item)] for lots expiring strictly before date."""
+        return self._entries[:bisect_left(self._entries, (date,))]
+
+    def expiring_between(self, start, end):
+        """Return [(expiry, section, item)] for lots expiring from start to end inclusive."""
+        low = bisect_left(self._entries, (start,))
+        high = bisect_left(self._entries, (end + datetime.timedelta(days=1),))
+        return self._entries[low:high]
+
+    def lots_for_item(self, item):
+        """Return [(expiry, section)] for an item's lots, earliest expiry first."""
+        return self._by_item.get(item, [])
@@ -0,0 +1,120 @@
+"""
+Reorder suggestions from consumption history, computed for every item at once.
+
+consumption_matrix() turns MovementHistory.daily_consumption() into an
+items x days NumPy array, and forecast() works on whole columns of it: the
+moving average and spread of daily use over the last window days,
+exponentially smoothed daily demand, days of cover, the reorder point
+(demand over the lead time plus safety stock) and the order-up-to level
+(demand over the lead time and review period plus safety stock). Only
+reading the history in and the results out loops over items in Python.
+"""
+import numpy as np
+
+# Days of consumption the moving average and safety stock look at.
+WINDOW_DAYS = 28
+# Weight of the latest day in the exponentially smoothed demand.
+SMOOTHING = 0.3
+# Days from placing an order to the stock arriving, and between orders.
+LEAD_DAYS = 7
+REVIEW_DAYS = 7
+# Safety stock in standard deviations of daily use (about a 95% service level).
+SERVICE_FACTOR = 1.65
+
+
+def consumption_matrix(daily):
+    """
+    Turn [(day, {item: units})] into (items, days, matrix): one float32 row
+    of units consumed per item (items sorted) and one column per day, oldest first.
+    Days with stock given back (a net negative) count as no use.
+    """
+    days = [day for day, _ in daily]
+    items = set()
+    for _, consumed in daily:
+        items.update(consumed)
+    items = sorted(items)
+    rows = dict(zip(items, range(len(items))))
+    matrix = np.zeros((len(rows), len(days)), dtype=np.float32)
+    for column, (_, consumed) in enumerate(daily):
+        if consumed:
+            item_rows = np.fromiter(map(rows.__getitem__, consumed), dtype=np.intp, count=len(consumed))
+            matrix[item_rows, column] = np.fromiter(consumed.values(), dtype=np.float32, count=len(consumed))
+    np.maximum(matrix, 0, out=matrix)
+    return items, days, matrix
+
+
+def smoothing_weights(days, smoothing=SMOOTHING):
+    """
+    Weights w such that matrix @ w is each row's exponentially smoothed value
+    after the last day (the first day seeds the average), oldest day first.
+    """
+    weights = smoothing * (1 - smoothing) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    if days:
+        weights[0] = (1 - smoothing) ** (days - 1)
+    return weights.astype(np.float32)
+
+
+class ReorderForecast:
+    """forecast() results: NumPy arrays with one entry per item, in the order of items."""
+    def __init__(self, items, stock, moving_average, demand, deviation, days_of_cover, reorder_point, order_up_to):
+        self.items = items
+        self.stock = stock
+        self.moving_average = moving_average
+        self.demand = demand                  # smoothed units per day
+        self.deviation = deviation
+        self.days_of_cover = days_of_cover    # inf when there is no demand
+        self.reorder_point = reorder_point
+        self.order_up_to = order_up_to
+
+    def __len__(self):
+        return len(self.items)
+
+    def suggested_quantities(self):
+        """
+        Units to order per item: enough to reach the order-up-to level for
+        items at or below their reorder point, 0 for the rest.
+        """
+        short = (self.stock <= self.reorder_point) & (self.demand > 0)
+        return np.where(short, np.ceil(np.maximum(self.order_up_to - self.stock, 0)), 0).astype(np.int64)
+
+    def suggestions(self):
+        """Return {item: units to order} for the items that need ordering."""
+        quantities = self.suggested_quantities()
+        needed = np.flatnonzero(quantities)
+        return dict(zip([self.items[i] for i in needed], quantities[needed].tolist()))
+
+    def levels(self):
+        """Return {item: (reorder_point, order_up_to)} for the items with any demand."""
+        with_demand = np.flatnonzero(self.demand > 0)
+        return dict(zip(
+            [self.items[i] for i in with_demand],
+            zip(self.reorder_point[with_demand].tolist(), self.order_up_to[with_demand].tolist()),
+        ))
+
+
+def forecast(items, matrix, stock, window=WINDOW_DAYS, smoothing=SMOOTHING, lead_days=LEAD_DAYS,
+             review_days=REVIEW_DAYS, service_factor=SERVICE_FACTOR):
+    """
+    Forecast every row of a consumption_matrix() at once; stock holds each
+    item's units on hand, in the order of items.
+    """
+    if not 0 < smoothing <= 1:
+        raise ValueError("Smoothing must be above 0 and at most 1.")
+    if window < 1 or lead_days < 0 or review_days < 0:
+        raise ValueError("The window must be at least a day, and lead and review times can't be negative.")
+    stock = np.asarray(stock, dtype=np.float64)
+    days = matrix.shape[1]
+    if days:
+        recent = matrix[:, -window:]
+        moving_average = recent.mean(axis=1, dtype=np.float64)
+        deviation = recent.std(axis=1, dtype=np.float64)
+        demand = (matrix @ smoothing_weights(days, smoothing)).astype(np.float64)
+    else:
+        moving_average = deviation = demand = np.zeros(len(items))
+    safety_stock = service_factor * deviation * np.sqrt(lead_days)
+    reorder_point = demand * lead_days + safety_stock
+    order_up_to = demand * (lead_days + review_days) + safety_stock
+    days_of_cover = np.divide(stock, demand, out=np.full(len(items), np.inf), where=demand > 0)
+    return ReorderForecast(
+        items, stock, moving_average, demand, deviation, days_of_cover, reorder_point, order_up_to
+    )
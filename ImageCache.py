@@ -0,0 +1,41 @@
+import os
+
+# Pre-scaled copies of image assets are kept here (override with WAREHOUSE_CACHE_DIR)
+CACHE_DIR = os.environ.get(
+    "WAREHOUSE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "light-logistics")
+)
+
+
+def cached_image_path(path, size, cache_dir=CACHE_DIR):
+    """Where the size-scaled copy of path is cached; the name changes whenever the source file does."""
+    stat = os.stat(path)
+    name, _ = os.path.splitext(os.path.basename(path))
+    width, height = size
+    return os.path.join(cache_dir, f"{name}-{width}x{height}-{stat.st_mtime_ns}-{stat.st_size}.png")
+
+
+def load_scaled_image(path, size, cache_dir=CACHE_DIR):
+    """
+    Return path's image as a PIL Image scaled to size (width, height).
+
+    The first call decodes the full-size file and saves the scaled copy to
+    cache_dir, so later starts only decode the small one. Safe to call on
+    a worker thread. A cache that can't be written is skipped silently.
+    """
+    from PIL import Image
+
+    cached = cached_image_path(path, size, cache_dir)
+    if os.path.exists(cached):
+        image = Image.open(cached)
+        image.load()
+        return image
+
+    with Image.open(path) as original:
+        image = original.resize(size, Image.LANCZOS)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        image.save(cached + ".tmp", format="PNG")
+        os.replace(cached + ".tmp", cached)
+    except OSError:
+        pass
+    return image
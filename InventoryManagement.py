@@ -1,48 +1,727 @@
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import BulkIO
+from Aggregates import InventoryAggregates
+from EventBus import EventBus, ItemAdded, QuantityChanged, SectionCreated, StockTransferred
+from ExpiryIndex import ExpiryIndex, format_expiry_date, parse_expiry_date
+from InventoryView import InventoryView
+from Locks import DEFAULT_STRIPES, NoLocks, SectionLocks
+from MovementHistory import SECONDS_PER_DAY
+from NameIndex import SortedNames
+from SearchIndex import SearchIndex
+from SortIndex import SortIndex
+from Sections import InventorySection, item_from_lots, new_item
+from Storage import LazySections, MemoryStorage
+
+# Days of consumption a reorder forecast is based on.
+FORECAST_HISTORY_DAYS = 56
+
+
+class _ThreadBatch(threading.local):
+    depth = 0   # batch() blocks open on this thread
+
+
 class InventoryManager:
-    def __init__(self):
-        self.sections = {}
+    """
+    Sections and their items: sections maps each name to an InventorySection,
+    whose items dict holds RegularItem / PerishableItem objects.
+
+    With concurrent=True every section is guarded by a read/write lock (hashed
+    onto lock_stripes stripes), so worker threads can update different
+    sections in parallel; otherwise locking is skipped entirely.
+
+    A MovementHistory passed as history records every change of stock as a
+    movement, written out with each storage commit.
+
+    Every change is published on events (an EventBus) once it has been
+    committed; subscribe there to react to changes.
+    """
+    def __init__(self, storage=None, concurrent=False, lock_stripes=DEFAULT_STRIPES, history=None):
+        self.storage = storage or MemoryStorage()
+        self.history = history
+        self.sections = self.storage.load_sections()
+        self._concurrent = concurrent
+        self.events = EventBus()
+        self._batch = _ThreadBatch()
+        self._expiry_index = None
+        self._aggregates = None
+        self._search_index = SearchIndex()
+        self._search_sections = set()   # sections whose rows are in the search index
+        self._sort_indexes = {}         # column -> SortIndex, built when first sorted by
+        self.names_version = 0          # bumped whenever a section is added
+        self._section_versions = {}     # section -> bumped whenever an item row is added to it
+        self._section_name_cache = None
+        self._item_name_caches = {}     # section -> SortedNames
+        self._reorder_points = {}
+        self._default_reorder_point = None
+        self._reorder_levels = {}       # item -> (reorder point, order-up-to level) from the last forecast
+        self._reorder_units = {}        # item -> units in stock, kept for the items in _reorder_levels
+        if concurrent:
+            self._locks = SectionLocks(lock_stripes)
+            self._state_lock = threading.Lock()
+        else:
+            self._locks = NoLocks()
+            self._state_lock = nullcontext()
+        guard_snapshots = getattr(self.storage, "guard_snapshots", None)
+        if guard_snapshots is not None:
+            guard_snapshots(self._hold_all)
 
     def add_section(self, name):
-        if name not in self.sections:
-            self.sections[name] = {}
+        """Add a new section if it doesn't already exist."""
+        with self._state_lock:
+            if name in self.sections:
+                return
+            self.sections[name] = InventorySection(name)
+            self.names_version += 1
+            self.storage.save_section(name)
+        self._commit()
+        self.events.publish(SectionCreated(name))
 
     def add_item(self, section_name, item_name, quantity, expiry_date=None):
-        if section_name not in self.sections:
-            raise ValueError(f"Section '{section_name}' not found.")
-        if item_name in self.sections[section_name]:
-            self.sections[section_name][item_name]["quantity"] += quantity
-        else:
-            self.sections[section_name][item_name] = {
-                "quantity": quantity,
-                "expiry_date": expiry_date,
-            }
+        """
+        Add or increase quantity of an item in the given section. Perishable
+        stock with a new expiry date is kept as a lot of its own.
+        """
+        expiry = parse_expiry_date(expiry_date)
+        with self._locks.write(section_name):
+            section = self.sections.get(section_name)
+            if section is None:
+                raise ValueError(f"Section '{section_name}' not found.")
+            item = section.items.get(item_name)
+            if item is None:
+                old_quantity = None
+                if quantity <= 0:
+                    raise ValueError("Amount must be greater than zero.")
+                section.items[item_name] = new_item(item_name, quantity, expiry)
+            else:
+                old_quantity = item.quantity
+                item.add_stock(quantity, expiry)
+            event = self._item_changed(section_name, item_name, old_quantity, "add")
+        self._record_movement(item_name, None, section_name, quantity, "add")
+        self._changes_applied([event])
+
+    def take_stock(self, section_name, item_name, quantity):
+        """
+        Remove quantity of an item, earliest-expiring lots first, and return
+        the [(expiry_date, quantity)] lots taken.
+        """
+        with self._locks.write(section_name):
+            item = self._get_item(section_name, item_name)
+            old_quantity = item.quantity
+            lots = item.take_stock(quantity)
+            event = self._item_changed(section_name, item_name, old_quantity, "remove")
+        self._record_movement(item_name, section_name, None, quantity, "remove")
+        self._changes_applied([event])
+        return lots
 
     def modify_item_quantity(self, section_name, item_name, new_quantity):
-        if section_name not in self.sections:
+        """Set an item's quantity in a section to a new value (a stock count, so never negative)."""
+        if new_quantity < 0:
+            raise ValueError("Quantity can't be negative.")
+        with self._locks.write(section_name):
+            item = self._get_item(section_name, item_name)
+            old_quantity = item.quantity
+            item.quantity = new_quantity
+            event = self._item_changed(section_name, item_name, old_quantity, "adjust")
+        self._record_change(section_name, item_name, new_quantity - old_quantity, "adjust")
+        self._changes_applied([event])
+
+    def increment(self, section_name, item_name, delta):
+        """
+        Atomically add delta (which may be negative) to an item's quantity and
+        return the new quantity. A missing item is created when delta is positive.
+        """
+        with self._locks.write(section_name):
+            section = self.sections.get(section_name)
+            if section is None:
+                raise ValueError(f"Section '{section_name}' not found.")
+            item = section.items.get(item_name)
+            if item is None:
+                if delta <= 0:
+                    raise ValueError(f"Item '{item_name}' not found in section '{section_name}'.")
+                section.add_stock(item_name, delta)
+                old_quantity = None
+            else:
+                old_quantity = item.quantity
+                if delta > 0:
+                    item.add_stock(delta)
+                elif delta < 0:
+                    item.remove_stock(-delta)
+            new_quantity = section.items[item_name].quantity
+            reason = "add" if delta > 0 else "remove"
+            event = self._item_changed(section_name, item_name, old_quantity, reason)
+        self._record_change(section_name, item_name, delta, reason)
+        self._changes_applied([event])
+        return new_quantity
+
+    def row_lots(self, section_name, item_name):
+        """
+        An item row's stock as {expiry_date: quantity} (one None date for
+        regular stock), or None if there's no such row; see change_lots().
+        """
+        with self._locks.read(section_name):
+            item = self.get_item(section_name, item_name)
+            return None if item is None else dict(item.lots)
+
+    def change_lots(self, rows, reason="restore"):
+        """
+        Add or take amounts of specific lots, as one change: rows are
+        (section, item, {expiry_date: change}), and a negative change takes
+        that much of the lot. Nothing changes unless every lot has the stock
+        to take. Emptied rows are kept, as rows are never deleted.
+        """
+        rows = [row for row in rows if any(row[2].values())]
+        section_names = {section_name for section_name, _, _ in rows}
+        events = []
+        with self.batch():
+            with self._locks.write(*section_names):
+                planned = []
+                for section_name, item_name, changes in rows:
+                    section = self.sections.get(section_name)
+                    item = None if section is None else section.items.get(item_name)
+                    lots = {} if item is None else dict(item.lots)
+                    for expiry_date, change in changes.items():
+                        lots[expiry_date] = lots.get(expiry_date, 0) + change
+                        if lots[expiry_date] < 0:
+                            raise ValueError(
+                                f"Not enough stock of '{item_name}' left in '{section_name}' to reverse the change."
+                            )
+                    planned.append((section_name, item_name, item, lots))
+                for section_name, item_name, item, lots in planned:
+                    if section_name not in self.sections:
+                        self.add_section(section_name)
+                    old_quantity = None if item is None else item.quantity
+                    item = self.sections[section_name].items[item_name] = item_from_lots(item_name, lots)
+                    events.append(self._item_changed(section_name, item_name, old_quantity, reason))
+                    self._record_change(section_name, item_name, item.quantity - (old_quantity or 0), reason)
+        self._changes_applied(events)
+
+    def get_item(self, section_name, item_name):
+        """Return the item object (RegularItem or PerishableItem), or None if there is no such row."""
+        section = self.sections.get(section_name)
+        return None if section is None else section.items.get(item_name)
+
+    def _get_item(self, section_name, item_name):
+        section = self.sections.get(section_name)
+        if section is None:
             raise ValueError(f"Section '{section_name}' not found.")
-        if item_name not in self.sections[section_name]:
+        item = section.items.get(item_name)
+        if item is None:
             raise ValueError(f"Item '{item_name}' not found in section '{section_name}'.")
-        self.sections[section_name][item_name]["quantity"] = new_quantity
-
-    def get_inventory_data(self):
-        data = []
-        for section, items in self.sections.items():
-            for item, details in items.items():
-                data.append({
-                    "Section Name": section,
-                    "Item Name": item,
-                    "Quantity": details["quantity"],
-                    "Expiry Date": details["expiry_date"] or "N/A",
-                })
-        return data
+        return item
+
+    # ---- TRANSFERS ----
+    def transfer(self, source_section, target_section, item_name, quantity):
+        """Move stock of an item from one section to another as a single change."""
+        self.transfer_many([(source_section, target_section, item_name, quantity)])
+
+    def transfer_many(self, moves):
+        """
+        Apply (source, target, item, quantity) moves all-or-nothing.
+
+        Every move is checked against the running totals of the moves before
+        it, and nothing is changed unless all of them are valid. Missing
+        target sections are created. Perishable stock leaves the source
+        earliest-expiring lots first and keeps its lots' dates in the target.
+        """
+        moves = list(moves)
+        # Sections created for the moves are announced and committed with them,
+        # after the locks are released.
+        with self.batch():
+            with self._locks.write(*{name for move in moves for name in move[:2]}):
+                events = self._apply_moves(moves)
+            for source, target, item_name, quantity in moves:
+                self._record_movement(item_name, source, target, quantity, "move")
+                events.append(StockTransferred(source, target, item_name, quantity))
+            self._changes_applied(events)
+
+    def _apply_moves(self, moves):
+        sections = {}   # section name -> InventorySection (None if it doesn't exist yet)
+        planned = {}    # (section, item) -> quantity after the moves (None while there's no row)
+
+        def planned_quantity(section_name, item_name):
+            key = (section_name, item_name)
+            if key not in planned:
+                section = sections[section_name]
+                item = None if section is None else section.items.get(item_name)
+                planned[key] = None if item is None else item.quantity
+            return planned[key]
+
+        for source, target, item_name, quantity in moves:
+            if quantity <= 0:
+                raise ValueError("Quantity must be greater than zero.")
+            if source == target:
+                raise ValueError("Source and target sections must be different.")
+            for section_name in (source, target):
+                if section_name not in sections:
+                    sections[section_name] = self.sections.get(section_name)
+            # A source that doesn't exist yet is fine if an earlier move brings the item there.
+            if sections[source] is None and (source, item_name) not in planned:
+                raise ValueError(f"Section '{source}' not found.")
+
+            source_quantity = planned_quantity(source, item_name)
+            if source_quantity is None:
+                raise ValueError(f"Item '{item_name}' not found in section '{source}'.")
+            if source_quantity < quantity:
+                raise ValueError("Not enough stock to move.")
+            planned[(source, item_name)] = source_quantity - quantity
+            planned[(target, item_name)] = (planned_quantity(target, item_name) or 0) + quantity
+
+        # Every move is known to be valid, so replay them on the items: the
+        # lots each one takes go into the target with their own dates.
+        with self.batch():
+            for section_name, items in sections.items():
+                if items is None:
+                    self.add_section(section_name)
+                    sections[section_name] = self.sections[section_name]
+            old_quantities = {}
+            for source, target, item_name, quantity in moves:
+                target_items = sections[target].items
+                for key, items in (((source, item_name), sections[source].items), ((target, item_name), target_items)):
+                    if key not in old_quantities:
+                        item = items.get(item_name)
+                        old_quantities[key] = None if item is None else item.quantity
+                item = target_items.get(item_name)
+                for expiry_date, lot_quantity in sections[source].items[item_name].take_stock(quantity):
+                    if item is None:
+                        item = target_items[item_name] = new_item(item_name, lot_quantity, expiry_date)
+                    else:
+                        item.add_stock(lot_quantity, expiry_date)
+            return [
+                self._item_changed(section_name, item_name, old_quantity, "move")
+                for (section_name, item_name), old_quantity in old_quantities.items()
+            ]
+
+    def inventory_view(self, columns=None, section=None, named=False, by_lot=False):
+        """
+        Return an InventoryView: lazy (section, item, quantity, expiry_date)
+        tuples, optionally projected to some columns, limited to one section,
+        made namedtuples or split into one row per lot. Use its to_numpy()
+        for a structured array.
+        """
+        return InventoryView(self.sections, self._locks, columns, section, named, by_lot)
+
+    def get_inventory_data(self, section=None):
+        """Return a list of dictionaries for displaying in the UI (see inventory_view() for large reads)."""
+        return [
+            {
+                "Section Name": section_name,
+                "Item Name": item_name,
+                "Quantity": quantity,
+                "Expiry Date": format_expiry_date(expiry) if expiry else "N/A",
+            }
+            for section_name, item_name, quantity, expiry in self.inventory_view(section=section)
+        ]
+
+    # ---- BULK IMPORT / EXPORT ----
+    def bulk_import(self, rows, chunk_size=BulkIO.DEFAULT_CHUNK_SIZE, progress=None):
+        """
+        Add stock from an iterable of {"section", "item", "quantity", "expiry_date"}
+        rows (see BulkIO.read_rows) and return an ImportReport.
+        """
+        return BulkIO.import_rows(self, rows, chunk_size, progress)
+
+    def export_stream(self, fmt="csv", chunk_size=BulkIO.DEFAULT_CHUNK_SIZE):
+        """Yield the inventory as CSV or JSON-lines text, chunk_size rows at a time."""
+        return BulkIO.export_rows(self, fmt, chunk_size)
 
     # ---- NEW METHODS FOR DROPDOWNS ----
     def get_section_names(self):
-        """Return a list of all existing section names."""
-        return list(self.sections.keys())
-
-    def get_item_names_in_section(self, section_name):
-        """Return a list of item names for the given section."""
-        if section_name in self.sections:
-            return list(self.sections[section_name].keys())
-        return []
+        """
+        Return the section names as a live keys view (a list copy with
+        concurrent=True, where another thread could change it mid-iteration).
+        """
+        if self._concurrent:
+            return list(self.sections.keys())
+        return self.sections.keys()
+
+    def get_item_names_in_section(self, section_name, load=True):
+        """
+        Return the item names of a section, as a view or copy like
+        get_section_names(). With load=False a section the storage hasn't
+        read yet stays unread: its names come straight from storage, as a list.
+        """
+        with self._locks.read(section_name):
+            if not load and isinstance(self.sections, LazySections) and section_name in self.sections:
+                return self.sections.item_names(section_name)
+            section = self.sections.get(section_name)
+            if section is None:
+                return []
+            if self._concurrent:
+                return list(section.items.keys())
+            return section.items.keys()
+
+    def section_names_version(self, section_name):
+        """Changes whenever an item is added to the section."""
+        with self._state_lock:
+            return self._section_versions.get(section_name, 0)
+
+    def match_section_names(self, prefix="", offset=0, limit=None):
+        """
+        Return section names starting with prefix (ignoring case), sorted, one
+        page at a time. The sorted list is cached until a section is added.
+        """
+        cache = self._section_name_cache
+        if cache is None or cache.version != self.names_version:
+            cache = SortedNames(self.names_version, self.get_section_names())
+            self._section_name_cache = cache
+        return cache.matching(prefix, offset, limit)
+
+    def match_item_names(self, section_name, prefix="", offset=0, limit=None):
+        """Like match_section_names, for the items of one section."""
+        if section_name not in self.sections:
+            # Nothing to cache for a missing section; forget one that went away.
+            self._item_name_caches.pop(section_name, None)
+            return []
+        version = self.section_names_version(section_name)
+        cache = self._item_name_caches.get(section_name)
+        if cache is None or cache.version != version:
+            cache = SortedNames(version, self.get_item_names_in_section(section_name))
+            self._item_name_caches[section_name] = cache
+        return cache.matching(prefix, offset, limit)
+
+    # ---- EXPIRY QUERIES ----
+    def expiring_before(self, date):
+        """Return [(expiry, section, item)] for stock expiring before the given date."""
+        return self._get_expiry_index().expiring_before(parse_expiry_date(date))
+
+    def expiring_between(self, start, end):
+        """Return [(expiry, section, item)] for stock expiring between two dates (inclusive)."""
+        index = self._get_expiry_index()
+        return index.expiring_between(parse_expiry_date(start), parse_expiry_date(end))
+
+    def fefo_picks(self, item_name, quantity):
+        """
+        Suggest where to pick an item from, first-expired-first-out.
+
+        Returns [(section, quantity)] taking from the earliest-expiring lots
+        across all sections first; a section appears again if a lot in
+        another section expires between two of its own.
+        """
+        if quantity <= 0:
+            raise ValueError("Quantity must be greater than zero.")
+        lots = []
+        sections = dict.fromkeys(section for _, section in self._get_expiry_index().lots_for_item(item_name))
+        for section in sections:
+            with self._locks.read(section):
+                item = self.sections[section].items[item_name]
+                lots.extend((expiry, section, lot_quantity) for expiry, lot_quantity in item.lots)
+        lots.sort()
+
+        picks = []
+        remaining = quantity
+        for _, section, lot_quantity in lots:
+            take = min(remaining, lot_quantity)
+            if picks and picks[-1][0] == section:
+                picks[-1] = (section, picks[-1][1] + take)
+            else:
+                picks.append((section, take))
+            remaining -= take
+            if remaining == 0:
+                return picks
+        raise ValueError(f"Not enough perishable stock of '{item_name}' to pick {quantity}.")
+
+    def _get_expiry_index(self):
+        # Built on first use so start-up doesn't have to read every section.
+        if self._expiry_index is None:
+            with self._locks.write_all(), self._state_lock:
+                if self._expiry_index is None:
+                    index = ExpiryIndex()
+                    index.rebuild(
+                        (section_name, item.name, item.lots)
+                        for section_name, section in self.sections.items()
+                        for item in section.items.values()
+                    )
+                    self._expiry_index = index
+        return self._expiry_index
+
+    # ---- SEARCH ----
+    def search_items(self, text="", mode="contains", section=None, expiry_bucket=None, offset=0, limit=None):
+        """
+        Return [(section, item)] whose item name contains (or, with
+        mode="prefix", starts with) text, ignoring case, ordered by item name.
+
+        section and expiry_bucket ("YYYY-MM", or SearchIndex.NO_EXPIRY) narrow
+        the results; offset and limit return one page of them.
+        """
+        index = self._get_search_index(section)
+        with self._state_lock:
+            return index.search(text, mode, section, expiry_bucket, offset, limit)
+
+    def is_search_indexed(self, section=None):
+        """Whether searching (one section, or every section) can run without reading any rows first."""
+        with self._state_lock:
+            return not self._unindexed_sections(section)
+
+    def _unindexed_sections(self, section):
+        names = self.get_section_names() if section is None else [section]
+        return [name for name in names if name not in self._search_sections and name in self.sections]
+
+    def _get_search_index(self, section=None):
+        # Sections are indexed the first time a search covers them, so a search
+        # limited to one section leaves the others unread.
+        with self._state_lock:
+            missing = self._unindexed_sections(section)
+        if missing:
+            with self._locks.write_all(), self._state_lock:
+                missing = self._unindexed_sections(section)
+                rows = (
+                    (section_name, item.name, [expiry_date for expiry_date, _ in item.lots])
+                    for section_name in missing
+                    for item in self.sections[section_name].items.values()
+                )
+                if self._search_sections:
+                    for row in rows:
+                        self._search_index.update(*row)
+                else:
+                    self._search_index.rebuild(rows)
+                self._search_sections.update(missing)
+        return self._search_index
+
+    # ---- MOVEMENT HISTORY ----
+    def item_movements(self, item_name, days=30):
+        """Movements of an item over the last days days, oldest first (needs a history)."""
+        if self.history is None:
+            raise ValueError("This inventory doesn't keep a movement history.")
+        return self.history.movements(item=item_name, start=time.time() - days * SECONDS_PER_DAY)
+
+    # ---- FORECASTING ----
+    def update_reorder_forecast(self, days=FORECAST_HISTORY_DAYS, **settings):
+        """
+        Forecast every item's demand from consumption in the movement history
+        over the days whole days before today (see Forecast.forecast() for settings) and
+        keep the reorder levels for suggested_order(). Returns the
+        ReorderForecast. Needs NumPy, which is only imported here.
+        """
+        if self.history is None:
+            raise ValueError("This inventory doesn't keep a movement history.")
+        from Forecast import consumption_matrix, forecast
+
+        yesterday = time.time() - SECONDS_PER_DAY
+        daily = self.history.daily_consumption(yesterday - (days - 1) * SECONDS_PER_DAY, yesterday)
+        items, _, matrix = consumption_matrix(daily)
+        # Totals are read and then kept up to date by _item_changed() only for
+        # the forecast items, so unopened sections aren't loaded to count stock.
+        with self._locks.write_all(), self._state_lock:
+            units = self._item_totals(items)
+            result = forecast(items, matrix, [units[item] for item in items], **settings)
+            self._reorder_levels = result.levels()
+            self._reorder_units = {item: units[item] for item in self._reorder_levels}
+        return result
+
+    def _item_totals(self, item_names):
+        # {item: units across all sections}; called with every section locked. Sections
+        # the storage hasn't loaded are counted from its stored quantities instead.
+        if self._aggregates is not None:
+            return {item: self._aggregates.item_units.get(item, 0) for item in item_names}
+        totals = dict.fromkeys(item_names, 0)
+        lazy = isinstance(self.sections, LazySections)
+        for section_name in list(self.sections):
+            if lazy and not self.sections.is_loaded(section_name):
+                continue
+            items = self.sections[section_name].items
+            for item_name in totals.keys() & items.keys():
+                totals[item_name] += items[item_name].quantity
+        if lazy:
+            for _, item_name, quantity in self.sections.unloaded_quantities():
+                if item_name in totals:
+                    totals[item_name] += quantity
+        return totals
+
+    def suggested_order(self, item_name):
+        """
+        Units of item_name to order now: up to its order-up-to level once its
+        total is at or below the forecast reorder point, otherwise 0 (also
+        when no forecast has been run or the item has no demand).
+        """
+        levels = self._reorder_levels.get(item_name)
+        if levels is None:
+            return 0
+        reorder_point, order_up_to = levels
+        units = self._reorder_units.get(item_name, 0)
+        return max(0, math.ceil(order_up_to - units)) if units <= reorder_point else 0
+
+    # ---- SORTED PAGES ----
+    def sorted_rows(self, order_by="section", descending=False, offset=0, limit=None):
+        """
+        Return [(section, item)] ordered by order_by ("section", "item",
+        "quantity" or "expiry_date"), from offset on, at most limit of them.
+
+        Each column's order is kept up to date as rows change, so a page
+        costs O(limit) however far in it starts. Equal values are ordered
+        by section, then item.
+        """
+        index = self._get_sort_index(order_by)
+        with self._state_lock:
+            return index.page(offset, limit, descending)
+
+    def row_count(self):
+        """Number of (section, item) rows."""
+        with self._state_lock:
+            for index in self._sort_indexes.values():
+                return len(index)
+        return sum(len(section) for section in self.sections.values())
+
+    def _get_sort_index(self, column):
+        index = self._sort_indexes.get(column)
+        if index is None:
+            with self._locks.write_all(), self._state_lock:
+                index = self._sort_indexes.get(column)
+                if index is None:
+                    index = SortIndex(column)
+                    index.rebuild(
+                        (section_name, item.name, item.quantity, item.expiry_date)
+                        for section_name, section in self.sections.items()
+                        for item in section.items.values()
+                    )
+                    self._sort_indexes[column] = index
+        return index
+
+    # ---- AGGREGATES ----
+    def total_units(self):
+        """Units in stock across the whole warehouse."""
+        return self._get_aggregates().total_units
+
+    def section_total(self, section_name):
+        """Units in stock in one section."""
+        return self._get_aggregates().section_units.get(section_name, 0)
+
+    def section_sku_count(self, section_name):
+        """Number of items with stock in one section."""
+        return self._get_aggregates().section_skus.get(section_name, 0)
+
+    def item_total(self, item_name):
+        """Units of an item across all sections."""
+        return self._get_aggregates().item_units.get(item_name, 0)
+
+    def set_reorder_point(self, item_name, threshold):
+        """Flag item_name as low stock once its total falls to threshold (None to clear)."""
+        with self._state_lock:
+            if threshold is None:
+                self._reorder_points.pop(item_name, None)
+            else:
+                self._reorder_points[item_name] = threshold
+            if self._aggregates is not None:
+                self._aggregates.set_reorder_point(item_name, threshold)
+
+    def set_default_reorder_point(self, threshold):
+        """Reorder point for items without their own (None to only track configured items)."""
+        with self._state_lock:
+            self._default_reorder_point = threshold
+            if self._aggregates is not None:
+                self._aggregates.set_default_reorder_point(threshold)
+
+    def is_low_stock(self, item_name):
+        return item_name in self._get_aggregates().low_stock
+
+    def low_stock_count(self):
+        return len(self._get_aggregates().low_stock)
+
+    def low_stock_items(self):
+        """Return a copy of the set of items at or below their reorder point."""
+        aggregates = self._get_aggregates()
+        with self._state_lock:
+            return set(aggregates.low_stock)
+
+    def check_aggregates(self):
+        """Recompute the aggregates from scratch and list any differences (empty if consistent)."""
+        aggregates = self._get_aggregates()
+        with self._locks.write_all(), self._state_lock:
+            return aggregates.differences(self._build_aggregates())
+
+    def _build_aggregates(self):
+        # Callers hold every section lock, so no change is half-applied.
+        aggregates = InventoryAggregates(self._reorder_points, self._default_reorder_point)
+        aggregates.rebuild(
+            (section_name, item.name, item.quantity)
+            for section_name, section in self.sections.items()
+            for item in section.items.values()
+        )
+        return aggregates
+
+    def _get_aggregates(self):
+        # Built on first use, like the expiry index, then kept current by _item_changed.
+        if self._aggregates is None:
+            with self._locks.write_all(), self._state_lock:
+                if self._aggregates is None:
+                    self._aggregates = self._build_aggregates()
+        return self._aggregates
+
+    # ---- PERSISTENCE ----
+    @contextmanager
+    def batch(self):
+        """
+        Group every change this thread makes inside the block into one
+        storage commit, and publish its events together once it is done.
+        Other threads keep committing and publishing their own changes.
+        """
+        with self.events.transaction():
+            self._batch.depth += 1
+            try:
+                yield self
+            finally:
+                self._batch.depth -= 1
+                self._commit()
+
+    def close(self):
+        """Flush pending writes, release the storage backend and let async subscribers catch up."""
+        self.storage.close()
+        self.events.close()
+        if self.history is not None:
+            self.history.close()
+
+    @contextmanager
+    def _hold_all(self):
+        # Keeps every section and item still, for storage snapshots of the whole inventory.
+        with self._locks.write_all(), self._state_lock:
+            yield
+
+    def _commit(self):
+        if self._batch.depth == 0:
+            self.storage.commit()
+            if self.history is not None:
+                self.history.flush()
+
+    def _record_movement(self, item_name, source, target, quantity, reason):
+        if self.history is not None:
+            self.history.record(item_name, source, target, quantity, reason)
+
+    def _record_change(self, section_name, item_name, delta, reason):
+        # A change of one row's quantity: stock into the section when delta > 0, out of it when < 0.
+        if delta > 0:
+            self._record_movement(item_name, None, section_name, delta, reason)
+        elif delta < 0:
+            self._record_movement(item_name, section_name, None, -delta, reason)
+
+    def _item_changed(self, section_name, item_name, old_quantity, reason):
+        # Called with the section's write lock held; old_quantity is None for a new row.
+        # Indexes and aggregates are updated here, under the lock, so reads never see
+        # them disagree with the rows; the returned event is published afterwards.
+        item = self.sections[section_name].items[item_name]
+        lots = item.lots
+        with self._state_lock:
+            if old_quantity is None:
+                self._section_versions[section_name] = self._section_versions.get(section_name, 0) + 1
+            if self._expiry_index is not None:
+                self._expiry_index.update(section_name, item_name, lots)
+            if self._aggregates is not None:
+                self._aggregates.update(section_name, item_name, old_quantity, item.quantity)
+            if item_name in self._reorder_units:
+                self._reorder_units[item_name] += item.quantity - (old_quantity or 0)
+            if section_name in self._search_sections:
+                self._search_index.update(section_name, item_name, [expiry_date for expiry_date, _ in lots])
+            for index in self._sort_indexes.values():
+                index.update(section_name, item_name, item.quantity, item.expiry_date)
+        self.storage.save_item(section_name, item)
+        if old_quantity is None:
+            return ItemAdded(section_name, item_name, item.quantity, reason)
+        return QuantityChanged(section_name, item_name, old_quantity, item.quantity, reason)
+
+    def _changes_applied(self, events):
+        # Called after the section locks are released, so subscribers may read
+        # from (or write to) the manager again.
+        self._commit()
+        self.events.publish(*events)
@@ -0,0 +1,302 @@
+"""
+Headless HTTP/JSON front-end for InventoryManager, for scanners and the WMS.
+
+    python -m InventoryServer serve --host 127.0.0.1 --port 8080 --db warehouse.db
+
+Endpoints (all bodies and responses are JSON):
+
+    GET  /sections                       -> {"sections": [...]}
+    POST /sections  {"name"}
+    GET  /items?section=NAME             -> {"items": [...]}
+    GET  /inventory[?section=NAME]       -> {"rows": [...]} as get_inventory_data()
+    GET  /expiring?before=YYYY-MM-DD     -> {"rows": [[expiry, section, item], ...]}
+    POST /items     {"section", "item", "quantity", "expiry_date"}  add stock
+    PUT  /items     {"section", "item", "quantity"}                 set quantity
+    POST /moves     {"source", "target", "item", "quantity"}        transfer
+
+Writes from every connection are queued and applied together once per
+event-loop tick inside one InventoryManager.batch(), so a burst of scans
+costs one storage commit. When more than max_pending_writes are queued the
+server answers 503 with Retry-After instead of buffering without limit.
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from InventoryManagement import InventoryManager
+from Storage import SQLiteStorage
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class InventoryServer:
+    def __init__(self, inventory_manager, host="127.0.0.1", port=8080,
+                 max_pending_writes=10000, idle_timeout=30):
+        self.inventory_manager = inventory_manager
+        self.host = host
+        self.port = port
+        self.max_pending_writes = max_pending_writes
+        self.idle_timeout = idle_timeout
+        self._server = None
+        self._connections = {}  # handler task -> stream writer
+        self._pending_writes = []
+        self._flush_scheduled = False
+        self.routes = {
+            ("GET", "/sections"): self.get_sections,
+            ("POST", "/sections"): self.add_section,
+            ("GET", "/items"): self.get_items,
+            ("POST", "/items"): self.add_item,
+            ("PUT", "/items"): self.set_quantity,
+            ("GET", "/inventory"): self.get_inventory,
+            ("GET", "/expiring"): self.get_expiring,
+            ("POST", "/moves"): self.move_item,
+        }
+
+    # ---- LIFECYCLE ----
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting, close open keep-alive connections and apply queued writes."""
+        self._server.close()
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._flush_writes()
+
+    # ---- HTTP ----
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.idle_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, path, query, body, keep_alive = request
+                status, payload = await self._dispatch(method, path, query, body)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None  # client closed a keep-alive connection
+            raise
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "Request headers too large.") from None
+
+        request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+        try:
+            method, target, version = request_line.split(" ")
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.") from None
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.") from None
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return method, url.path, query, body, keep_alive
+
+    async def _dispatch(self, method, path, query, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {"error": f"{method} not allowed on {path}."}
+            return 404, {"error": f"No such endpoint: {path}"}
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError("Request body must be a JSON object.")
+            return 200, await handler(query, data)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = [
+            f"HTTP/1.1 {status} {REASONS[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+    # ---- WRITE BATCHING ----
+    def _submit_write(self, operation):
+        """Queue operation() for the next flush and return a future for its result."""
+        if len(self._pending_writes) >= self.max_pending_writes:
+            raise HTTPError(503, "Server busy, retry shortly.")
+        future = asyncio.get_running_loop().create_future()
+        self._pending_writes.append((operation, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_writes)
+        return future
+
+    def _flush_writes(self):
+        """Apply every queued write in one batch (one storage commit)."""
+        self._flush_scheduled = False
+        pending, self._pending_writes = self._pending_writes, []
+        if not pending:
+            return
+        with self.inventory_manager.batch():
+            for operation, future in pending:
+                try:
+                    result = operation()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+
+    # ---- HANDLERS ----
+    async def get_sections(self, query, data):
+        return {"sections": list(self.inventory_manager.get_section_names())}
+
+    async def add_section(self, query, data):
+        name = _required(data, "name")
+        await self._submit_write(lambda: self.inventory_manager.add_section(name))
+        return {"section": name}
+
+    async def get_items(self, query, data):
+        section = _required(query, "section")
+        if section not in self.inventory_manager.sections:
+            raise HTTPError(404, f"Section '{section}' not found.")
+        return {"items": list(self.inventory_manager.get_item_names_in_section(section))}
+
+    async def get_inventory(self, query, data):
+        return {"rows": self.inventory_manager.get_inventory_data(section=query.get("section"))}
+
+    async def get_expiring(self, query, data):
+        rows = self.inventory_manager.expiring_before(_required(query, "before"))
+        return {"rows": [[expiry.isoformat(), section, item] for expiry, section, item in rows]}
+
+    async def add_item(self, query, data):
+        section = _required(data, "section")
+        item = _required(data, "item")
+        quantity = _quantity(data)
+        expiry = data.get("expiry_date")
+
+        def operation():
+            self.inventory_manager.add_section(section)
+            self.inventory_manager.add_item(section, item, quantity, expiry)
+            return self.inventory_manager.get_item(section, item).quantity
+
+        return {"section": section, "item": item, "quantity": await self._submit_write(operation)}
+
+    async def set_quantity(self, query, data):
+        section = _required(data, "section")
+        item = _required(data, "item")
+        quantity = _quantity(data, allow_zero=True)
+        await self._submit_write(lambda: self.inventory_manager.modify_item_quantity(section, item, quantity))
+        return {"section": section, "item": item, "quantity": quantity}
+
+    async def move_item(self, query, data):
+        source = _required(data, "source")
+        target = _required(data, "target")
+        item = _required(data, "item")
+        quantity = _quantity(data)
+        await self._submit_write(lambda: self.inventory_manager.transfer(source, target, item, quantity))
+        return {"source": source, "target": target, "item": item, "quantity": quantity}
+
+
+def _required(data, field):
+    value = data.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"'{field}' is required.")
+    return value.strip()
+
+
+def _quantity(data, allow_zero=False):
+    quantity = data.get("quantity")
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+        raise ValueError("Quantity must be a positive integer.")
+    if quantity == 0 and not allow_zero:
+        raise ValueError("Quantity must be greater than zero.")
+    return quantity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory HTTP/JSON server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="run the server until interrupted")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--db", default="warehouse.db", help="SQLite file (use :memory: for none)")
+    args = parser.parse_args()
+
+    inventory_manager = InventoryManager(SQLiteStorage(args.db))
+    server = InventoryServer(inventory_manager, args.host, args.port)
+    print(f"Serving inventory on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        inventory_manager.close()
+
+
+if __name__ == "__main__":
+    main()
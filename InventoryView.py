@@ -0,0 +1,136 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import chain, repeat
+
+COLUMNS = ("section", "item", "quantity", "expiry_date")
+InventoryRow = namedtuple("InventoryRow", COLUMNS)
+EPOCH_ORDINAL = 719163      # datetime.date(1970, 1, 1).toordinal()
+NAT = -2 ** 63              # datetime64 "not a time"
+
+
+@lru_cache(maxsize=None)
+def _row_type(columns):
+    return InventoryRow if columns == COLUMNS else namedtuple("InventoryRow", columns)
+
+
+class InventoryView:
+    """
+    Read-only rows of the inventory as (section, item, quantity, expiry_date)
+    tuples, or just the chosen columns in the order given.
+
+    Nothing is copied up front. Iteration captures one section at a time
+    under its read lock, so each section is seen in a consistent state and
+    only that section's values are held while its rows are handed out.
+    expiry_date is a datetime.date, or None for items that don't expire.
+
+    An item's row has its total quantity and earliest expiry date; with
+    by_lot=True a perishable item with several lots gives one row per lot
+    instead, so every lot keeps its own date (as exports need).
+    """
+    def __init__(self, sections, locks, columns=None, section=None, named=False, by_lot=False):
+        columns = COLUMNS if columns is None else tuple(columns)
+        unknown = [column for column in columns if column not in COLUMNS]
+        if unknown or not columns:
+            raise ValueError(f"Unknown columns {unknown}: choose from {', '.join(COLUMNS)}.")
+        self.columns = columns
+        self.section = section
+        self.named = named
+        self.by_lot = by_lot
+        self._sections = sections
+        self._locks = locks
+
+    def _section_names(self):
+        if self.section is not None:
+            return [self.section]
+        return list(self._sections)
+
+    def _capture(self, section_name):
+        """Return (row count, {column: values}) for one section, read under its lock."""
+        with self._locks.read(section_name):
+            section = self._sections.get(section_name)
+            if section is None:
+                return 0, {}
+            items = section.items
+            if self.by_lot and any(item.lot_count > 1 for item in items.values()):
+                return self._capture_lots(items)
+            values = {}
+            if "item" in self.columns:
+                values["item"] = list(items)
+            if "quantity" in self.columns:
+                values["quantity"] = [item.quantity for item in items.values()]
+            if "expiry_date" in self.columns:
+                values["expiry_date"] = [item.expiry_date for item in items.values()]
+            return len(items), values
+
+    def _capture_lots(self, items):
+        rows = []
+        for name, item in items.items():
+            if item.lot_count == 1:
+                rows.append((name, item.quantity, item.expiry_date))
+            else:
+                rows.extend((name, quantity, expiry_date) for expiry_date, quantity in item.lots)
+        names, quantities, expiry_dates = zip(*rows)
+        values = {"item": names, "quantity": quantities, "expiry_date": expiry_dates}
+        return len(rows), {column: values[column] for column in self.columns if column in values}
+
+    def __iter__(self):
+        make = _row_type(self.columns)._make if self.named else None
+        for section_name in self._section_names():
+            count, values = self._capture(section_name)
+            if not count:
+                continue
+            values["section"] = repeat(section_name, count)
+            rows = zip(*[values[column] for column in self.columns])
+            yield from rows if make is None else map(make, rows)
+
+    def __len__(self):
+        total = 0
+        for section_name in self._section_names():
+            with self._locks.read(section_name):
+                section = self._sections.get(section_name)
+                if section is None:
+                    continue
+                if self.by_lot:
+                    total += sum(item.lot_count for item in section.items.values())
+                else:
+                    total += len(section)
+        return total
+
+    def to_numpy(self):
+        """
+        Copy the selected columns into a NumPy structured array, for analytics.
+
+        Names become fixed-width unicode, quantity int64 and expiry_date
+        datetime64[D] (NaT when there is none). NumPy is only imported here.
+        """
+        import numpy as np
+
+        counts, section_names, captured = [], [], {column: [] for column in self.columns}
+        for section_name in self._section_names():
+            count, values = self._capture(section_name)
+            if not count:
+                continue
+            counts.append(count)
+            section_names.append(section_name)
+            for column, column_values in values.items():
+                captured[column].append(column_values)
+
+        total = sum(counts)
+        arrays = {}
+        for column in self.columns:
+            if column == "section":
+                arrays[column] = np.repeat(np.array(section_names, dtype=str), counts)
+            elif column == "quantity":
+                arrays[column] = np.fromiter(chain.from_iterable(captured[column]), dtype=np.int64, count=total)
+            elif column == "expiry_date":
+                # Day numbers since 1970-01-01; NumPy's own date conversion is over ten times slower.
+                days = (NAT if date is None else date.toordinal() - EPOCH_ORDINAL
+                        for date in chain.from_iterable(captured[column]))
+                arrays[column] = np.fromiter(days, dtype=np.int64, count=total).view("datetime64[D]")
+            else:
+                arrays[column] = np.array(list(chain.from_iterable(captured[column])), dtype=str)
+
+        result = np.empty(total, dtype=[(column, arrays[column].dtype) for column in self.columns])
+        for column, array in arrays.items():
+            result[column] = array
+        return result
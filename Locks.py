@@ -0,0 +1,99 @@
+import threading
+from contextlib import contextmanager, nullcontext
+
+DEFAULT_STRIPES = 64
+
+
+class ReadWriteLock:
+    """Many readers or one writer. Waiting writers hold off new readers so they can't starve."""
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class SectionLocks:
+    """
+    Read/write locks keyed by section name.
+
+    Sections are hashed onto a fixed number of stripes, so memory stays
+    bounded however many sections exist while unrelated sections rarely
+    share a lock. Locks are not re-entrant.
+    """
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        self._stripes = [ReadWriteLock() for _ in range(stripes)]
+
+    def _stripe_numbers(self, section_names):
+        # Always lock in stripe order so two multi-section writers can't deadlock.
+        return sorted({hash(name) % len(self._stripes) for name in section_names})
+
+    @contextmanager
+    def read(self, section_name):
+        lock = self._stripes[hash(section_name) % len(self._stripes)]
+        lock.acquire_read()
+        try:
+            yield
+        finally:
+            lock.release_read()
+
+    @contextmanager
+    def write(self, *section_names):
+        locks = [self._stripes[number] for number in self._stripe_numbers(section_names)]
+        for lock in locks:
+            lock.acquire_write()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release_write()
+
+    @contextmanager
+    def write_all(self):
+        """Exclude every writer, e.g. while building an index from the whole inventory."""
+        for lock in self._stripes:
+            lock.acquire_write()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._stripes):
+                lock.release_write()
+
+
+class NoLocks:
+    """Stand-in for SectionLocks when the manager is only used from one thread."""
+    _unlocked = nullcontext()
+
+    def read(self, section_name):
+        return self._unlocked
+
+    def write(self, *section_names):
+        return self._unlocked
+
+    def write_all(self):
+        return self._unlocked
@@ -0,0 +1,226 @@
+"""
+Operation counters and latency histograms, plus on-demand profiling.
+
+Metrics start disabled. While disabled, instrument() only records which
+methods to time, so the app runs its normal code with no extra calls;
+enable() swaps in timing wrappers and disable() puts the originals back.
+
+    WAREHOUSE_METRICS=1          enable at start-up
+    WAREHOUSE_METRICS_FILE=PATH  Prometheus text file to export to (metrics.prom)
+    WAREHOUSE_PROFILE=cpu|memory capture a cProfile / tracemalloc report from start-up
+"""
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_ENV = "WAREHOUSE_METRICS"
+METRICS_FILE_ENV = "WAREHOUSE_METRICS_FILE"
+PROFILE_ENV = "WAREHOUSE_PROFILE"
+DEFAULT_METRICS_FILE = "metrics.prom"
+
+# Histogram bucket upper bounds in seconds: 1 us to about 2 minutes, each
+# 19% (2 ** 0.25) above the last, so percentiles are within ~19%.
+BUCKETS = tuple(1e-6 * 2 ** (i / 4) for i in range(108))
+# Prometheus export only lists every 4th bound (doubling), which is plenty for dashboards.
+EXPORT_EVERY = 4
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Counts of observed durations per bucket; percentiles are read back as bucket bounds."""
+    __slots__ = ("count", "total", "counts")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.counts = [0] * (len(BUCKETS) + 1)   # the last slot is for anything slower than BUCKETS[-1]
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations (None if empty)."""
+        if not self.count:
+            return None
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """Per-operation call counts, error counts and latency histograms."""
+    def __init__(self, enabled=False):
+        self.enabled = False
+        self.counters = {}     # name -> count
+        self.latencies = {}    # operation -> LatencyHistogram
+        self._lock = threading.Lock()
+        self._instrumented = []   # (target, method name, operation)
+        self._originals = {}      # (id(target), method name) -> (target, original, was_own_attribute)
+        if enabled:
+            self.enable()
+
+    @classmethod
+    def from_environment(cls):
+        return cls(enabled=os.environ.get(METRICS_ENV, "") not in ("", "0"))
+
+    # ---- RECORDING ----
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, operation, seconds):
+        with self._lock:
+            histogram = self.latencies.get(operation)
+            if histogram is None:
+                histogram = self.latencies[operation] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def instrument(self, target, method_names, prefix):
+        """
+        Time target's methods as "<prefix>.<method>". target may be an
+        object or a class; instrumenting a class also times methods that
+        its instances hand to Tk as button commands while metrics are on.
+        """
+        for name in method_names:
+            self._instrumented.append((target, name, f"{prefix}.{name}"))
+            if self.enabled:
+                self._wrap(target, name, f"{prefix}.{name}")
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for target, name, operation in self._instrumented:
+            self._wrap(target, name, operation)
+
+    def disable(self):
+        """Restore the original methods and stop recording (what was recorded is kept)."""
+        self.enabled = False
+        for (_, name), (target, original, was_own_attribute) in self._originals.items():
+            if was_own_attribute:
+                setattr(target, name, original)
+            else:
+                delattr(target, name)
+        self._originals = {}
+
+    def _wrap(self, target, name, operation):
+        original = getattr(target, name)
+        self._originals[(id(target), name)] = (target, original, name in vars(target))
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            except Exception:
+                self.count(f"{operation}.errors")
+                raise
+            finally:
+                self.observe(operation, time.perf_counter() - start)
+
+        setattr(target, name, timed)
+
+    # ---- READING / EXPORT ----
+    def summary(self):
+        """Return [(operation, calls, errors, p50, p95, p99)] with times in seconds, sorted by operation."""
+        with self._lock:
+            rows = []
+            for operation, histogram in sorted(self.latencies.items()):
+                rows.append((
+                    operation,
+                    histogram.count,
+                    self.counters.get(f"{operation}.errors", 0),
+                    *(histogram.percentile(fraction) for fraction in PERCENTILES),
+                ))
+        return rows
+
+    def to_prometheus(self):
+        """The metrics in Prometheus text exposition format."""
+        lines = [
+            "# HELP warehouse_operation_seconds Time taken by inventory and UI operations.",
+            "# TYPE warehouse_operation_seconds histogram",
+        ]
+        with self._lock:
+            for operation, histogram in sorted(self.latencies.items()):
+                label = f'operation="{operation}"'
+                cumulative = 0
+                for index, count in enumerate(histogram.counts[:-1]):
+                    cumulative += count
+                    if index % EXPORT_EVERY == EXPORT_EVERY - 1:
+                        lines.append(f'warehouse_operation_seconds_bucket{{{label},le="{BUCKETS[index]:.6g}"}} {cumulative}')
+                lines.append(f'warehouse_operation_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"warehouse_operation_seconds_sum{{{label}}} {histogram.total:.9f}")
+                lines.append(f"warehouse_operation_seconds_count{{{label}}} {histogram.count}")
+            lines.append("# HELP warehouse_events_total Counted events, such as failed operations.")
+            lines.append("# TYPE warehouse_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'warehouse_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Write to_prometheus() to path atomically (for a node_exporter textfile collector); returns the path."""
+        path = path or os.environ.get(METRICS_FILE_ENV, DEFAULT_METRICS_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(path + ".tmp", path)
+        return path
+
+
+class Profiler:
+    """
+    Captures a cProfile ("cpu") or tracemalloc ("memory") report between
+    start() and stop(). cProfile only sees the thread that called start().
+    """
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.kind = None
+        self._profile = None
+
+    @property
+    def running(self):
+        return self.kind is not None
+
+    def start(self, kind):
+        if kind not in ("cpu", "memory"):
+            raise ValueError(f"Unknown profile kind '{kind}' (use 'cpu' or 'memory').")
+        if self.running:
+            raise ValueError(f"A {self.kind} profile is already running.")
+        # Imported here rather than at the top so they don't slow down start-up.
+        if kind == "cpu":
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            import tracemalloc
+            tracemalloc.start(25)
+        self.kind = kind
+
+    def stop(self):
+        """Stop capturing and write the report; returns its path."""
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.kind == "cpu":
+            self._profile.disable()
+            path = os.path.join(self.directory, f"profile-{stamp}.prof")
+            self._profile.dump_stats(path)
+            self._profile = None
+        elif self.kind == "memory":
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            path = os.path.join(self.directory, f"memory-{stamp}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                for statistic in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{statistic}\n")
+        else:
+            raise ValueError("No profile is running.")
+        self.kind = None
+        return path
@@ -0,0 +1,338 @@
+"""
+Append-only history of stock movements, for audits.
+
+Every add, removal, count adjustment and move between sections is one
+Movement line in the segment file for its (UTC) day. Each segment has an
+index of line offsets by item and by section, so "movements of item X in the
+last 30 days" reads the index of 30 segments and then only the matching
+lines. compact() rolls segments older than a cut-off into gzipped daily
+summaries of units in and out per item and section.
+
+Each day also keeps how many units of each item were consumed (see
+consumed_units()), for forecasting; those files are kept by compact().
+
+Directory layout:
+
+    2025-03-01.jsonl            movements, one JSON array per line
+    2025-03-01.idx              (length, items, sections, consumed) offsets and totals (pickle)
+    2025-03-01.consumed.json    {item: units consumed}, written when the day's segment is sealed
+    2025-02-01.summary.json.gz  compacted day: [[item, section, units in, units out, movements]]
+"""
+import datetime
+import getpass
+import gzip
+import json
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+SUMMARY_SUFFIX = ".summary.json.gz"
+CONSUMED_SUFFIX = ".consumed.json"
+SECONDS_PER_DAY = 86400
+
+# source is None for stock coming in, target is None for stock going out.
+Movement = namedtuple("Movement", "timestamp item source target quantity reason user")
+DailySummary = namedtuple("DailySummary", "day item section units_in units_out movements")
+
+
+def segment_day(timestamp):
+    """The UTC day a time.time() timestamp falls in, as YYYY-MM-DD (the segment name)."""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+def consumed_units(source, target, quantity, reason, outbound_sections=()):
+    """
+    Units of a movement that count as consumption: stock removed from the
+    warehouse or moved into an outbound (e.g. dispatch) section. Count
+    adjustments are corrections, not demand.
+
+    Undo and redo log each row's change on its own, with reasons such as
+    "undo:remove" naming the change reversed: only reversed removals and
+    moves into or out of an outbound section change consumption.
+    """
+    _, _, original = reason.partition(":")
+    if original == "remove":
+        return quantity if target is None else -quantity
+    if original == "move":
+        if (target if source is None else source) not in outbound_sections:
+            return 0
+        return quantity if source is None else -quantity
+    if target is None:
+        return quantity if reason == "remove" else 0
+    if source is None:
+        return 0
+    return quantity if target in outbound_sections and source not in outbound_sections else 0
+
+
+def _day_range(start, end):
+    day = datetime.date.fromisoformat(segment_day(start))
+    last = datetime.date.fromisoformat(segment_day(end))
+    while day <= last:
+        yield day.isoformat()
+        day += datetime.timedelta(days=1)
+
+
+class SegmentIndex:
+    """
+    Line offsets of one segment by item and by section, and units consumed
+    per item; length is how much of the file it covers.
+    """
+    __slots__ = ("length", "items", "sections", "consumed")
+
+    def __init__(self):
+        self.length = 0
+        self.items = {}      # item -> [offset]
+        self.sections = {}   # section -> [offset]
+        self.consumed = {}   # item -> units
+
+    def add(self, offset, item, source, target, consumed=0):
+        if consumed:
+            self.consumed[item] = self.consumed.get(item, 0) + consumed
+        self.items.setdefault(item, []).append(offset)
+        for section in (source, target):
+            if section is not None:
+                offsets = self.sections.setdefault(section, [])
+                if not offsets or offsets[-1] != offset:
+                    offsets.append(offset)
+
+    def offsets(self, item=None, section=None):
+        """Offsets of the lines for item and/or section, ascending (None if every line matches)."""
+        if item is None and section is None:
+            return None
+        if section is None:
+            return self.items.get(item, [])
+        if item is None:
+            return self.sections.get(section, [])
+        in_section = set(self.sections.get(section, ()))
+        return [offset for offset in self.items.get(item, []) if offset in in_section]
+
+
+class MovementHistory:
+    """
+    Movement log kept in directory. record() only appends to a buffer;
+    InventoryManager calls flush() when it commits, so a burst of changes
+    costs one write. Pass fsync=True to also fsync on every flush.
+    Moves into outbound_sections count as consumption.
+    """
+    def __init__(self, directory, user=None, fsync=False, outbound_sections=()):
+        self.directory = directory
+        self.user = user or getpass.getuser()
+        self.fsync = fsync
+        self.outbound_sections = frozenset(outbound_sections)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._day = None
+        self._file = None
+        self._index = None
+        self._indexes = {}   # day -> SegmentIndex of sealed segments read so far
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, day, suffix):
+        return os.path.join(self.directory, day + suffix)
+
+    def days(self, suffix=SEGMENT_SUFFIX):
+        """Days that have a segment (or, with SUMMARY_SUFFIX, a summary), oldest first."""
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.directory) if name.endswith(suffix))
+
+    # ---- WRITING ----
+    def record(self, item, source, target, quantity, reason, timestamp=None):
+        """Add a movement of quantity units of item from source to target (either may be None)."""
+        movement = Movement(timestamp or time.time(), item, source, target, quantity, reason, self.user)
+        with self._lock:
+            self._buffer.append(movement)
+
+    def flush(self):
+        """Append the buffered movements to their day's segment."""
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+            for movement in buffer:
+                day = segment_day(movement.timestamp)
+                if day != self._day:
+                    self._open_segment(day)
+                line = (json.dumps(movement, separators=(",", ":")) + "\n").encode()
+                consumed = consumed_units(
+                    movement.source, movement.target, movement.quantity, movement.reason, self.outbound_sections
+                )
+                self._index.add(self._index.length, movement.item, movement.source, movement.target, consumed)
+                self._index.length += len(line)
+                self._file.write(line)
+            if buffer:
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+
+    def _open_segment(self, day):
+        # Called with the lock held whenever a movement belongs to another day than the open segment.
+        self._seal()
+        self._index = self._load_index(day)
+        self._indexes.pop(day, None)
+        self._file = open(self._path(day, SEGMENT_SUFFIX), "ab")
+        if self._file.tell() > self._index.length:
+            self._file.truncate(self._index.length)   # a torn line from a crash mid-write
+        self._day = day
+
+    def _seal(self):
+        """Close the open segment and save its index, so it's never scanned again."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._save_index(self._day, self._index)
+        self._save_consumed(self._day, self._index.consumed)
+        self._indexes[self._day] = self._index
+        self._file = self._index = self._day = None
+
+    def _save_index(self, day, index):
+        path = self._path(day, INDEX_SUFFIX)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(
+                (index.length, index.items, index.sections, index.consumed), f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(path + ".tmp", path)
+
+    def _save_consumed(self, day, consumed):
+        path = self._path(day, CONSUMED_SUFFIX)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(consumed, f)
+        os.replace(path + ".tmp", path)
+
+    def _load_index(self, day):
+        """The segment's saved index, brought up to date with any lines written after it."""
+        index = SegmentIndex()
+        try:
+            with open(self._path(day, INDEX_SUFFIX), "rb") as f:
+                index.length, index.items, index.sections, index.consumed = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self._path(day, SEGMENT_SUFFIX), "rb") as f:
+                f.seek(index.length)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    _, item, source, target, quantity, reason, _ = json.loads(line)
+                    consumed = consumed_units(source, target, quantity, reason, self.outbound_sections)
+                    index.add(index.length, item, source, target, consumed)
+                    index.length += len(line)
+        except FileNotFoundError:
+            pass
+        return index
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._seal()
+
+    # ---- QUERIES ----
+    def movements(self, item=None, section=None, start=None, end=None):
+        """
+        Return the Movements of item and/or section (into or out of it) between
+        the start and end time.time() timestamps inclusive, oldest first.
+        Compacted days are only in daily_summaries().
+        """
+        self.flush()
+        end = time.time() if end is None else end
+        if start is None:
+            days = self.days()
+        else:
+            existing = set(self.days())
+            days = [day for day in _day_range(start, end) if day in existing]
+
+        results = []
+        for day in days:
+            with self._lock:
+                index = self._index if day == self._day else self._indexes.get(day)
+                if index is None:
+                    index = self._indexes[day] = self._load_index(day)
+                offsets = index.offsets(item, section)
+                length = index.length
+            results.extend(self._read(day, offsets, length))
+        start = float("-inf") if start is None else start
+        return [movement for movement in results if start <= movement.timestamp <= end]
+
+    def daily_consumption(self, start, end=None):
+        """Return [(day, {item: units consumed})] for every day from start to end, oldest first."""
+        self.flush()
+        result = []
+        for day in _day_range(start, time.time() if end is None else end):
+            with self._lock:
+                index = self._index if day == self._day else None
+                consumed = None if index is None else dict(index.consumed)
+            if consumed is None:
+                try:
+                    with open(self._path(day, CONSUMED_SUFFIX), encoding="utf-8") as f:
+                        consumed = json.load(f)
+                except FileNotFoundError:
+                    # Not sealed (e.g. the app stopped without closing it): count from the segment.
+                    consumed = self._load_index(day).consumed if os.path.exists(self._path(day, SEGMENT_SUFFIX)) else {}
+            result.append((day, consumed))
+        return result
+
+    def _read(self, day, offsets, length):
+        with open(self._path(day, SEGMENT_SUFFIX), "rb") as f:
+            if offsets is None:
+                lines = f.read(length).decode().splitlines()
+            else:
+                lines = []
+                for offset in offsets:
+                    f.seek(offset)
+                    lines.append(f.readline().decode())
+        return [Movement(*json.loads(line)) for line in lines]
+
+    # ---- COMPACTION ----
+    def compact(self, before):
+        """
+        Replace the segments of days before the given time.time() timestamp
+        with daily summaries; returns the days compacted.
+        """
+        self.flush()
+        cutoff = segment_day(before)
+        compacted = []
+        for day in self.days():
+            if day >= cutoff:
+                break
+            with self._lock:
+                if day == self._day:
+                    self._seal()
+                self._indexes.pop(day, None)
+            totals = {}   # (item, section) -> [units in, units out, movements]
+            consumed = {}
+            for movement in self._read(day, None, os.path.getsize(self._path(day, SEGMENT_SUFFIX))):
+                for section, direction in ((movement.target, 0), (movement.source, 1)):
+                    if section is not None:
+                        row = totals.setdefault((movement.item, section), [0, 0, 0])
+                        row[direction] += movement.quantity
+                        row[2] += 1
+                units = consumed_units(
+                    movement.source, movement.target, movement.quantity, movement.reason, self.outbound_sections
+                )
+                if units:
+                    consumed[movement.item] = consumed.get(movement.item, 0) + units
+            path = self._path(day, SUMMARY_SUFFIX)
+            summary = json.dumps([[item, section, *row] for (item, section), row in sorted(totals.items())])
+            with open(path + ".tmp", "wb") as f:
+                f.write(gzip.compress(summary.encode(), compresslevel=6))
+            os.replace(path + ".tmp", path)
+            if not os.path.exists(self._path(day, CONSUMED_SUFFIX)):
+                self._save_consumed(day, consumed)   # the day was never sealed
+            os.remove(self._path(day, SEGMENT_SUFFIX))
+            if os.path.exists(self._path(day, INDEX_SUFFIX)):
+                os.remove(self._path(day, INDEX_SUFFIX))
+            compacted.append(day)
+        return compacted
+
+    def daily_summaries(self, item=None, section=None, start=None, end=None):
+        """Return DailySummary rows of compacted days between two timestamps, oldest day first."""
+        first = "" if start is None else segment_day(start)
+        last = segment_day(time.time() if end is None else end)
+        rows = []
+        for day in self.days(SUMMARY_SUFFIX):
+            if first <= day <= last:
+                with gzip.open(self._path(day, SUMMARY_SUFFIX), "rt", encoding="utf-8") as f:
+                    for row in json.load(f):
+                        if (item is None or row[0] == item) and (section is None or row[1] == section):
+                            rows.append(DailySummary(day, *row))
+        return rows
@@ -0,0 +1,30 @@
+from bisect import bisect_left
+
+
+class SortedNames:
+    """
+    Snapshot of names sorted case-insensitively, for type-ahead pickers.
+
+    version records the InventoryManager names version it was built from, so
+    the manager can tell when a rebuild is due. Snapshots are never changed
+    after they are built, so readers on any thread can share them.
+    """
+    __slots__ = ("version", "_names", "_lowered")
+
+    def __init__(self, version, names):
+        pairs = sorted((name.lower(), name) for name in names)
+        self.version = version
+        self._lowered = [lowered for lowered, _ in pairs]
+        self._names = [name for _, name in pairs]
+
+    def __len__(self):
+        return len(self._names)
+
+    def matching(self, prefix="", offset=0, limit=None):
+        """Return names starting with prefix (ignoring case), from offset on, at most limit of them."""
+        prefix = prefix.strip().lower()
+        low = bisect_left(self._lowered, prefix)
+        high = bisect_left(self._lowered, prefix + "\U0010ffff") if prefix else len(self._lowered)
+        start = low + offset
+        stop = high if limit is None else min(high, start + limit)
+        return self._names[start:stop]
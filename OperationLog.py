@@ -0,0 +1,269 @@
+"""
+Write-ahead operation log storage for InventoryManager.
+
+Every section and item change is appended to a binary log segment, and
+commit() writes the buffered records with a single fsync (group commit).
+snapshot() starts a new segment and saves the full state next to it, so
+recovery loads the newest snapshot and only replays the segments after it.
+Old segments are kept until prune() is called, which lets load_state_at()
+rebuild the inventory as it was at any earlier moment for audits.
+
+Directory layout:
+
+    segment-000001.log   records: header <op, timestamp, length>, payload, crc32
+    snapshot-000002.pkl  state at the start of segment 2, as plain columns per section
+    segment-000002.log
+"""
+import gc
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+
+from RegularItems import PerishableItem
+from Sections import InventorySection, load_item, new_item, stored_expiry
+
+OP_SECTION = 1
+OP_ITEM = 2
+HEADER = struct.Struct("<BdI")      # op code, timestamp, payload length
+ITEM = struct.Struct("<qHH")        # quantity, section name length, item name length
+CRC = struct.Struct("<I")
+
+
+# ---- RECORD ENCODING ----
+def encode_record(op, timestamp, payload):
+    record = HEADER.pack(op, timestamp, len(payload)) + payload
+    return record + CRC.pack(zlib.crc32(record))
+
+
+def encode_item(section_name, item_name, quantity, expiry_date):
+    section = section_name.encode()
+    item = item_name.encode()
+    expiry = expiry_date.encode() if expiry_date else b""
+    return ITEM.pack(quantity, len(section), len(item)) + section + item + expiry
+
+
+def decode_records(data):
+    """Yield (op, timestamp, payload, end offset) until the data ends or a torn record is found."""
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        op, timestamp, length = HEADER.unpack_from(data, offset)
+        end = offset + HEADER.size + length + CRC.size
+        if end > len(data):
+            return
+        (crc,) = CRC.unpack_from(data, end - CRC.size)
+        if crc != zlib.crc32(data[offset:end - CRC.size]):
+            return
+        yield op, timestamp, data[offset + HEADER.size:end - CRC.size], end
+        offset = end
+
+
+def apply_record(sections, op, payload):
+    if op == OP_SECTION:
+        name = payload.decode()
+        if name not in sections:
+            sections[name] = InventorySection(name)
+    elif op == OP_ITEM:
+        quantity, section_length, item_length = ITEM.unpack_from(payload)
+        start = ITEM.size
+        section_name = payload[start:start + section_length].decode()
+        item_name = payload[start + section_length:start + section_length + item_length].decode()
+        section = sections.get(section_name)
+        if section is None:
+            section = sections[section_name] = InventorySection(section_name)
+        # Each record carries the row's whole state (its lots included), so it replaces the item.
+        expiry = payload[start + section_length + item_length:].decode() or None
+        section.items[item_name] = load_item(item_name, quantity, expiry)
+
+
+# ---- FILES ----
+def _numbered_files(directory, prefix, suffix):
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            numbers.append(int(name[len(prefix):-len(suffix)]))
+    return sorted(numbers)
+
+
+def _segment_path(directory, number):
+    return os.path.join(directory, f"segment-{number:06d}.log")
+
+
+def _snapshot_path(directory, number):
+    return os.path.join(directory, f"snapshot-{number:06d}.pkl")
+
+
+def _snapshot_columns(sections):
+    # Plain lists pickle several times faster than a million slotted item objects.
+    # The fourth column holds {item name: lots} for the few items with more than one lot.
+    return {
+        name: (
+            list(section.items),
+            [item.quantity for item in section.items.values()],
+            [item.expiry_date for item in section.items.values()],
+            {item.name: item.lots for item in section.items.values() if item.lot_count > 1},
+        )
+        for name, section in sections.items()
+    }
+
+
+def _read_snapshot(directory, number):
+    """Return (timestamp, {section name: InventorySection}) from a snapshot file."""
+    with open(_snapshot_path(directory, number), "rb") as f:
+        snapshot = pickle.load(f)
+    sections = {}
+    # Building a million items would otherwise set off dozens of pointless cyclic GC passes.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for name, (item_names, quantities, expiry_dates, *lots) in snapshot["sections"].items():
+            section = sections[name] = InventorySection(name)
+            section.items = dict(zip(item_names, map(new_item, item_names, quantities, expiry_dates)))
+            # Snapshots written before lot tracking have three columns.
+            for item_name, item_lots in (lots[0] if lots else {}).items():
+                section.items[item_name] = PerishableItem.from_lots(item_name, item_lots)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return snapshot["timestamp"], sections
+
+
+def _replay_segments(directory, sections, first_segment, until=None):
+    """Replay segments from first_segment on; returns (last segment, good length of it)."""
+    last_segment, good_length = first_segment, 0
+    for number in _numbered_files(directory, "segment-", ".log"):
+        if number < first_segment:
+            continue
+        with open(_segment_path(directory, number), "rb") as f:
+            data = f.read()
+        last_segment, good_length = number, 0
+        for op, timestamp, payload, end in decode_records(data):
+            if until is not None and timestamp > until:
+                return last_segment, good_length
+            apply_record(sections, op, payload)
+            good_length = end
+    return last_segment, good_length
+
+
+def load_state_at(directory, when):
+    """Return {section name: InventorySection} as it was at the given time.time() timestamp."""
+    sections, first_segment = {}, None
+    for number in reversed(_numbered_files(directory, "snapshot-", ".pkl")):
+        timestamp, snapshot_sections = _read_snapshot(directory, number)
+        if timestamp <= when:
+            sections, first_segment = snapshot_sections, number
+            break
+    if first_segment is None:
+        segments = _numbered_files(directory, "segment-", ".log")
+        if segments and segments[0] != 1:
+            raise ValueError("History before the oldest kept snapshot has been pruned.")
+        first_segment = 1
+    _replay_segments(directory, sections, first_segment, until=when)
+    return sections
+
+
+class OperationLogStorage:
+    """Storage backend that keeps the inventory in memory and journals every change."""
+    def __init__(self, directory, snapshot_every=50000, fsync=True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._records_since_snapshot = 0
+        self._sections = None
+        self._file = None
+        self._hold_sections = nullcontext
+        self.segment = 1
+        os.makedirs(directory, exist_ok=True)
+
+    def load_sections(self):
+        """Recover from the newest snapshot plus the log segments written after it."""
+        snapshots = _numbered_files(self.directory, "snapshot-", ".pkl")
+        if snapshots:
+            first_segment = snapshots[-1]
+            _, self._sections = _read_snapshot(self.directory, first_segment)
+        else:
+            first_segment = 1
+            self._sections = {}
+        self.segment, good_length = _replay_segments(self.directory, self._sections, first_segment)
+
+        # Drop a torn record left by a crash part-way through an append.
+        self._file = open(_segment_path(self.directory, self.segment), "ab")
+        if self._file.tell() > good_length:
+            self._file.truncate(good_length)
+        return self._sections
+
+    def guard_snapshots(self, hold_sections):
+        """
+        Take hold_sections() (a context manager that keeps every section and
+        item from changing, such as the manager's locks) around each snapshot.
+        """
+        self._hold_sections = hold_sections
+
+    def save_section(self, name):
+        self._append(OP_SECTION, name.encode())
+
+    def save_item(self, section_name, item):
+        self._append(
+            OP_ITEM, encode_item(section_name, item.name, item.quantity, stored_expiry(item))
+        )
+
+    def _append(self, op, payload):
+        with self._lock:
+            self._buffer += encode_record(op, time.time(), payload)
+            self._records_since_snapshot += 1
+
+    def commit(self):
+        """Write every buffered record with one flush and fsync."""
+        with self._lock:
+            self._write_buffer()
+            snapshot_due = self._records_since_snapshot >= self.snapshot_every
+        if snapshot_due:
+            self.snapshot()
+
+    def _write_buffer(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._buffer = bytearray()
+
+    def snapshot(self):
+        """Start a new log segment and save the full state as its starting point."""
+        # The columns are copied with the sections held still (writers save
+        # into this storage while holding them, so they come first); the
+        # slow pickling and fsync then run without holding anyone up.
+        with self._hold_sections(), self._lock:
+            self._write_buffer()
+            self._file.close()
+            self.segment += 1
+            self._file = open(_segment_path(self.directory, self.segment), "ab")
+            path = _snapshot_path(self.directory, self.segment)
+            state = {"timestamp": time.time(), "sections": _snapshot_columns(self._sections)}
+            self._records_since_snapshot = 0
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def prune(self, keep_snapshots=1):
+        """Delete snapshots and segments older than the newest keep_snapshots snapshots."""
+        snapshots = _numbered_files(self.directory, "snapshot-", ".pkl")
+        if len(snapshots) <= keep_snapshots:
+            return
+        oldest_kept = snapshots[-keep_snapshots]
+        for number in snapshots[:-keep_snapshots]:
+            os.remove(_snapshot_path(self.directory, number))
+        for number in _numbered_files(self.directory, "segment-", ".log"):
+            if number < oldest_kept:
+                os.remove(_segment_path(self.directory, number))
+
+    def close(self):
+        self.commit()
+        self._file.close()
@@ -0,0 +1,215 @@
+import queue
+
+from EventBus import ROW_EVENTS
+from ExpiryIndex import format_expiry_date
+
+# Search results are fetched this many rows beyond what is on screen.
+SEARCH_PAGE_ROWS = 200
+# Rows per page once the table is sorted by a column.
+SORTED_PAGE_ROWS = 100
+
+
+class InventoryTableModel:
+    """
+    Row model behind the overview table.
+
+    Keeps the (section, item) key of every row in display order and subscribes
+    to the InventoryManager's row events, so the table only has to redraw rows
+    that changed instead of rebuilding itself after every edit.
+
+    set_filter() narrows the rows to an InventoryManager.search_items() query;
+    matches are then fetched a page at a time as the table scrolls.
+
+    set_sort() orders the unfiltered rows by a column instead; the manager
+    keeps that order indexed, so the model only ever holds the page being
+    shown (set_page()) and re-reads it when rows change.
+
+    Events may arrive on any thread (e.g. from a BackgroundWorker); they are
+    only queued there and applied by take_changes() on the UI thread.
+
+    With load=False the model starts empty, so the window can appear before
+    the rows are read: run read_rows() on a worker, then set_rows() on the
+    UI thread, and don't call take_changes() until loaded is True.
+    """
+    def __init__(self, inventory_manager, load=True):
+        self.inventory_manager = inventory_manager
+        self.loaded = False
+        self.keys = []
+        self._section_rows = {}
+        self._known = set()
+        self.dirty_keys = set()
+        self.structure_changed = False
+        self.filter_text = ""
+        self.filter_section = None
+        self.sort_column = None
+        self.descending = False
+        self.page = 0
+        self.page_size = SORTED_PAGE_ROWS
+        self._total_rows = 0
+        self._page_stale = False
+        self._more_matches = False
+        self._filter_stale = False
+        self._incoming = queue.SimpleQueue()
+        self._subscription = inventory_manager.events.subscribe(self.on_rows_changed, *ROW_EVENTS, batched=True)
+        if load:
+            self.reload()
+
+    def reload(self):
+        """Rebuild the row order from scratch (used on start-up and when the filter or sort changes)."""
+        if self.is_filtered():
+            self._load_matches(SEARCH_PAGE_ROWS)
+            self.dirty_keys.clear()
+            self.structure_changed = True
+        elif self.is_sorted():
+            self._load_page()
+            self.loaded = True
+            self.dirty_keys.clear()
+            self.structure_changed = True
+        else:
+            self.set_rows(self.read_rows())
+
+    def read_rows(self):
+        """
+        Read every row key in display order, for set_rows(). Goes through the
+        manager's locked accessors, so it may run on a worker thread. Sections
+        the storage hasn't loaded stay unloaded until one of their rows is shown.
+        """
+        keys = []
+        section_rows = {}
+        for section in self.inventory_manager.get_section_names():
+            items = self.inventory_manager.get_item_names_in_section(section, load=False)
+            keys.extend((section, item) for item in items)
+            section_rows[section] = len(items)
+        return keys, section_rows
+
+    def set_rows(self, rows):
+        """Show the unfiltered rows returned by read_rows()."""
+        self.keys, self._section_rows = rows
+        self._more_matches = False
+        self._known = set(self.keys)
+        self.loaded = True
+        self.dirty_keys.clear()
+        self.structure_changed = True
+
+    def is_filtered(self):
+        return bool(self.filter_text) or self.filter_section is not None
+
+    def is_sorted(self):
+        """Whether rows are shown sorted, a page at a time (search results keep their own order)."""
+        return self.sort_column is not None and not self.is_filtered()
+
+    def set_sort(self, column, descending=False):
+        """Order rows by a SortIndex column (None for the inventory's own order) and go to the first page."""
+        if (column, descending) != (self.sort_column, self.descending):
+            self.sort_column = column
+            self.descending = descending
+            self.page = 0
+            self.reload()
+
+    def page_count(self):
+        if not self.is_sorted():
+            return 1
+        return max(1, -(-self._total_rows // self.page_size))
+
+    def set_page(self, page):
+        page = max(0, min(page, self.page_count() - 1))
+        if page != self.page:
+            self.page = page
+            self._load_page()
+
+    def _load_page(self):
+        self._total_rows = self.inventory_manager.row_count()
+        self.page = min(self.page, self.page_count() - 1)
+        keys = self.inventory_manager.sorted_rows(
+            self.sort_column, self.descending, self.page * self.page_size, self.page_size
+        )
+        if keys != self.keys:
+            self.keys = keys
+            self._known = set(keys)
+            self.structure_changed = True
+        self._page_stale = False
+
+    def set_filter(self, text="", section=None):
+        """Show only rows whose item name contains text, optionally in one section."""
+        text = text.strip()
+        if (text, section) != (self.filter_text, self.filter_section):
+            self.filter_text = text
+            self.filter_section = section
+            self.reload()
+
+    def _load_matches(self, count):
+        keys = self.inventory_manager.search_items(self.filter_text, section=self.filter_section, limit=count + 1)
+        self._more_matches = len(keys) > count
+        self.keys = keys[:count]
+        self._known = set(self.keys)
+        self._filter_stale = False
+
+    def close(self):
+        self.inventory_manager.events.unsubscribe(self._subscription)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def row_values(self, key):
+        """
+        Return the five display values for a (section, item) key; the last is
+        the item's suggested reorder quantity, or "" when none is needed.
+        """
+        section, item_name = key
+        item = self.inventory_manager.sections[section].items[item_name]
+        reorder = self.inventory_manager.suggested_order(item_name)
+        return (section, item_name, item.quantity, format_expiry_date(item.expiry_date) or "N/A", reorder or "")
+
+    def visible_rows(self, first, count):
+        """Return [(key, values), ...] for the rows in the given window."""
+        if self._more_matches and first + count * 2 > len(self.keys):
+            self._load_matches(first + count + SEARCH_PAGE_ROWS)
+        return [(key, self.row_values(key)) for key in self.keys[first:first + count]]
+
+    def on_rows_changed(self, events):
+        for event in events:
+            self._incoming.put((event.section, event.item))
+
+    def _apply_change(self, key):
+        if self.is_sorted():
+            # The change may move rows onto or off this page; re-read it on the next refresh.
+            self._page_stale = True
+        if key in self._known:
+            self.dirty_keys.add(key)
+            return
+        if self._page_stale:
+            return
+        if self.is_filtered():
+            # Re-run the search on the next refresh rather than once per new row.
+            self._filter_stale = True
+            self.structure_changed = True
+            return
+        # New rows go after the last row of their section, matching the
+        # order get_inventory_data() would return.
+        section_name = key[0]
+        index = 0
+        for section in self.inventory_manager.get_section_names():
+            index += self._section_rows.get(section, 0)
+            if section == section_name:
+                break
+        self.keys.insert(index, key)
+        self._section_rows[section_name] = self._section_rows.get(section_name, 0) + 1
+        self._known.add(key)
+        self.structure_changed = True
+
+    def take_changes(self):
+        """Apply queued notifications, then return (structure_changed, dirty_keys) and reset them."""
+        while True:
+            try:
+                key = self._incoming.get_nowait()
+            except queue.Empty:
+                break
+            self._apply_change(key)
+        if self._filter_stale:
+            self._load_matches(max(len(self.keys), SEARCH_PAGE_ROWS))
+        if self._page_stale:
+            self._load_page()
+        changes = (self.structure_changed, self.dirty_keys)
+        self.structure_changed = False
+        self.dirty_keys = set()
+        return changes
@@ -1,8 +1,15 @@
+import datetime
+from heapq import heappop, heappush
+
 from BaseInventoryItem import InventoryItem
+from ExpiryIndex import parse_expiry_date
 
 class RegularItem(InventoryItem):
     """A non-perishable item with basic stock management."""
-    def add_stock(self, amount):
+    __slots__ = ("quantity",)
+
+    def add_stock(self, amount, expiry_date=None):
+        # Regular stock doesn't expire, so a date given with it is ignored.
         if amount <= 0:
             raise ValueError("Amount must be greater than zero.")
         self.quantity += amount
@@ -14,32 +21,139 @@ class RegularItem(InventoryItem):
             raise ValueError("Not enough stock.")
         self.quantity -= amount
 
+    def take_stock(self, amount):
+        self.remove_stock(amount)
+        return [(None, amount)]
+
     def __str__(self):
         return f"{self.name}: {self.quantity}"
 
 class PerishableItem(InventoryItem):
-    """A perishable item with an expiry date."""
+    """
+    A perishable item held as lots, each with its own expiry date and quantity.
+
+    Most items only ever have one lot, which is kept in two slots; a second
+    lot turns them into a min-heap of [expiry_date, quantity] so stock is
+    removed first-expired-first-out at O(log lots) per lot used up. The
+    total and the earliest expiry are cached, so reading quantity or
+    expiry_date is O(1). Emptied lots are dropped, except the last one, which
+    keeps the row's expiry date.
+    """
+    __slots__ = ("_total", "_expiry", "_lots")
+
     def __init__(self, name, quantity, expiry_date):
-        super().__init__(name, quantity)
-        self.expiry_date = expiry_date
+        # Fields are set directly (not via super()) as items are created in bulk on load.
+        self.name = name
+        self._total = quantity
+        self._expiry = expiry_date if type(expiry_date) is datetime.date else parse_expiry_date(expiry_date)
+        self._lots = None   # heap of [expiry_date, quantity] once there is more than one lot
+
+    @classmethod
+    def from_lots(cls, name, lots):
+        """Build an item from [(expiry_date, quantity)] lots, e.g. as stored or as taken by take_stock()."""
+        lots = list(lots)
+        item = cls(name, lots[0][1], lots[0][0])
+        for expiry_date, quantity in lots[1:]:
+            if quantity > 0:
+                item.add_stock(quantity, expiry_date)
+        return item
+
+    @property
+    def quantity(self):
+        return self._total
+
+    @quantity.setter
+    def quantity(self, value):
+        # Setting the total (a stock count) adds to the latest-expiring lot or
+        # takes from the earliest ones.
+        if value < 0:
+            raise ValueError("Quantity can't be negative.")
+        if value > self._total:
+            self.add_stock(value - self._total)
+        elif value < self._total:
+            self.take_stock(self._total - value)
+
+    @property
+    def expiry_date(self):
+        """Expiry date of the earliest lot."""
+        return self._expiry
+
+    @property
+    def lot_count(self):
+        return 1 if self._lots is None else len(self._lots)
+
+    @property
+    def lots(self):
+        """[(expiry_date, quantity)] for every lot, earliest first."""
+        if self._lots is None:
+            return [(self._expiry, self._total)]
+        return sorted((expiry, quantity) for expiry, quantity in self._lots)
 
-    def add_stock(self, amount):
+    def add_stock(self, amount, expiry_date=None):
+        """
+        Add a lot expiring on expiry_date, or top up the lot with that date.
+        Without a date the stock joins the latest-expiring lot.
+        """
         if amount <= 0:
             raise ValueError("Amount must be greater than zero.")
-        self.quantity += amount
+        expiry = parse_expiry_date(expiry_date)
+        lots = self._lots
+        if lots is None:
+            if expiry is None or expiry == self._expiry:
+                self._total += amount
+                return
+            if not self._total:
+                # The only lot is empty; the new one replaces it.
+                self._expiry = expiry
+                self._total = amount
+                return
+            lots = self._lots = [[self._expiry, self._total]]
+        if expiry is None:
+            expiry = max(lot[0] for lot in lots)
+        for lot in lots:
+            if lot[0] == expiry:
+                lot[1] += amount
+                break
+        else:
+            heappush(lots, [expiry, amount])
+        self._total += amount
+        self._expiry = lots[0][0]
 
     def remove_stock(self, amount):
+        self.take_stock(amount)
+
+    def take_stock(self, amount):
+        """Remove amount from the earliest-expiring lots first; returns the [(expiry_date, quantity)] taken."""
         if amount <= 0:
             raise ValueError("Amount must be greater than zero.")
-        if amount > self.quantity:
+        if amount > self._total:
             raise ValueError("Not enough stock.")
-        self.quantity -= amount
+        self._total -= amount
+        lots = self._lots
+        if lots is None:
+            return [(self._expiry, amount)]
+
+        taken = []
+        while True:
+            lot = lots[0]
+            if lot[1] > amount:
+                lot[1] -= amount
+                taken.append((lot[0], amount))
+                break
+            taken.append((lot[0], lot[1]))
+            amount -= lot[1]
+            if len(lots) == 1:
+                lot[1] = 0   # keep the last lot's date on the empty row
+                break
+            heappop(lots)
+            if not amount:
+                break
+        if len(lots) == 1:
+            self._lots = None
+            self._expiry, self._total = lots[0]
+        else:
+            self._expiry = lots[0][0]
+        return taken
 
     def __str__(self):
         return f"{self.name} (Expires: {self.expiry_date}): {self.quantity}"
-
-
-
-
-
-
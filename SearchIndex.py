@@ -0,0 +1,180 @@
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+
+NO_EXPIRY = "none"
+# When a candidate list is larger than 1/DENSE_FRACTION of all names it is
+# quicker to walk the names in order and stop once a page is filled than to
+# collect and sort every candidate.
+DENSE_FRACTION = 8
+# Rough cost of sorting one filtered row, in name-walk steps.
+SORT_COST = 10
+
+
+def expiry_bucket(expiry_date):
+    """Bucket for an expiry date (YYYY-MM-DD string or date): its month as "YYYY-MM", or NO_EXPIRY."""
+    return str(expiry_date)[:7] if expiry_date else NO_EXPIRY
+
+
+def _row_buckets(expiry_dates):
+    # A row is in the bucket of every lot it holds; rows without lots count as not expiring.
+    return frozenset(map(expiry_bucket, expiry_dates)) or frozenset((NO_EXPIRY,))
+
+
+def _trigrams(name):
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory index for finding (section, item) rows by item name, section
+    and expiry month (a row with several lots is found by the month of each).
+
+    Prefix lookups bisect a sorted list of lower-cased names; substring
+    lookups start from the rarest trigram's posting list. Results are ordered
+    by item name (case-insensitive), then section, and only offset + limit
+    rows are produced, so a page stays cheap however large the inventory is.
+    """
+    def __init__(self):
+        self._sorted_names = []   # lower-cased item names, sorted
+        self._pending_names = []  # names added since the last search, merged in lazily
+        self._names = []          # name id -> lower-cased item name
+        self._grams = {}          # trigram -> array of name ids, ascending
+        self._rows = {}           # lower-cased item name -> sorted [(section, item)]
+        self._by_section = {}     # section -> {(section, item)}
+        self._by_bucket = {}      # expiry bucket -> {(section, item)}
+        self._buckets = {}        # (section, item) -> frozenset of its lots' expiry buckets
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def rebuild(self, rows):
+        """Index every (section, item, expiry dates of its lots) row in one pass."""
+        self._rows = {}
+        self._by_section = {}
+        self._by_bucket = {}
+        self._buckets = {}
+        for section, item, expiry_dates in rows:
+            key = (section, item)
+            buckets = _row_buckets(expiry_dates)
+            keys = self._rows.get(item.lower())
+            if keys is None:
+                self._rows[item.lower()] = [key]
+            else:
+                keys.append(key)
+            self._by_section.setdefault(section, set()).add(key)
+            for bucket in buckets:
+                self._by_bucket.setdefault(bucket, set()).add(key)
+            self._buckets[key] = buckets
+
+        self._names = []
+        self._grams = {}
+        for name in self._rows:
+            self._add_name(name)
+        self._sorted_names = sorted(self._names)
+        self._pending_names = []
+        for keys in self._rows.values():
+            if len(keys) > 1:
+                keys.sort()
+
+    def update(self, section, item, expiry_dates):
+        """Index a new row, or move an existing one to the buckets of its current lots."""
+        key = (section, item)
+        buckets = _row_buckets(expiry_dates)
+        old_buckets = self._buckets.get(key)
+        if old_buckets is None:
+            name = item.lower()
+            keys = self._rows.get(name)
+            if keys is None:
+                keys = self._rows[name] = []
+                self._add_name(name)
+                self._pending_names.append(name)
+            insort(keys, key)
+            self._by_section.setdefault(section, set()).add(key)
+            old_buckets = frozenset()
+        elif old_buckets == buckets:
+            return
+        for bucket in old_buckets - buckets:
+            keys = self._by_bucket[bucket]
+            keys.discard(key)
+            if not keys:
+                del self._by_bucket[bucket]
+        for bucket in buckets - old_buckets:
+            self._by_bucket.setdefault(bucket, set()).add(key)
+        self._buckets[key] = buckets
+
+    def _add_name(self, name):
+        name_id = len(self._names)
+        self._names.append(name)
+        for gram in _trigrams(name):
+            postings = self._grams.get(gram)
+            if postings is None:
+                postings = self._grams[gram] = array("i")
+            postings.append(name_id)
+
+    def search(self, text="", mode="contains", section=None, bucket=None, offset=0, limit=None):
+        """
+        Return [(section, item)] whose item name starts with (mode="prefix")
+        or contains (mode="contains") text, ignoring case, optionally limited
+        to one section and/or expiry bucket.
+        """
+        if mode not in ("prefix", "contains"):
+            raise ValueError(f"Unknown search mode '{mode}' (use 'prefix' or 'contains').")
+        if self._pending_names:
+            # Cheaper than an insort per new name: timsort merges the run in linear time.
+            self._sorted_names.extend(self._pending_names)
+            self._sorted_names.sort()
+            self._pending_names = []
+        query = text.strip().lower()
+        filters = []
+        if section is not None:
+            filters.append(self._by_section.get(section, set()))
+        if bucket is not None:
+            filters.append(self._by_bucket.get(bucket, set()))
+
+        stop = None if limit is None else offset + limit
+        return list(islice(self._matching_keys(query, mode, filters, stop), offset, stop))
+
+    def _matching_keys(self, query, mode, filters, stop):
+        dense = max(1, len(self._names) // DENSE_FRACTION)
+        if mode == "prefix":
+            low = bisect_left(self._sorted_names, query)
+            high = bisect_left(self._sorted_names, query + "\U0010ffff")
+            names = (self._sorted_names[i] for i in range(low, high))
+            estimate = high - low
+            name_matches = lambda name: name.startswith(query)
+        else:
+            name_matches = lambda name: query in name
+            postings = self._rarest_postings(query) if len(query) >= 3 else None
+            if postings is not None and len(postings) <= dense:
+                names = sorted(name for name in map(self._names.__getitem__, postings) if query in name)
+                estimate = len(names)
+            else:
+                names = (name for name in self._sorted_names if query in name)
+                estimate = len(self._names) if postings is None else len(postings)
+
+        smallest = min(filters, key=len) if filters else None
+        if smallest is not None and self._sort_filter_first(len(smallest), estimate, stop):
+            for key in sorted(smallest, key=lambda key: (key[1].lower(), key)):
+                if name_matches(key[1].lower()) and all(key in keys for keys in filters):
+                    yield key
+            return
+
+        for name in names:
+            for key in self._rows[name]:
+                if all(key in keys for keys in filters):
+                    yield key
+
+    def _sort_filter_first(self, filter_size, estimate, stop):
+        """Whether sorting a section/bucket's rows beats walking the matching names in order."""
+        walk = estimate
+        if stop is not None and filter_size:
+            # Rows of the filter turn up about once every len(self) / filter_size names.
+            walk = min(estimate, stop * len(self) // filter_size)
+        return filter_size * SORT_COST < walk
+
+    def _rarest_postings(self, query):
+        postings = [self._grams.get(gram) for gram in _trigrams(query)]
+        if any(ids is None for ids in postings):
+            return array("i")
+        return min(postings, key=len)
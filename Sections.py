@@ -1,26 +1,163 @@
+from array import array
+
+from ExpiryIndex import format_expiry_date, format_lots, parse_expiry_date, parse_lots
 from RegularItems import RegularItem, PerishableItem
 
+def new_item(name, quantity, expiry_date=None):
+    """A PerishableItem when there is an expiry date, otherwise a RegularItem."""
+    if expiry_date:
+        return PerishableItem(name, quantity, expiry_date)
+    return RegularItem(name, quantity)
+
+
+def stored_expiry(item):
+    """The expiry text storage keeps for an item: its date, format_lots() text once it has several lots, or None."""
+    if item.lot_count > 1:
+        return format_lots(item.lots)
+    return format_expiry_date(item.expiry_date)
+
+
+def load_item(name, quantity, expiry):
+    """Inverse of stored_expiry: rebuild an item from its quantity and stored expiry."""
+    if expiry and "=" in expiry:
+        return PerishableItem.from_lots(name, parse_lots(expiry))
+    return new_item(name, quantity, expiry)
+
+
+def item_from_lots(name, lots):
+    """
+    Build an item from {expiry_date: quantity} lots, as InventoryManager.row_lots()
+    returns them. Empty lots are dropped, but an empty row keeps its earliest date.
+    """
+    if None in lots:
+        return RegularItem(name, lots[None])
+    stocked = sorted((expiry_date, quantity) for expiry_date, quantity in lots.items() if quantity > 0)
+    return PerishableItem.from_lots(name, stocked or [(min(lots), 0)])
+
+
 class InventorySection:
     def __init__(self, name):
         self.name = name
         self.items = {}
 
+    def __len__(self):
+        return len(self.items)
+
     def add_item(self, item):
         self.items[item.name] = item
 
     def get_item(self, name):
         return self.items.get(name)
 
+    def add_stock(self, name, amount, expiry_date=None):
+        item = self.items.get(name)
+        if item is not None:
+            item.add_stock(amount, expiry_date)
+        else:
+            if amount <= 0:
+                raise ValueError("Amount must be greater than zero.")
+            self.items[name] = new_item(name, amount, expiry_date)
+
+    def remove_stock(self, name, amount):
+        item = self.get_item(name)
+        if item:
+            item.remove_stock(amount)
+        else:
+            raise ValueError("Item not found")
+
+    def __str__(self):
+        return f"Section: {self.name}\n" + "\n".join(str(item) for item in self.items.values())
+
+
+class ColumnarSection:
+    """
+    Memory-compact alternative to InventorySection for very large catalogs.
+
+    Quantities are kept in an array('q'), expiry dates as codes into a shared
+    table, and names are found through an open-addressing hash table that is
+    itself an array, so no Python object is created per item apart from its
+    name. get_item() returns a lightweight view with the same item API as the
+    regular item classes.
+
+    It is a standalone structure, measured by `Benchmarks.py memory`;
+    InventoryManager and its storages don't use it. Each row holds a single
+    lot, so stock with a second expiry date for an item is rejected rather
+    than merged into the first.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._names = []
+        self._quantities = array("q")
+        self._expiry_codes = array("i")
+        self._expiry_values = [None]
+        self._expiry_lookup = {None: 0}
+        self._table = array("q", [-1]) * 8
+        self._mask = 7
+
+    def __len__(self):
+        return len(self._names)
+
+    def _find(self, name):
+        """Return (row, slot) for name; row is -1 and slot is free if it's missing."""
+        slot = hash(name) & self._mask
+        while True:
+            row = self._table[slot]
+            if row == -1 or self._names[row] == name:
+                return row, slot
+            slot = (slot + 1) & self._mask
+
+    def _grow(self):
+        size = len(self._table) * 2
+        self._table = array("q", [-1]) * size
+        self._mask = size - 1
+        for row, name in enumerate(self._names):
+            slot = hash(name) & self._mask
+            while self._table[slot] != -1:
+                slot = (slot + 1) & self._mask
+            self._table[slot] = row
+
+    def _expiry_code(self, expiry_date):
+        code = self._expiry_lookup.get(expiry_date)
+        if code is None:
+            code = self._expiry_lookup[expiry_date] = len(self._expiry_values)
+            self._expiry_values.append(expiry_date)
+        return code
+
+    def _append(self, name, quantity, expiry_date):
+        if quantity <= 0:
+            raise ValueError("Amount must be greater than zero.")
+        if (len(self._names) + 1) * 3 > len(self._table) * 2:
+            self._grow()
+        row, slot = self._find(name)
+        row = len(self._names)
+        self._table[slot] = row
+        self._names.append(name)
+        self._quantities.append(quantity)
+        self._expiry_codes.append(self._expiry_code(parse_expiry_date(expiry_date)))
+
+    def add_item(self, item):
+        if item.lot_count > 1:
+            raise ValueError(f"A ColumnarSection row holds one lot; '{item.name}' has {item.lot_count}.")
+        row, _ = self._find(item.name)
+        expiry_date = getattr(item, "expiry_date", None)
+        if row == -1:
+            self._append(item.name, item.quantity, expiry_date)
+        else:
+            self._quantities[row] = item.quantity
+            self._expiry_codes[row] = self._expiry_code(parse_expiry_date(expiry_date))
+
+    def get_item(self, name):
+        row, _ = self._find(name)
+        if row == -1:
+            return None
+        return ColumnarItem(self, row)
+
     def add_stock(self, name, amount, expiry_date=None):
         item = self.get_item(name)
         if item:
-            item.add_stock(amount)
+            item.add_stock(amount, expiry_date)
         else:
-            if expiry_date:
-                item = PerishableItem(name, amount, expiry_date)
-            else:
-                item = RegularItem(name, amount)
-            self.add_item(item)
+            self._append(name, amount, expiry_date)
 
     def remove_stock(self, name, amount):
         item = self.get_item(name)
@@ -29,5 +166,63 @@ class InventorySection:
         else:
             raise ValueError("Item not found")
 
+    def __iter__(self):
+        return (ColumnarItem(self, row) for row in range(len(self._names)))
+
     def __str__(self):
-        return f"Section: {self.name}\n" + "\n".join(str(item) for item in self.items.values())
+        return f"Section: {self.name}\n" + "\n".join(str(item) for item in self)
+
+
+class ColumnarItem:
+    """View of one row of a ColumnarSection."""
+    __slots__ = ("section", "row")
+
+    def __init__(self, section, row):
+        self.section = section
+        self.row = row
+
+    @property
+    def name(self):
+        return self.section._names[self.row]
+
+    @property
+    def quantity(self):
+        return self.section._quantities[self.row]
+
+    @property
+    def expiry_date(self):
+        return self.section._expiry_values[self.section._expiry_codes[self.row]]
+
+    lot_count = 1
+
+    @property
+    def lots(self):
+        return [(self.expiry_date, self.quantity)]
+
+    def add_stock(self, amount, expiry_date=None):
+        """Top up the row's one lot; a date is ignored for regular stock, as RegularItem does."""
+        if amount <= 0:
+            raise ValueError("Amount must be greater than zero.")
+        expiry = parse_expiry_date(expiry_date)
+        if expiry is not None and self.expiry_date is not None and expiry != self.expiry_date:
+            raise ValueError(
+                f"'{self.name}' expires on {format_expiry_date(self.expiry_date)}; "
+                "a ColumnarSection row can't hold a second lot."
+            )
+        self.section._quantities[self.row] += amount
+
+    def remove_stock(self, amount):
+        if amount <= 0:
+            raise ValueError("Amount must be greater than zero.")
+        if amount > self.quantity:
+            raise ValueError("Not enough stock.")
+        self.section._quantities[self.row] -= amount
+
+    def take_stock(self, amount):
+        self.remove_stock(amount)
+        return [(self.expiry_date, amount)]
+
+    def __str__(self):
+        if self.expiry_date is None:
+            return f"{self.name}: {self.quantity}"
+        return f"{self.name} (Expires: {self.expiry_date}): {self.quantity}"
@@ -0,0 +1,313 @@
+"""
+InventoryManager partitioned across worker processes, one shard per process.
+
+Each section lives on exactly one shard: the one named for it in placement
+(e.g. {"Leeds Dock": 0, "Hull Cold Store": 1} to keep a site's sections
+together), or crc32(section name) % shard count otherwise. Calls for a
+section are routed to its shard; whole-warehouse queries are sent to every
+shard at once and the answers combined.
+
+Moves between sections on different shards use two-phase commit:
+
+    prepare  every source shard takes the stock out and holds it under the
+             transaction id (all-or-nothing per shard); every target shard
+             creates missing sections
+    commit   target shards add the stock, source shards drop what they held
+    abort    if any prepare fails, source shards put the held stock back
+
+Each shard process serves one request at a time, so calls for sections on
+different shards run in parallel while calls to the same shard queue up.
+"""
+import heapq
+import itertools
+import multiprocessing
+import threading
+import zlib
+from collections.abc import KeysView
+
+from ExpiryIndex import parse_expiry_date
+from InventoryManagement import InventoryManager
+
+
+def shard_number(section_name, shard_count):
+    """Default placement: a stable hash of the section name, the same in every process."""
+    return zlib.crc32(section_name.encode()) % shard_count
+
+
+# ---- SHARD PROCESS ----
+class InventoryShard:
+    """
+    Runs inside a shard process: an InventoryManager plus the participant
+    side of cross-shard moves.
+    """
+    def __init__(self, storage=None):
+        self.manager = InventoryManager(storage)
+        self._held = {}   # transaction id -> [(section, item, lots)] taken out by prepare_remove
+
+    def call(self, method, *args):
+        result = getattr(self.manager, method)(*args)
+        # Name listings come back as dict views, which can't be pickled.
+        return list(result) if isinstance(result, KeysView) else result
+
+    def prepare_remove(self, transaction, removals):
+        """
+        Take (section, item, quantity) stock out all-or-nothing, earliest
+        lots first, and hold it for the transaction. Returns the
+        [(expiry_date, quantity)] lots taken for each row, so the target
+        shard can add them with their dates.
+        """
+        totals = {}
+        for section_name, item_name, quantity in removals:
+            if quantity <= 0:
+                raise ValueError("Quantity must be greater than zero.")
+            key = (section_name, item_name)
+            totals[key] = totals.get(key, 0) + quantity
+        for (section_name, item_name), quantity in totals.items():
+            if section_name not in self.manager.sections:
+                raise ValueError(f"Section '{section_name}' not found.")
+            item = self.manager.get_item(section_name, item_name)
+            if item is None:
+                raise ValueError(f"Item '{item_name}' not found in section '{section_name}'.")
+            if item.quantity < quantity:
+                raise ValueError("Not enough stock to move.")
+
+        with self.manager.batch():
+            taken = [(section_name, item_name, self.manager.take_stock(section_name, item_name, quantity))
+                     for section_name, item_name, quantity in removals]
+        self._held[transaction] = taken
+        return [lots for _, _, lots in taken]
+
+    def prepare_add(self, transaction, section_names):
+        for section_name in section_names:
+            self.manager.add_section(section_name)
+
+    def commit_add(self, transaction, additions):
+        """Add the (section, item, lots) rows of a prepared transaction."""
+        with self.manager.batch():
+            for section_name, item_name, lots in additions:
+                for expiry_date, quantity in lots:
+                    self.manager.add_item(section_name, item_name, quantity, expiry_date)
+
+    def commit_remove(self, transaction):
+        self._held.pop(transaction, None)
+
+    def abort_remove(self, transaction):
+        """Put back the stock held for a transaction that won't go ahead."""
+        self.commit_add(transaction, self._held.pop(transaction, []))
+
+    def close(self):
+        self.manager.close()
+
+
+def _serve(connection, storage_factory, number):
+    shard = InventoryShard(None if storage_factory is None else storage_factory(number))
+    try:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            method, args = request
+            try:
+                connection.send((True, getattr(shard, method)(*args)))
+            except Exception as e:
+                connection.send((False, e))
+    finally:
+        shard.close()
+        connection.close()
+
+
+# ---- COORDINATOR ----
+class ShardedInventoryManager:
+    """
+    The InventoryManager calls that make sense across processes, routed to
+    the shard owning each section.
+
+    storage_factory(shard number) is called inside each shard process to
+    build its storage backend, so it must be picklable (a module-level
+    function or functools.partial); shards keep their data in memory when
+    it is None. Results are copies: get_item() returns a snapshot of the
+    item, not a live object.
+    """
+    def __init__(self, shards=None, placement=None, storage_factory=None, start_method="spawn"):
+        shards = shards or multiprocessing.cpu_count()
+        self.placement = dict(placement or {})
+        if any(not 0 <= number < shards for number in self.placement.values()):
+            raise ValueError(f"Placement shard numbers must be between 0 and {shards - 1}.")
+        context = multiprocessing.get_context(start_method)
+        self._connections = []
+        self._processes = []
+        self._locks = []
+        for number in range(shards):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(
+                target=_serve, args=(child_end, storage_factory, number),
+                name=f"inventory-shard-{number}", daemon=True,
+            )
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+            self._locks.append(threading.Lock())
+        self._transactions = itertools.count(1)
+        self._transaction_lock = threading.Lock()
+
+    @property
+    def shard_count(self):
+        return len(self._connections)
+
+    def shard_for(self, section_name):
+        number = self.placement.get(section_name)
+        return shard_number(section_name, self.shard_count) if number is None else number
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Flush every shard's storage and stop the shard processes."""
+        for number, connection in enumerate(self._connections):
+            with self._locks[number]:
+                connection.send(None)
+        for process in self._processes:
+            process.join()
+        for connection in self._connections:
+            connection.close()
+
+    # ---- RPC ----
+    def _call(self, number, method, *args):
+        with self._locks[number]:
+            self._connections[number].send((method, args))
+            ok, result = self._connections[number].recv()
+        if not ok:
+            raise result
+        return result
+
+    def _call_each(self, calls):
+        """
+        Run {shard number: (method, args)} on all those shards in parallel
+        and return {shard number: result}, raising the first error after
+        every shard has answered.
+        """
+        numbers = sorted(calls)   # lock in shard order so concurrent callers can't deadlock
+        for number in numbers:
+            self._locks[number].acquire()
+        try:
+            for number in numbers:
+                self._connections[number].send(calls[number])
+            replies = {number: self._connections[number].recv() for number in numbers}
+        finally:
+            for number in reversed(numbers):
+                self._locks[number].release()
+        for ok, result in replies.values():
+            if not ok:
+                raise result
+        return {number: result for number, (_, result) in replies.items()}
+
+    def _gather(self, method, *args):
+        calls = {number: ("call", (method, *args)) for number in range(self.shard_count)}
+        results = self._call_each(calls)
+        return [results[number] for number in range(self.shard_count)]
+
+    def _routed(self, section_name, method, *args):
+        return self._call(self.shard_for(section_name), "call", method, section_name, *args)
+
+    # ---- ROUTED CALLS ----
+    def add_section(self, name):
+        self._routed(name, "add_section")
+
+    def add_item(self, section_name, item_name, quantity, expiry_date=None):
+        self._routed(section_name, "add_item", item_name, quantity, expiry_date)
+
+    def modify_item_quantity(self, section_name, item_name, new_quantity):
+        self._routed(section_name, "modify_item_quantity", item_name, new_quantity)
+
+    def increment(self, section_name, item_name, delta):
+        return self._routed(section_name, "increment", item_name, delta)
+
+    def get_item(self, section_name, item_name):
+        return self._routed(section_name, "get_item", item_name)
+
+    def get_item_names_in_section(self, section_name):
+        return self._routed(section_name, "get_item_names_in_section")
+
+    def section_total(self, section_name):
+        return self._routed(section_name, "section_total")
+
+    # ---- TRANSFERS ----
+    def transfer(self, source_section, target_section, item_name, quantity):
+        self.transfer_many([(source_section, target_section, item_name, quantity)])
+
+    def transfer_many(self, moves):
+        """
+        Apply (source, target, item, quantity) moves all-or-nothing.
+
+        Moves that stay on one shard keep InventoryManager.transfer_many()
+        semantics. Once a batch spans shards, each source must already hold
+        the stock it gives up, without counting what earlier moves in the
+        batch bring in.
+        """
+        moves = list(moves)
+        shards = {self.shard_for(name) for move in moves for name in move[:2]}
+        if len(shards) == 1:
+            self._call(shards.pop(), "call", "transfer_many", moves)
+            return
+        for _, _, _, quantity in moves:
+            if quantity <= 0:
+                raise ValueError("Quantity must be greater than zero.")
+        if any(source == target for source, target, _, _ in moves):
+            raise ValueError("Source and target sections must be different.")
+        with self._transaction_lock:
+            transaction = next(self._transactions)
+
+        removals, targets = {}, {}
+        for source, target, item_name, quantity in moves:
+            removals.setdefault(self.shard_for(source), []).append((source, item_name, quantity))
+            targets.setdefault(self.shard_for(target), set()).add(target)
+
+        # Phase 1: hold the stock on the source shards and create target sections.
+        prepared, taken = [], {}
+        try:
+            for number, rows in removals.items():
+                lots = self._call(number, "prepare_remove", transaction, rows)
+                prepared.append(number)
+                taken[number] = iter(lots)
+            self._call_each({number: ("prepare_add", (transaction, sorted(names)))
+                             for number, names in targets.items()})
+        except Exception:
+            self._call_each({number: ("abort_remove", (transaction,)) for number in prepared})
+            raise
+
+        # Phase 2: nothing can be rejected from here on.
+        # Each source shard's lots come back in the order its removals were sent.
+        additions = {}
+        for source, target, item_name, quantity in moves:
+            additions.setdefault(self.shard_for(target), []).append(
+                (target, item_name, next(taken[self.shard_for(source)]))
+            )
+        self._call_each({number: ("commit_add", (transaction, rows)) for number, rows in additions.items()})
+        self._call_each({number: ("commit_remove", (transaction,)) for number in removals})
+
+    # ---- GATHERED QUERIES ----
+    def get_section_names(self):
+        return [name for names in self._gather("get_section_names") for name in names]
+
+    def get_inventory_data(self, section=None):
+        if section is not None:
+            return self._routed(section, "get_inventory_data")
+        return [row for rows in self._gather("get_inventory_data") for row in rows]
+
+    def total_units(self):
+        return sum(self._gather("total_units"))
+
+    def item_total(self, item_name):
+        return sum(self._gather("item_total", item_name))
+
+    def expiring_before(self, date):
+        """Return [(expiry, section, item)] from every shard, soonest first."""
+        return list(heapq.merge(*self._gather("expiring_before", parse_expiry_date(date))))
+
+    def expiring_between(self, start, end):
+        rows = self._gather("expiring_between", parse_expiry_date(start), parse_expiry_date(end))
+        return list(heapq.merge(*rows))
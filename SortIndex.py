@@ -0,0 +1,70 @@
+import datetime
+from bisect import bisect_left, insort
+
+SORT_COLUMNS = ("section", "item", "quantity", "expiry_date")
+# Rows without an expiry date sort after every dated row.
+NO_EXPIRY_ORDER = datetime.date.max
+
+
+def sort_value(column, section, item, quantity, expiry_date):
+    """The value a row is ordered by for one of SORT_COLUMNS (names ignore case)."""
+    if column == "section":
+        return section.lower()
+    if column == "item":
+        return item.lower()
+    if column == "quantity":
+        return quantity
+    if column == "expiry_date":
+        return NO_EXPIRY_ORDER if expiry_date is None else expiry_date
+    raise ValueError(f"Unknown sort column '{column}' (use one of {', '.join(SORT_COLUMNS)}).")
+
+
+class SortIndex:
+    """
+    Every (section, item) row kept in order of one column, for paging.
+
+    Entries are (value, section, item), so rows with equal values are always
+    ordered by section then item: a row's position only changes when its own
+    value does. A page is a slice of the sorted list, so reading page 400
+    costs the same as page 1; a changed row is moved with bisect.
+    """
+    def __init__(self, column):
+        sort_value(column, "", "", 0, None)   # reject unknown columns up front
+        self.column = column
+        self._entries = []   # sorted [(value, section, item)]
+        self._values = {}    # (section, item) -> indexed value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rebuild(self, rows):
+        """Index every (section, item, quantity, expiry_date) row in one pass."""
+        column = self.column
+        self._values = {
+            (section, item): sort_value(column, section, item, quantity, expiry_date)
+            for section, item, quantity, expiry_date in rows
+        }
+        self._entries = sorted((value, section, item) for (section, item), value in self._values.items())
+
+    def update(self, section, item, quantity, expiry_date):
+        """Index a new row, or move a changed one to its new position."""
+        key = (section, item)
+        value = sort_value(self.column, section, item, quantity, expiry_date)
+        old_value = self._values.get(key)
+        if old_value == value:
+            return
+        if old_value is not None:
+            del self._entries[bisect_left(self._entries, (old_value, section, item))]
+        self._values[key] = value
+        insort(self._entries, (value, section, item))
+
+    def page(self, offset=0, limit=None, descending=False):
+        """Return [(section, item)] for rows offset to offset + limit in ascending or descending order."""
+        total = len(self._entries)
+        if descending:
+            stop = max(0, total - offset)
+            start = 0 if limit is None else max(0, stop - limit)
+            entries = self._entries[start:stop][::-1]
+        else:
+            entries = self._entries[offset:None if limit is None else offset + limit]
+        return [(section, item) for _, section, item in entries]
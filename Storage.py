@@ -0,0 +1,186 @@
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+from ExpiryIndex import format_expiry_date, format_lots
+from Sections import InventorySection, load_item
+
+
+class MemoryStorage:
+    """
+    Default backend: the manager's sections are the only copy, nothing is persisted.
+
+    Backends return {section name: InventorySection} from load_sections() and
+    are handed the changed item object in save_item().
+    """
+    def load_sections(self):
+        return {}
+
+    def save_section(self, name):
+        pass
+
+    def save_item(self, section_name, item):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage:
+    """
+    Persists sections and items to a SQLite file.
+
+    Writes are buffered and flushed in one transaction on commit(), so a
+    burst of changes inside InventoryManager.batch() costs a single fsync.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sections (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS items (
+            section TEXT NOT NULL,
+            item TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            expiry_date TEXT,
+            lots TEXT,
+            PRIMARY KEY (section, item)
+        );
+        CREATE INDEX IF NOT EXISTS items_expiry_date ON items (expiry_date);
+    """
+    INSERT_SECTION = "INSERT OR IGNORE INTO sections (name) VALUES (?)"
+    UPSERT_ITEM = (
+        "INSERT INTO items (section, item, quantity, expiry_date, lots) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (section, item) DO UPDATE SET "
+        "quantity = excluded.quantity, expiry_date = excluded.expiry_date, lots = excluded.lots"
+    )
+    SELECT_SECTIONS = "SELECT name FROM sections ORDER BY id"
+    SELECT_ITEMS = "SELECT item, quantity, coalesce(lots, expiry_date) FROM items WHERE section = ? ORDER BY rowid"
+    SELECT_ITEM_NAMES = "SELECT item FROM items WHERE section = ? ORDER BY rowid"
+    SELECT_QUANTITIES = "SELECT section, item, quantity FROM items"
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._pending_sections = []
+        self._pending_items = {}
+        self.commit_count = 0
+
+    def _migrate(self):
+        # Files written before lot tracking have no lots column.
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(items)")]
+        if "lots" not in columns:
+            self.connection.execute("ALTER TABLE items ADD COLUMN lots TEXT")
+
+    def load_sections(self):
+        """Return a mapping that only reads a section's items when first accessed."""
+        with self._lock:
+            names = [row[0] for row in self.connection.execute(self.SELECT_SECTIONS)]
+        return LazySections(self, names)
+
+    def load_items(self, section_name):
+        with self._lock:
+            rows = self.connection.execute(self.SELECT_ITEMS, (section_name,)).fetchall()
+        section = InventorySection(section_name)
+        for item, quantity, expiry in rows:
+            section.items[item] = load_item(item, quantity, expiry)
+        return section
+
+    def load_item_names(self, section_name):
+        """A section's item names in row order, without building its items."""
+        with self._lock:
+            return [row[0] for row in self.connection.execute(self.SELECT_ITEM_NAMES, (section_name,))]
+
+    def load_quantities(self):
+        """(section, item, quantity) for every stored row, without building items."""
+        with self._lock:
+            return self.connection.execute(self.SELECT_QUANTITIES).fetchall()
+
+    def save_section(self, name):
+        with self._lock:
+            self._pending_sections.append((name,))
+
+    def save_item(self, section_name, item):
+        # Later writes to the same row replace earlier ones in the same batch.
+        # expiry_date is the earliest lot's, so the expiry_date index still finds the row;
+        # lots is only filled in for items holding more than one lot.
+        lots = format_lots(item.lots) if item.lot_count > 1 else None
+        row = (section_name, item.name, item.quantity, format_expiry_date(item.expiry_date), lots)
+        with self._lock:
+            self._pending_items[(section_name, item.name)] = row
+
+    def commit(self):
+        """Flush all buffered writes in a single transaction."""
+        with self._lock:
+            if not self._pending_sections and not self._pending_items:
+                return
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(self.INSERT_SECTION, self._pending_sections)
+                cursor.executemany(self.UPSERT_ITEM, self._pending_items.values())
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+            self._pending_sections = []
+            self._pending_items = {}
+            self.commit_count += 1
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+
+class LazySections(MutableMapping):
+    """Section name -> InventorySection, reading each section from storage on first use."""
+    _NOT_LOADED = object()
+
+    def __init__(self, storage, names):
+        self.storage = storage
+        self._data = dict.fromkeys(names, self._NOT_LOADED)
+
+    def is_loaded(self, name):
+        return self._data.get(name, self._NOT_LOADED) is not self._NOT_LOADED
+
+    def __getitem__(self, name):
+        items = self._data[name]
+        if items is self._NOT_LOADED:
+            items = self._data[name] = self.storage.load_items(name)
+        return items
+
+    def item_names(self, name):
+        """Item names of a section, read straight from storage if it hasn't been loaded."""
+        if self.is_loaded(name):
+            return list(self[name].items)
+        return self.storage.load_item_names(name)
+
+    def unloaded_quantities(self):
+        """(section, item, quantity) for the rows of every section not loaded yet, read from storage."""
+        unloaded = {name for name, items in self._data.items() if items is self._NOT_LOADED}
+        if not unloaded:
+            return []
+        return [row for row in self.storage.load_quantities() if row[0] in unloaded]
+
+    def __setitem__(self, name, items):
+        self._data[name] = items
+
+    def __delitem__(self, name):
+        del self._data[name]
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
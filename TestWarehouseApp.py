@@ -1,5 +1,38 @@
+import asyncio
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import types
 import unittest
+from unittest import mock
+import Benchmarks
+import BulkIO
+from BackgroundWorker import BackgroundWorker
+from EventBus import ROW_EVENTS, EventBus, ItemAdded, QuantityChanged, SectionCreated, StockTransferred
+from ImageCache import cached_image_path, load_scaled_image
 from InventoryManagement import InventoryManager
+from InventoryServer import InventoryServer
+from Locks import SectionLocks
+from Metrics import LatencyHistogram, Metrics, Profiler
+from MovementHistory import SECONDS_PER_DAY, DailySummary, MovementHistory, segment_day
+from OperationLog import OperationLogStorage, load_state_at
+from OverviewModel import InventoryTableModel
+from RegularItems import PerishableItem, RegularItem
+from SearchIndex import NO_EXPIRY, SearchIndex, expiry_bucket
+from ShardedInventory import ShardedInventoryManager, shard_number
+from Sections import ColumnarSection, InventorySection
+from Storage import MemoryStorage, SQLiteStorage
+from UndoStack import UndoStack
+
+try:
+    import numpy
+except ImportError:   # NumPy is optional; the tests that need it are skipped
+    numpy = None
+
 
 class TestInventoryManager(unittest.TestCase):
 
@@ -13,9 +46,9 @@ class TestInventoryManager(unittest.TestCase):
     def test_add_item(self):
         self.inventory_manager.add_section("Fruits")
         self.inventory_manager.add_item("Fruits", "Apple", 10)
-        self.assertIn("Apple", self.inventory_manager.sections["Fruits"])
+        self.assertIn("Apple", self.inventory_manager.sections["Fruits"].items)
         self.assertEqual(
-            self.inventory_manager.sections["Fruits"]["Apple"]["quantity"],
+            self.inventory_manager.sections["Fruits"].items["Apple"].quantity,
             10
         )
 
@@ -28,7 +61,7 @@ class TestInventoryManager(unittest.TestCase):
         self.inventory_manager.add_item("Fruits", "Apple", 10)
         self.inventory_manager.modify_item_quantity("Fruits", "Apple", 5)
         self.assertEqual(
-            self.inventory_manager.sections["Fruits"]["Apple"]["quantity"],
+            self.inventory_manager.sections["Fruits"].items["Apple"].quantity,
             5
         )
 
@@ -41,6 +74,16 @@ class TestInventoryManager(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.inventory_manager.modify_item_quantity("Fruits", "Banana", 5)
 
+    def test_modify_item_quantity_rejects_negative(self):
+        self.inventory_manager.add_section("Fruits")
+        self.inventory_manager.add_item("Fruits", "Apple", 10)
+        self.inventory_manager.add_item("Fruits", "Milk", 3, "2025-01-01")
+        for item in ("Apple", "Milk"):
+            with self.assertRaises(ValueError):
+                self.inventory_manager.modify_item_quantity("Fruits", item, -7)
+        self.assertEqual(self.inventory_manager.sections["Fruits"].items["Apple"].quantity, 10)
+        self.assertEqual(self.inventory_manager.sections["Fruits"].items["Milk"].quantity, 3)
+
     def test_get_inventory_data(self):
         self.inventory_manager.add_section("Fruits")
         self.inventory_manager.add_item("Fruits", "Apple", 10, "2025-01-01")
@@ -51,5 +94,1775 @@ class TestInventoryManager(unittest.TestCase):
         self.assertEqual(data[0]["Quantity"], 10)
         self.assertEqual(data[0]["Expiry Date"], "2025-01-01")
 
+class TestInventoryTableModel(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Fruits")
+        self.inventory_manager.add_section("Tools")
+        self.inventory_manager.add_item("Fruits", "Apple", 10, "2025-01-01")
+        self.inventory_manager.add_item("Tools", "Hammer", 3)
+        self.model = InventoryTableModel(self.inventory_manager)
+        self.model.take_changes()
+
+    def test_rows_follow_inventory_order(self):
+        self.assertEqual(self.model.keys, [("Fruits", "Apple"), ("Tools", "Hammer")])
+        self.assertEqual(
+            self.model.visible_rows(1, 5),
+            [(("Tools", "Hammer"), ("Tools", "Hammer", 3, "N/A", ""))]
+        )
+
+    def test_quantity_change_marks_only_that_row(self):
+        self.inventory_manager.modify_item_quantity("Fruits", "Apple", 4)
+        structure_changed, dirty_keys = self.model.take_changes()
+        self.assertFalse(structure_changed)
+        self.assertEqual(dirty_keys, {("Fruits", "Apple")})
+        self.assertEqual(self.model.row_values(("Fruits", "Apple"))[2], 4)
+
+    def test_new_item_inserted_after_its_section(self):
+        self.inventory_manager.add_item("Fruits", "Pear", 2)
+        structure_changed, _ = self.model.take_changes()
+        self.assertTrue(structure_changed)
+        self.assertEqual(
+            self.model.keys,
+            [("Fruits", "Apple"), ("Fruits", "Pear"), ("Tools", "Hammer")]
+        )
+        self.assertEqual(
+            self.model.keys,
+            [(row["Section Name"], row["Item Name"]) for row in self.inventory_manager.get_inventory_data()]
+        )
+
+    def test_close_stops_listening(self):
+        self.model.close()
+        self.inventory_manager.modify_item_quantity("Tools", "Hammer", 1)
+        self.assertEqual(self.model.take_changes(), (False, set()))
+
+    def test_deferred_load_keeps_changes_made_meanwhile(self):
+        model = InventoryTableModel(self.inventory_manager, load=False)
+        self.assertFalse(model.loaded)
+        self.assertEqual(len(model), 0)
+        rows = model.read_rows()
+        self.inventory_manager.add_item("Tools", "Saw", 1)
+        model.set_rows(rows)
+        self.assertTrue(model.take_changes()[0])
+        self.assertEqual(model.keys, [("Fruits", "Apple"), ("Tools", "Hammer"), ("Tools", "Saw")])
+
+
+class TestImageCache(unittest.TestCase):
+
+    def test_scaled_logo_is_cached_and_reused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            image = load_scaled_image("Assets/light_logo.png", (50, 20), directory)
+            self.assertEqual(image.size, (50, 20))
+            cached = cached_image_path("Assets/light_logo.png", (50, 20), directory)
+            self.assertTrue(os.path.exists(cached))
+            self.assertEqual(load_scaled_image("Assets/light_logo.png", (50, 20), directory).size, (50, 20))
+            self.assertNotEqual(cached, cached_image_path("Assets/light_logo.png", (60, 20), directory))
+
+
+class TestSQLiteStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "warehouse.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def open_manager(self):
+        manager = InventoryManager(SQLiteStorage(self.db_path))
+        self.addCleanup(manager.close)
+        return manager
+
+    def test_inventory_survives_restart(self):
+        manager = self.open_manager()
+        manager.add_section("Fruits")
+        manager.add_item("Fruits", "Apple", 10, "2025-01-01")
+        manager.add_item("Fruits", "Pear", 4)
+        manager.modify_item_quantity("Fruits", "Apple", 7)
+        manager.close()
+
+        reopened = self.open_manager()
+        self.assertEqual(list(reopened.get_section_names()), ["Fruits"])
+        self.assertEqual(reopened.get_inventory_data(), [
+            {"Section Name": "Fruits", "Item Name": "Apple", "Quantity": 7, "Expiry Date": "2025-01-01"},
+            {"Section Name": "Fruits", "Item Name": "Pear", "Quantity": 4, "Expiry Date": "N/A"},
+        ])
+
+    def test_sections_load_lazily(self):
+        manager = self.open_manager()
+        manager.add_section("Fruits")
+        manager.add_section("Tools")
+        manager.add_item("Tools", "Hammer", 2)
+        manager.close()
+
+        reopened = self.open_manager()
+        self.assertIn("Tools", reopened.sections)
+        self.assertFalse(reopened.sections.is_loaded("Tools"))
+        self.assertEqual(list(reopened.get_item_names_in_section("Tools")), ["Hammer"])
+        self.assertTrue(reopened.sections.is_loaded("Tools"))
+        self.assertFalse(reopened.sections.is_loaded("Fruits"))
+
+    def test_overview_rows_and_section_search_leave_other_sections_unread(self):
+        manager = self.open_manager()
+        for section, item in (("Fruits", "Apple"), ("Tools", "Hammer"), ("Tools", "Hacksaw")):
+            manager.add_section(section)
+            manager.add_item(section, item, 2)
+        manager.close()
+
+        reopened = self.open_manager()
+        model = InventoryTableModel(reopened, load=False)
+        self.addCleanup(model.close)
+        model.set_rows(model.read_rows())
+        self.assertEqual(model.keys, [("Fruits", "Apple"), ("Tools", "Hammer"), ("Tools", "Hacksaw")])
+        self.assertFalse(reopened.sections.is_loaded("Fruits"))
+
+        self.assertFalse(reopened.is_search_indexed("Tools"))
+        self.assertEqual(reopened.search_items("ha", section="Tools"), [("Tools", "Hacksaw"), ("Tools", "Hammer")])
+        self.assertTrue(reopened.is_search_indexed("Tools"))
+        self.assertFalse(reopened.sections.is_loaded("Fruits"))
+
+        reopened.add_item("Tools", "Hatchet", 1)
+        self.assertEqual(reopened.search_items("hat"), [("Tools", "Hatchet")])
+        self.assertTrue(reopened.is_search_indexed())
+        self.assertEqual(reopened.search_items("apple"), [("Fruits", "Apple")])
+
+    def test_batch_commits_once(self):
+        manager = self.open_manager()
+        manager.add_section("Fruits")
+        commits_before = manager.storage.commit_count
+        with manager.batch():
+            for i in range(100):
+                manager.add_item("Fruits", f"Item {i}", i + 1)
+            manager.modify_item_quantity("Fruits", "Item 0", 50)
+        self.assertEqual(manager.storage.commit_count, commits_before + 1)
+
+    def test_uses_wal_journal(self):
+        manager = self.open_manager()
+        mode = manager.storage.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+class TestExpiryQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        for section in ("Chiller", "Freezer", "Dry"):
+            self.inventory_manager.add_section(section)
+        self.inventory_manager.add_item("Chiller", "Milk", 5, "2025-01-03")
+        self.inventory_manager.add_item("Freezer", "Milk", 8, "2025-01-01")
+        self.inventory_manager.add_item("Chiller", "Cheese", 2, "2025-02-01")
+        self.inventory_manager.add_item("Dry", "Rice", 20)
+
+    def test_expiry_date_is_validated(self):
+        with self.assertRaises(ValueError):
+            self.inventory_manager.add_item("Dry", "Beans", 1, "next tuesday")
+        self.assertNotIn("Beans", self.inventory_manager.sections["Dry"].items)
+
+    def test_perishable_item_parses_expiry(self):
+        item = PerishableItem("Milk", 1, "2025-01-03")
+        self.assertEqual(item.expiry_date, datetime.date(2025, 1, 3))
+        self.assertEqual(str(item), "Milk (Expires: 2025-01-03): 1")
+
+    def test_expiring_before(self):
+        self.assertEqual(self.inventory_manager.expiring_before("2025-01-03"), [
+            (datetime.date(2025, 1, 1), "Freezer", "Milk"),
+        ])
+
+    def test_expiring_between_is_inclusive(self):
+        rows = self.inventory_manager.expiring_between("2025-01-03", "2025-02-01")
+        self.assertEqual([row[1:] for row in rows], [("Chiller", "Milk"), ("Chiller", "Cheese")])
+
+    def test_index_follows_quantity_changes(self):
+        self.inventory_manager.expiring_before("2030-01-01")
+        self.inventory_manager.modify_item_quantity("Freezer", "Milk", 0)
+        self.inventory_manager.add_item("Dry", "Crackers", 3, "2024-12-25")
+        self.assertEqual(
+            [row[1:] for row in self.inventory_manager.expiring_before("2025-01-10")],
+            [("Dry", "Crackers"), ("Chiller", "Milk")]
+        )
+
+    def test_fefo_picks_earliest_expiry_first(self):
+        self.assertEqual(
+            self.inventory_manager.fefo_picks("Milk", 10),
+            [("Freezer", 8), ("Chiller", 2)]
+        )
+
+    def test_fefo_picks_not_enough_stock(self):
+        with self.assertRaises(ValueError):
+            self.inventory_manager.fefo_picks("Milk", 100)
+
+class TestLots(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Chiller")
+        self.inventory_manager.add_item("Chiller", "Milk", 5, "2025-01-10")
+        self.inventory_manager.add_item("Chiller", "Milk", 3, "2025-01-03")
+        self.inventory_manager.add_item("Chiller", "Milk", 4, "2025-01-10")
+
+    def milk(self, section="Chiller"):
+        return self.inventory_manager.get_item(section, "Milk")
+
+    def test_each_expiry_date_is_a_lot(self):
+        self.assertEqual(self.milk().quantity, 12)
+        self.assertEqual(self.milk().expiry_date, datetime.date(2025, 1, 3))
+        self.assertEqual(self.milk().lots, [(datetime.date(2025, 1, 3), 3), (datetime.date(2025, 1, 10), 9)])
+
+    def test_removal_takes_earliest_lots_first(self):
+        self.assertEqual(
+            self.inventory_manager.take_stock("Chiller", "Milk", 4),
+            [(datetime.date(2025, 1, 3), 3), (datetime.date(2025, 1, 10), 1)]
+        )
+        self.assertEqual(self.milk().lots, [(datetime.date(2025, 1, 10), 8)])
+        self.assertEqual(self.inventory_manager.expiring_before("2025-01-05"), [])
+        self.inventory_manager.modify_item_quantity("Chiller", "Milk", 0)
+        self.assertEqual(self.milk().lots, [(datetime.date(2025, 1, 10), 0)])
+        with self.assertRaises(ValueError):
+            self.milk().remove_stock(1)
+
+    def test_setting_quantity_tops_up_the_latest_lot(self):
+        self.inventory_manager.modify_item_quantity("Chiller", "Milk", 14)
+        self.assertEqual(self.milk().lots, [(datetime.date(2025, 1, 3), 3), (datetime.date(2025, 1, 10), 11)])
+        with self.assertRaises(ValueError):
+            self.milk().quantity = -1
+
+    def test_transfer_carries_lots(self):
+        self.inventory_manager.transfer("Chiller", "Dock", "Milk", 5)
+        self.assertEqual(self.milk("Dock").lots, [(datetime.date(2025, 1, 3), 3), (datetime.date(2025, 1, 10), 2)])
+        self.assertEqual(self.milk().lots, [(datetime.date(2025, 1, 10), 7)])
+
+    def test_later_lots_are_found_by_their_own_expiry(self):
+        self.inventory_manager.expiring_before("2030-01-01")
+        self.inventory_manager.search_items()
+        self.inventory_manager.add_item("Chiller", "Milk", 10, "2025-02-01")
+        self.assertEqual(
+            self.inventory_manager.expiring_between("2025-02-01", "2025-02-28"),
+            [(datetime.date(2025, 2, 1), "Chiller", "Milk")]
+        )
+        self.assertEqual(self.inventory_manager.search_items(expiry_bucket="2025-02"), [("Chiller", "Milk")])
+        self.assertEqual(self.inventory_manager.search_items(expiry_bucket="2025-01"), [("Chiller", "Milk")])
+
+        self.inventory_manager.take_stock("Chiller", "Milk", 12)
+        self.assertEqual(self.inventory_manager.expiring_before("2025-01-31"), [])
+        self.assertEqual(self.inventory_manager.search_items(expiry_bucket="2025-01"), [])
+        # Built from scratch, the indexes hold the same lots.
+        rebuilt = InventoryManager()
+        rebuilt.add_section("Chiller")
+        rebuilt.add_item("Chiller", "Milk", 3, "2025-01-03")
+        rebuilt.add_item("Chiller", "Milk", 10, "2025-02-01")
+        self.assertEqual(len(rebuilt.expiring_between("2025-01-01", "2025-02-28")), 2)
+        self.assertEqual(rebuilt.search_items(expiry_bucket="2025-02"), [("Chiller", "Milk")])
+
+    def test_fefo_picks_follow_lots_across_sections(self):
+        self.inventory_manager.add_section("Freezer")
+        self.inventory_manager.add_item("Freezer", "Milk", 2, "2025-01-05")
+        self.assertEqual(
+            self.inventory_manager.fefo_picks("Milk", 7),
+            [("Chiller", 3), ("Freezer", 2), ("Chiller", 2)]
+        )
+
+    def test_lots_survive_storage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            storages = (
+                lambda: SQLiteStorage(os.path.join(directory, "inventory.db")),
+                lambda: OperationLogStorage(os.path.join(directory, "log")),
+                lambda: OperationLogStorage(os.path.join(directory, "snapshots"), snapshot_every=1),
+            )
+            for open_storage in storages:
+                manager = InventoryManager(open_storage())
+                manager.add_section("Chiller")
+                manager.add_item("Chiller", "Milk", 5, "2025-01-10")
+                manager.add_item("Chiller", "Milk", 3, "2025-01-03")
+                manager.close()
+                reopened = InventoryManager(open_storage())
+                self.assertEqual(
+                    reopened.get_item("Chiller", "Milk").lots,
+                    [(datetime.date(2025, 1, 3), 3), (datetime.date(2025, 1, 10), 5)]
+                )
+                reopened.close()
+
+class TestBulkImportExport(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_import_csv(self):
+        path = self.write_file("feed.csv", (
+            "section,item,quantity,expiry_date\n"
+            "Fruits,Apple,10,2025-01-01\n"
+            "Fruits,Apple,5,\n"
+            "Tools,Hammer,3,\n"
+        ))
+        report = self.inventory_manager.bulk_import(BulkIO.read_rows(path), chunk_size=2)
+        self.assertEqual((report.rows_read, report.imported, report.rejected), (3, 3, 0))
+        self.assertEqual(self.inventory_manager.sections["Fruits"].items["Apple"].quantity, 15)
+        self.assertEqual(self.inventory_manager.sections["Tools"].items["Hammer"].quantity, 3)
+        self.assertGreater(report.rows_per_second, 0)
+
+    def test_import_rejects_bad_rows(self):
+        path = self.write_file("feed.jsonl", (
+            '{"section": "Fruits", "item": "Apple", "quantity": 10}\n'
+            '{"section": "Fruits", "item": "", "quantity": 1}\n'
+            '{"section": "Fruits", "item": "Pear", "quantity": -2}\n'
+            'not json\n'
+            '{"section": "Fruits", "item": "Kiwi", "quantity": 1, "expiry_date": "soon"}\n'
+        ))
+        report = self.inventory_manager.bulk_import(BulkIO.read_rows(path))
+        self.assertEqual((report.rows_read, report.imported, report.rejected), (5, 1, 4))
+        self.assertEqual([row for row, _ in report.errors], [2, 3, 4, 5])
+        self.assertEqual(list(self.inventory_manager.get_item_names_in_section("Fruits")), ["Apple"])
+
+    def test_import_accepts_generators(self):
+        rows = ({"section": "Bulk", "item": f"SKU{i}", "quantity": 1} for i in range(250))
+        report = self.inventory_manager.bulk_import(rows, chunk_size=100)
+        self.assertEqual(report.imported, 250)
+        self.assertEqual(len(self.inventory_manager.sections["Bulk"]), 250)
+
+    def test_export_round_trip(self):
+        self.inventory_manager.add_section("Fruits")
+        self.inventory_manager.add_item("Fruits", "Apple", 10, "2025-01-01")
+        self.inventory_manager.add_item("Fruits", "Pear", 4)
+        for fmt in ("csv", "jsonl"):
+            path = os.path.join(self.temp_dir.name, f"export.{fmt}")
+            BulkIO.write_export(self.inventory_manager, path)
+            copy = InventoryManager()
+            copy.bulk_import(BulkIO.read_rows(path))
+            self.assertEqual(copy.get_inventory_data(), self.inventory_manager.get_inventory_data())
+
+    def test_export_round_trip_keeps_every_lot(self):
+        self.inventory_manager.add_section("Cold")
+        self.inventory_manager.add_item("Cold", "Milk", 5, "2025-01-01")
+        self.inventory_manager.add_item("Cold", "Milk", 10, "2025-02-01")
+        self.inventory_manager.add_item("Cold", "Cream", 2, "2025-01-05")
+        lines = "".join(self.inventory_manager.export_stream("csv")).splitlines()
+        self.assertEqual(lines[1:], ["Cold,Milk,5,2025-01-01", "Cold,Milk,10,2025-02-01", "Cold,Cream,2,2025-01-05"])
+        self.assertEqual(len(self.inventory_manager.inventory_view(by_lot=True)), 3)
+        for fmt in ("csv", "jsonl"):
+            path = os.path.join(self.temp_dir.name, f"lots.{fmt}")
+            BulkIO.write_export(self.inventory_manager, path)
+            copy = InventoryManager()
+            copy.bulk_import(BulkIO.read_rows(path))
+            self.assertEqual(
+                copy.get_item("Cold", "Milk").lots,
+                [(datetime.date(2025, 1, 1), 5), (datetime.date(2025, 2, 1), 10)]
+            )
+
+    def test_export_stream_chunks(self):
+        self.inventory_manager.add_section("Bulk")
+        for i in range(5):
+            self.inventory_manager.add_item("Bulk", f"SKU{i}", i + 1)
+        chunks = list(self.inventory_manager.export_stream("jsonl", chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        lines = "".join(chunks).splitlines()
+        self.assertEqual(json.loads(lines[4]), {
+            "section": "Bulk", "item": "SKU4", "quantity": 5, "expiry_date": None
+        })
+
+class TestCompactItems(unittest.TestCase):
+
+    def test_items_have_no_instance_dict(self):
+        for item in (RegularItem("Hammer", 1), PerishableItem("Milk", 1, "2025-01-01")):
+            self.assertFalse(hasattr(item, "__dict__"))
+
+    def test_columnar_section_matches_inventory_section(self):
+        regular = InventorySection("Chiller")
+        columnar = ColumnarSection("Chiller")
+        for section in (regular, columnar):
+            section.add_stock("Milk", 5, "2025-01-03")
+            section.add_stock("Butter", 2)
+            section.add_stock("Milk", 3)
+            section.remove_stock("Butter", 1)
+        self.assertEqual(str(columnar), str(regular))
+        self.assertEqual(columnar.get_item("Milk").quantity, 8)
+        self.assertIsNone(columnar.get_item("Cheese"))
+
+    def test_columnar_section_validation(self):
+        section = ColumnarSection("Dry")
+        section.add_stock("Rice", 2)
+        with self.assertRaises(ValueError):
+            section.remove_stock("Rice", 5)
+        with self.assertRaises(ValueError):
+            section.add_stock("Rice", 0)
+        with self.assertRaises(ValueError):
+            section.remove_stock("Beans", 1)
+        with self.assertRaises(ValueError):
+            section.add_stock("Beans", -5)
+        self.assertIsNone(section.get_item("Beans"))
+
+    def test_columnar_rows_hold_one_lot(self):
+        section = ColumnarSection("Chiller")
+        section.add_stock("Milk", 5, "2025-01-03")
+        section.add_stock("Milk", 2, "2025-01-03")
+        section.add_stock("Rice", 1)
+        section.add_stock("Rice", 1, "2025-01-03")
+        with self.assertRaises(ValueError):
+            section.add_stock("Milk", 3, "2025-02-01")
+        milk = section.get_item("Milk")
+        self.assertEqual((milk.lots, milk.lot_count), ([(datetime.date(2025, 1, 3), 7)], 1))
+        self.assertEqual(milk.take_stock(4), [(datetime.date(2025, 1, 3), 4)])
+        self.assertEqual(section.get_item("Rice").lots, [(None, 2)])
+        two_lots = PerishableItem.from_lots("Cream", [("2025-01-01", 1), ("2025-02-01", 1)])
+        with self.assertRaises(ValueError):
+            section.add_item(two_lots)
+
+    def test_columnar_section_grows(self):
+        section = ColumnarSection("Bulk")
+        for i in range(1000):
+            section.add_stock(f"SKU{i}", i + 1)
+        self.assertEqual(len(section), 1000)
+        self.assertEqual(section.get_item("SKU999").quantity, 1000)
+        section.add_item(RegularItem("SKU5", 42))
+        self.assertEqual(section.get_item("SKU5").quantity, 42)
+
+    def test_columnar_memory_reduction(self):
+        results = Benchmarks.measure_memory(20000)
+        self.assertGreaterEqual(results["columnar_reduction"], 4)
+
+class TestTransfers(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Receiving")
+        self.inventory_manager.add_section("Aisle 1")
+        self.inventory_manager.add_item("Receiving", "Milk", 10, "2025-01-03")
+        self.inventory_manager.add_item("Receiving", "Rice", 5)
+
+    def quantity(self, section, item):
+        return self.inventory_manager.sections[section].items[item].quantity
+
+    def test_transfer_creates_target_row_with_expiry(self):
+        self.inventory_manager.transfer("Receiving", "Aisle 1", "Milk", 4)
+        self.assertEqual(self.quantity("Receiving", "Milk"), 6)
+        milk = self.inventory_manager.sections["Aisle 1"].items["Milk"]
+        self.assertIsInstance(milk, PerishableItem)
+        self.assertEqual((milk.quantity, milk.expiry_date), (4, datetime.date(2025, 1, 3)))
+
+    def test_transfer_creates_missing_target_section(self):
+        self.inventory_manager.transfer("Receiving", "Aisle 2", "Rice", 5)
+        self.assertEqual(self.quantity("Aisle 2", "Rice"), 5)
+        self.assertEqual(self.quantity("Receiving", "Rice"), 0)
+
+    def test_transfer_many_uses_running_totals(self):
+        self.inventory_manager.transfer_many([
+            ("Receiving", "Aisle 1", "Milk", 6),
+            ("Aisle 1", "Aisle 2", "Milk", 2),
+            ("Receiving", "Aisle 1", "Milk", 4),
+        ])
+        self.assertEqual(self.quantity("Receiving", "Milk"), 0)
+        self.assertEqual(self.quantity("Aisle 1", "Milk"), 8)
+        self.assertEqual(self.quantity("Aisle 2", "Milk"), 2)
+
+    def test_transfer_many_moves_on_from_a_section_it_created(self):
+        self.inventory_manager.transfer_many([
+            ("Receiving", "Aisle 2", "Milk", 5),
+            ("Aisle 2", "Aisle 3", "Milk", 2),
+        ])
+        self.assertEqual(self.quantity("Aisle 2", "Milk"), 3)
+        self.assertEqual(self.quantity("Aisle 3", "Milk"), 2)
+        with self.assertRaises(ValueError):
+            self.inventory_manager.transfer_many([
+                ("Receiving", "Aisle 4", "Milk", 1),
+                ("Aisle 4", "Aisle 5", "Rice", 1),
+            ])
+        self.assertNotIn("Aisle 4", self.inventory_manager.sections)
+
+    def test_transfer_many_is_all_or_nothing(self):
+        before = self.inventory_manager.get_inventory_data()
+        changes = []
+        self.inventory_manager.events.subscribe(lambda event: changes.append((event.section, event.item)), *ROW_EVENTS)
+        for bad_move in (
+            ("Receiving", "Aisle 1", "Milk", 11),
+            ("Receiving", "Aisle 1", "Bread", 1),
+            ("Nowhere", "Aisle 1", "Milk", 1),
+            ("Receiving", "Receiving", "Milk", 1),
+            ("Receiving", "Aisle 1", "Milk", 0),
+        ):
+            with self.assertRaises(ValueError):
+                self.inventory_manager.transfer_many([("Receiving", "Aisle 3", "Milk", 5), bad_move])
+        self.assertEqual(self.inventory_manager.get_inventory_data(), before)
+        self.assertNotIn("Aisle 3", self.inventory_manager.sections)
+        self.assertEqual(changes, [])
+
+    def test_transfer_notifies_each_row_once(self):
+        changes = []
+        self.inventory_manager.events.subscribe(lambda event: changes.append((event.section, event.item)), *ROW_EVENTS)
+        self.inventory_manager.transfer_many([("Receiving", "Aisle 1", "Milk", 1)] * 3)
+        self.assertEqual(sorted(changes), [("Aisle 1", "Milk"), ("Receiving", "Milk")])
+        self.assertEqual(self.quantity("Aisle 1", "Milk"), 3)
+
+class TestEventBus(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Dock")
+        self.inventory_manager.add_item("Dock", "Milk", 5)
+        self.events = []
+        self.inventory_manager.events.subscribe(self.events.append)
+
+    def test_changes_publish_typed_events(self):
+        manager = self.inventory_manager
+        manager.add_item("Dock", "Rice", 2)
+        manager.increment("Dock", "Milk", -1)
+        manager.modify_item_quantity("Dock", "Rice", 6)
+        manager.transfer("Dock", "Chiller", "Milk", 3)
+        self.assertEqual(self.events, [
+            ItemAdded("Dock", "Rice", 2, "add"),
+            QuantityChanged("Dock", "Milk", 5, 4, "remove"),
+            QuantityChanged("Dock", "Rice", 2, 6, "adjust"),
+            SectionCreated("Chiller"),
+            QuantityChanged("Dock", "Milk", 4, 1, "move"),
+            ItemAdded("Chiller", "Milk", 3, "move"),
+            StockTransferred("Dock", "Chiller", "Milk", 3),
+        ])
+
+    def test_batch_delivers_its_events_together(self):
+        manager = self.inventory_manager
+        deliveries = []
+        manager.events.subscribe(deliveries.append, *ROW_EVENTS, batched=True)
+        with manager.batch():
+            manager.add_section("Aisle 1")
+            with manager.batch():
+                manager.add_item("Aisle 1", "Tea", 1)
+            manager.increment("Dock", "Milk", 2)
+            self.assertEqual(self.events, [])
+        self.assertEqual(len(self.events), 3)
+        self.assertEqual(deliveries, [[ItemAdded("Aisle 1", "Tea", 1, "add"), QuantityChanged("Dock", "Milk", 5, 7, "add")]])
+
+        # Another thread's changes aren't held back by this thread's batch.
+        with manager.batch():
+            worker = threading.Thread(target=manager.increment, args=("Dock", "Milk", 1))
+            worker.start()
+            worker.join()
+            self.assertEqual(self.events[-1], QuantityChanged("Dock", "Milk", 7, 8, "add"))
+
+    def test_async_subscriber_uses_a_bounded_queue(self):
+        bus = EventBus()
+        release = threading.Event()
+        seen = []
+
+        def slow(event):
+            release.wait()
+            seen.append(event)
+
+        subscription = bus.subscribe(slow, SectionCreated, queue_size=1)
+        self.assertTrue(subscription.is_async)
+        bus.publish(SectionCreated("A"))   # being handled
+        bus.publish(SectionCreated("B"))   # queued
+        publisher = threading.Thread(target=bus.publish, args=(SectionCreated("C"),))
+        publisher.start()
+        publisher.join(0.2)
+        self.assertTrue(publisher.is_alive())   # waiting for room in the queue
+        release.set()
+        publisher.join()
+        bus.publish(ItemAdded("A", "Tea", 1, "add"))   # not a subscribed type
+        bus.join()
+        self.assertEqual(seen, [SectionCreated("A"), SectionCreated("B"), SectionCreated("C")])
+        bus.close()
+        self.assertFalse(subscription._thread.is_alive())
+
+    def test_failing_subscriber_does_not_fail_the_change(self):
+        errors = []
+
+        def failing(event):
+            raise RuntimeError("boom")
+
+        self.inventory_manager.events.subscribe(failing, on_error=errors.append)
+        later = []
+        self.inventory_manager.events.subscribe(later.append)
+        self.inventory_manager.add_item("Dock", "Rice", 5)
+        self.assertEqual(self.inventory_manager.get_item("Dock", "Rice").quantity, 5)
+        self.assertEqual([str(error) for error in errors], ["boom"])
+        self.assertEqual(later, [ItemAdded("Dock", "Rice", 5, "add")])
+
+    def test_async_errors_go_to_on_error(self):
+        bus = EventBus()
+        errors = []
+
+        def failing(event):
+            raise RuntimeError(event.section)
+
+        subscription = bus.subscribe(failing, queue_size=4, on_error=errors.append)
+        bus.publish(SectionCreated("A"), SectionCreated("B"))
+        bus.unsubscribe(subscription)
+        self.assertEqual([str(error) for error in errors], ["A", "B"])
+        bus.publish(SectionCreated("C"))
+        with self.assertRaises(ValueError):
+            bus.subscribe(failing, queue_size=0)
+
+
+class TestUndoStack(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Dock")
+        self.inventory_manager.add_item("Dock", "Milk", 5, "2025-01-10")
+        self.undo_stack = UndoStack(self.inventory_manager, capacity=3, coalesce_seconds=0)
+
+    def quantity(self, section="Dock", item="Milk"):
+        return self.inventory_manager.get_item(section, item).quantity
+
+    def test_undo_and_redo_restore_touched_rows(self):
+        self.undo_stack.add_item("Dock", "Milk", 1000, "2025-01-03")
+        self.undo_stack.transfer("Dock", "Chiller", "Milk", 1002)
+        self.assertEqual(self.undo_stack.undo(), "move 1002 Milk")
+        self.assertEqual(self.quantity("Chiller"), 0)
+        self.assertEqual(self.undo_stack.undo(), "add 1000 Milk")
+        self.assertEqual(self.inventory_manager.get_item("Dock", "Milk").lots, [(datetime.date(2025, 1, 10), 5)])
+        self.assertIsNone(self.undo_stack.undo())
+
+        self.undo_stack.redo()
+        self.undo_stack.redo()
+        self.assertEqual((self.quantity(), self.quantity("Chiller")), (3, 1002))
+        self.assertEqual(self.inventory_manager.get_item("Chiller", "Milk").expiry_date, datetime.date(2025, 1, 3))
+        self.assertFalse(self.undo_stack.can_redo)
+        self.assertEqual(self.inventory_manager.check_aggregates(), [])
+
+    def test_rapid_edits_to_one_item_are_one_step(self):
+        self.undo_stack.coalesce_seconds = 60
+        for quantity in (1000, 100, 10):
+            self.undo_stack.modify_item_quantity("Dock", "Milk", quantity)
+        self.undo_stack.increment("Dock", "Rice", 4)
+        self.undo_stack.undo()
+        self.undo_stack.undo()
+        self.assertEqual((self.quantity(), self.quantity(item="Rice")), (5, 0))
+        self.assertFalse(self.undo_stack.can_undo)
+
+    def test_history_is_bounded_and_new_changes_clear_redo(self):
+        for quantity in range(1, 6):
+            self.undo_stack.modify_item_quantity("Dock", "Milk", quantity)
+        while self.undo_stack.undo():
+            pass
+        self.assertEqual(self.quantity(), 2)
+        self.undo_stack.modify_item_quantity("Dock", "Milk", 9)
+        self.assertFalse(self.undo_stack.can_redo)
+
+    def test_undo_keeps_changes_made_since(self):
+        self.inventory_manager.add_item("Dock", "Bolt", 100)
+        self.undo_stack.modify_item_quantity("Dock", "Bolt", 1000)
+        self.inventory_manager.add_item("Dock", "Bolt", 50)   # e.g. an import
+        self.undo_stack.transfer("Dock", "Chiller", "Milk", 2)
+        self.inventory_manager.add_item("Chiller", "Milk", 4, "2025-01-20")
+        self.undo_stack.undo()
+        self.undo_stack.undo()
+        self.assertEqual(self.quantity(item="Bolt"), 150)
+        self.assertEqual(self.inventory_manager.get_item("Chiller", "Milk").lots, [(datetime.date(2025, 1, 20), 4)])
+        self.assertEqual(self.quantity(), 5)
+        self.assertEqual(self.inventory_manager.check_aggregates(), [])
+
+    def test_undo_refuses_when_the_stock_is_gone(self):
+        self.undo_stack.add_item("Dock", "Milk", 10, "2025-01-03")
+        self.inventory_manager.increment("Dock", "Milk", -12)
+        before = self.inventory_manager.get_item("Dock", "Milk").lots
+        with self.assertRaises(ValueError):
+            self.undo_stack.undo()
+        self.assertEqual(self.inventory_manager.get_item("Dock", "Milk").lots, before)
+        self.assertTrue(self.undo_stack.can_undo)
+        self.assertFalse(self.undo_stack.can_redo)
+
+    def test_undo_notifies_only_restored_rows(self):
+        self.inventory_manager.add_item("Dock", "Rice", 2)
+        model = InventoryTableModel(self.inventory_manager)
+        self.undo_stack.modify_item_quantity("Dock", "Milk", 1000)
+        model.take_changes()
+        self.undo_stack.undo()
+        self.assertEqual(model.take_changes(), (False, {("Dock", "Milk")}))
+
+class TestConcurrentInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager(concurrent=True)
+        for section in ("Dock", "Aisle 1", "Aisle 2"):
+            self.inventory_manager.add_section(section)
+        self.inventory_manager.add_item("Dock", "Box", 1000)
+
+    def run_threads(self, target, count=8):
+        threads = [threading.Thread(target=target, args=(number,)) for number in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_batch_only_holds_back_its_own_thread(self):
+        storage = CountingStorage()
+        manager = InventoryManager(storage, concurrent=True)
+        manager.add_section("Dock")
+        seen = []
+        manager.events.subscribe(lambda event: seen.append(event.item), *ROW_EVENTS)
+        batch_open, other_done = threading.Event(), threading.Event()
+
+        def batched():
+            with manager.batch():
+                manager.add_item("Dock", "Batched", 1)
+                batch_open.set()
+                other_done.wait(5)
+
+        thread = threading.Thread(target=batched)
+        thread.start()
+        batch_open.wait(5)
+        commits = storage.commits
+        manager.add_item("Dock", "Other", 1)
+        self.assertEqual(seen, ["Other"])
+        self.assertEqual(storage.commits, commits + 1)
+        other_done.set()
+        thread.join()
+        self.assertEqual(seen, ["Other", "Batched"])
+        self.assertEqual(storage.commits, commits + 2)
+
+    def test_increment(self):
+        self.assertEqual(self.inventory_manager.increment("Aisle 1", "Tape", 3), 3)
+        self.assertEqual(self.inventory_manager.increment("Aisle 1", "Tape", -1), 2)
+        with self.assertRaises(ValueError):
+            self.inventory_manager.increment("Aisle 1", "Tape", -5)
+        with self.assertRaises(ValueError):
+            self.inventory_manager.increment("Aisle 1", "Glue", -1)
+
+    def test_concurrent_increments_are_not_lost(self):
+        def worker(number):
+            for _ in range(2000):
+                self.inventory_manager.increment("Aisle 1", "Box", 1)
+                self.inventory_manager.add_item("Aisle 2", "Box", 1)
+        self.run_threads(worker)
+        self.assertEqual(self.inventory_manager.sections["Aisle 1"].items["Box"].quantity, 16000)
+        self.assertEqual(self.inventory_manager.sections["Aisle 2"].items["Box"].quantity, 16000)
+
+    def test_concurrent_transfers_keep_stock(self):
+        sections = ("Dock", "Aisle 1", "Aisle 2")
+
+        def worker(number):
+            for step in range(500):
+                source = sections[(number + step) % 3]
+                target = sections[(number + step + 1) % 3]
+                try:
+                    self.inventory_manager.transfer(source, target, "Box", 1)
+                except ValueError:
+                    pass  # source ran dry or has no Box row yet
+        self.run_threads(worker)
+        total = sum(
+            row["Quantity"] for row in self.inventory_manager.get_inventory_data() if row["Item Name"] == "Box"
+        )
+        self.assertEqual(total, 1000)
+
+    def test_different_sections_do_not_block_each_other(self):
+        locks = SectionLocks(stripes=1024)
+        first = "Aisle 1"
+        second = next(
+            f"Aisle {n}" for n in range(2, 5000) if hash(f"Aisle {n}") % 1024 != hash(first) % 1024
+        )
+        finished = threading.Event()
+
+        def write_second():
+            with locks.write(second):
+                finished.set()
+
+        with locks.write(first):
+            threading.Thread(target=write_second).start()
+            self.assertTrue(finished.wait(timeout=5))
+
+    def test_writer_waits_for_readers(self):
+        locks = SectionLocks()
+        written = threading.Event()
+
+        def write():
+            with locks.write("Aisle 1"):
+                written.set()
+
+        with locks.read("Aisle 1"):
+            with locks.read("Aisle 1"):
+                threading.Thread(target=write).start()
+                self.assertFalse(written.wait(timeout=0.1))
+        self.assertTrue(written.wait(timeout=5))
+
+    def test_expiry_index_stays_consistent(self):
+        self.inventory_manager.expiring_before("2030-01-01")
+
+        def worker(number):
+            for step in range(200):
+                self.inventory_manager.add_item("Aisle 1", f"Milk {number}", 1, "2025-01-01")
+        self.run_threads(worker)
+        self.assertEqual(len(self.inventory_manager.expiring_before("2030-01-01")), 8)
+
+class CountingStorage(MemoryStorage):
+
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+async def http_request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    return status, json.loads(await reader.readexactly(length))
+
+
+class TestInventoryServer(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = CountingStorage()
+        self.inventory_manager = InventoryManager(self.storage)
+
+    def run_with_server(self, scenario, **options):
+        async def run():
+            server = InventoryServer(self.inventory_manager, port=0, **options)
+            await server.start()
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_add_query_and_move_over_one_connection(self):
+        async def scenario(server):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            responses = [
+                await http_request(reader, writer, "POST", "/items",
+                                   {"section": "Dock", "item": "Milk", "quantity": 5, "expiry_date": "2025-01-01"}),
+                await http_request(reader, writer, "POST", "/moves",
+                                   {"source": "Dock", "target": "Chiller", "item": "Milk", "quantity": 2}),
+                await http_request(reader, writer, "PUT", "/items",
+                                   {"section": "Dock", "item": "Milk", "quantity": 1}),
+                await http_request(reader, writer, "GET", "/inventory?section=Chiller"),
+                await http_request(reader, writer, "GET", "/expiring?before=2025-02-01"),
+            ]
+            writer.close()
+            return responses
+
+        responses = self.run_with_server(scenario)
+        self.assertEqual([status for status, _ in responses], [200] * 5)
+        self.assertEqual(responses[0][1]["quantity"], 5)
+        self.assertEqual(responses[3][1]["rows"], [
+            {"Section Name": "Chiller", "Item Name": "Milk", "Quantity": 2, "Expiry Date": "2025-01-01"}
+        ])
+        self.assertEqual(responses[4][1]["rows"], [
+            ["2025-01-01", "Chiller", "Milk"], ["2025-01-01", "Dock", "Milk"]
+        ])
+        self.assertEqual(self.inventory_manager.sections["Dock"].items["Milk"].quantity, 1)
+
+    def test_errors(self):
+        async def scenario(server):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            responses = [
+                await http_request(reader, writer, "POST", "/items", {"section": "Dock", "item": "Milk"}),
+                await http_request(reader, writer, "POST", "/moves",
+                                   {"source": "Dock", "target": "Chiller", "item": "Milk", "quantity": 2}),
+                await http_request(reader, writer, "GET", "/nowhere"),
+                await http_request(reader, writer, "DELETE", "/items"),
+                await http_request(reader, writer, "GET", "/items?section=Dock"),
+            ]
+            writer.close()
+            return [status for status, _ in responses]
+
+        self.assertEqual(self.run_with_server(scenario), [400, 400, 404, 405, 404])
+
+    def test_concurrent_writes_share_a_commit(self):
+        async def client(server, number):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for _ in range(10):
+                status, _ = await http_request(reader, writer, "POST", "/items",
+                                               {"section": "Dock", "item": f"SKU{number}", "quantity": 1})
+                self.assertEqual(status, 200)
+            writer.close()
+
+        async def scenario(server):
+            await asyncio.gather(*(client(server, number) for number in range(20)))
+
+        self.run_with_server(scenario)
+        self.assertEqual(sum(row["Quantity"] for row in self.inventory_manager.get_inventory_data()), 200)
+        self.assertLess(self.storage.commits, 100)
+
+    def test_back_pressure(self):
+        async def scenario(server):
+            connections = [await asyncio.open_connection("127.0.0.1", server.port) for _ in range(5)]
+            responses = await asyncio.gather(*(
+                http_request(reader, writer, "POST", "/sections", {"name": f"Aisle {number}"})
+                for number, (reader, writer) in enumerate(connections)
+            ))
+            for _, writer in connections:
+                writer.close()
+            return sorted(status for status, _ in responses)
+
+        self.assertIn(503, self.run_with_server(scenario, max_pending_writes=2))
+
+class TestOperationLog(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.directory = self.temp_dir.name
+
+    def open_manager(self, **options):
+        manager = InventoryManager(OperationLogStorage(self.directory, **options))
+        self.addCleanup(manager.storage._file.close)
+        return manager
+
+    def segment_size(self, manager):
+        return os.path.getsize(os.path.join(self.directory, f"segment-{manager.storage.segment:06d}.log"))
+
+    def test_replay_after_restart(self):
+        manager = self.open_manager()
+        manager.add_section("Dock")
+        manager.add_item("Dock", "Milk", 5, "2025-01-01")
+        manager.transfer("Dock", "Chiller", "Milk", 2)
+        manager.close()
+
+        recovered = self.open_manager()
+        self.assertEqual(recovered.get_inventory_data(), manager.get_inventory_data())
+
+    def test_snapshot_then_tail(self):
+        manager = self.open_manager()
+        manager.add_section("Dock")
+        manager.add_item("Dock", "Milk", 5)
+        manager.storage.snapshot()
+        manager.modify_item_quantity("Dock", "Milk", 9)
+        manager.close()
+
+        recovered = self.open_manager()
+        self.assertEqual(recovered.storage.segment, 2)
+        self.assertEqual(recovered.sections["Dock"].items["Milk"].quantity, 9)
+
+    def test_automatic_snapshots(self):
+        manager = self.open_manager(snapshot_every=10)
+        manager.add_section("Dock")
+        for number in range(25):
+            manager.add_item("Dock", f"SKU{number}", 1)
+        self.assertEqual(manager.storage.segment, 3)
+        manager.close()
+        self.assertEqual(len(self.open_manager().sections["Dock"]), 25)
+
+    def test_snapshots_while_threads_write(self):
+        manager = InventoryManager(OperationLogStorage(self.directory, snapshot_every=5), concurrent=True)
+        errors = []
+
+        def write(number):
+            try:
+                for i in range(200):
+                    section = f"Aisle {number}-{i % 7}"
+                    manager.add_section(section)
+                    manager.add_item(section, f"SKU{i}", 2, "2025-01-01" if i % 2 else None)
+                    manager.transfer_many([(section, f"Dock {number}", f"SKU{i}", 1)])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        manager.close()
+        self.assertEqual(errors, [])
+        self.assertGreater(manager.storage.segment, 10)
+        self.assertEqual(self.open_manager().get_inventory_data(), manager.get_inventory_data())
+
+    def test_snapshot_waits_for_writers(self):
+        manager = InventoryManager(OperationLogStorage(self.directory), concurrent=True)
+        self.addCleanup(manager.close)
+        manager.add_section("Dock")
+        with manager._locks.write("Dock"):
+            snapshot = threading.Thread(target=manager.storage.snapshot)
+            snapshot.start()
+            snapshot.join(0.2)
+            self.assertTrue(snapshot.is_alive())
+        snapshot.join()
+        self.assertEqual(manager.storage.segment, 2)
+
+    def test_batch_is_one_group_commit(self):
+        manager = self.open_manager()
+        manager.add_section("Dock")
+        size_before = self.segment_size(manager)
+        with manager.batch():
+            manager.add_item("Dock", "Milk", 1)
+            manager.add_item("Dock", "Bread", 1)
+            self.assertEqual(self.segment_size(manager), size_before)
+        self.assertGreater(self.segment_size(manager), size_before)
+
+    def test_torn_record_is_discarded(self):
+        manager = self.open_manager()
+        manager.add_section("Dock")
+        manager.add_item("Dock", "Milk", 5)
+        manager.close()
+        path = os.path.join(self.directory, "segment-000001.log")
+        with open(path, "ab") as f:
+            f.write(b"\x02partial")
+
+        recovered = self.open_manager()
+        self.assertEqual(recovered.sections["Dock"].items["Milk"].quantity, 5)
+        recovered.add_item("Dock", "Milk", 1)
+        recovered.close()
+        self.assertEqual(self.open_manager().sections["Dock"].items["Milk"].quantity, 6)
+
+    def test_point_in_time(self):
+        manager = self.open_manager()
+        manager.add_section("Dock")
+        manager.add_item("Dock", "Milk", 5)
+        time.sleep(0.01)
+        checkpoint = time.time()
+        time.sleep(0.01)
+        manager.storage.snapshot()
+        manager.modify_item_quantity("Dock", "Milk", 1)
+        manager.add_item("Dock", "Bread", 3)
+        manager.close()
+
+        state = load_state_at(self.directory, checkpoint)
+        self.assertEqual(list(state), ["Dock"])
+        self.assertEqual(str(state["Dock"]), "Section: Dock\nMilk: 5")
+        self.assertEqual(load_state_at(self.directory, time.time())["Dock"].items["Milk"].quantity, 1)
+
+    def test_prune_removes_old_history(self):
+        manager = self.open_manager()
+        manager.add_section("Dock")
+        manager.storage.snapshot()
+        manager.add_item("Dock", "Milk", 5)
+        manager.storage.snapshot()
+        manager.storage.prune(keep_snapshots=1)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["segment-000003.log", "snapshot-000003.pkl"])
+        with self.assertRaises(ValueError):
+            load_state_at(self.directory, 0)
+        manager.close()
+
+class TestMovementHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.directory = self.temp_dir.name
+        self.history = MovementHistory(self.directory, user="clerk")
+        self.addCleanup(self.history.close)
+
+    def test_manager_records_every_movement(self):
+        manager = InventoryManager(history=self.history)
+        manager.add_section("Dock")
+        manager.add_item("Dock", "Milk", 5, "2025-01-01")
+        manager.modify_item_quantity("Dock", "Milk", 3)
+        manager.transfer("Dock", "Chiller", "Milk", 2)
+        manager.increment("Chiller", "Milk", -1)
+        self.assertEqual(
+            [movement[1:] for movement in manager.item_movements("Milk")],
+            [("Milk", None, "Dock", 5, "add", "clerk"), ("Milk", "Dock", None, 2, "adjust", "clerk"),
+             ("Milk", "Dock", "Chiller", 2, "move", "clerk"), ("Milk", "Chiller", None, 1, "remove", "clerk")]
+        )
+        self.assertEqual(len(self.history.movements(section="Chiller")), 2)
+        with self.assertRaises(ValueError):
+            InventoryManager().item_movements("Milk")
+
+    def test_queries_use_day_segments_and_their_indexes(self):
+        now = time.time()
+        for days_ago in (40, 20, 1):
+            self.history.record("Milk", None, "Dock", days_ago, "add", timestamp=now - days_ago * SECONDS_PER_DAY)
+            self.history.record("Rice", "Dock", "Dry", 1, "move", timestamp=now - days_ago * SECONDS_PER_DAY)
+        self.history.close()
+
+        reopened = MovementHistory(self.directory)
+        self.addCleanup(reopened.close)
+        self.assertEqual(len(reopened.days()), 3)
+        recent = reopened.movements(item="Milk", start=now - 30 * SECONDS_PER_DAY)
+        self.assertEqual([movement.quantity for movement in recent], [20, 1])
+        self.assertEqual(len(reopened.movements(item="Rice", section="Dry")), 3)
+        self.assertEqual(reopened.movements(item="Milk", section="Dry"), [])
+
+    def test_torn_line_is_dropped_and_index_caught_up(self):
+        self.history.record("Milk", None, "Dock", 5, "add")
+        self.history.close()
+        day = self.history.days()[0]
+        with open(os.path.join(self.directory, day + ".jsonl"), "ab") as f:
+            f.write(b'[1.0,"Rice",null,"Dock",3,"add","clerk"]\n[2.0,"Ri')
+        reopened = MovementHistory(self.directory)
+        self.addCleanup(reopened.close)
+        reopened.record("Salt", None, "Dock", 1, "add")
+        self.assertEqual([movement.item for movement in reopened.movements()], ["Milk", "Rice", "Salt"])
+
+    def test_compaction_rolls_old_days_into_summaries(self):
+        old = time.time() - 100 * SECONDS_PER_DAY
+        self.history.record("Milk", None, "Dock", 5, "add", timestamp=old)
+        self.history.record("Milk", "Dock", "Chiller", 2, "move", timestamp=old + 1)
+        self.history.record("Milk", None, "Dock", 1, "add")
+        self.assertEqual(self.history.compact(time.time() - 90 * SECONDS_PER_DAY), [segment_day(old)])
+        self.assertEqual(len(self.history.movements()), 1)
+        self.assertEqual(
+            self.history.daily_summaries(item="Milk", section="Dock"),
+            [DailySummary(segment_day(old), "Milk", "Dock", 5, 2, 2)]
+        )
+
+class TestAggregates(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        for section in ("Dock", "Aisle 1"):
+            self.inventory_manager.add_section(section)
+        self.inventory_manager.add_item("Dock", "Milk", 10)
+        self.inventory_manager.add_item("Dock", "Rice", 4)
+        self.inventory_manager.add_item("Aisle 1", "Milk", 3)
+
+    def test_totals(self):
+        self.assertEqual(self.inventory_manager.total_units(), 17)
+        self.assertEqual(self.inventory_manager.section_total("Dock"), 14)
+        self.assertEqual(self.inventory_manager.section_sku_count("Dock"), 2)
+        self.assertEqual(self.inventory_manager.item_total("Milk"), 13)
+
+    def test_totals_follow_changes(self):
+        self.inventory_manager.total_units()
+        self.inventory_manager.transfer("Dock", "Aisle 1", "Rice", 4)
+        self.inventory_manager.modify_item_quantity("Dock", "Milk", 2)
+        self.inventory_manager.increment("Aisle 1", "Tea", 5)
+        self.assertEqual(self.inventory_manager.section_total("Dock"), 2)
+        self.assertEqual(self.inventory_manager.section_sku_count("Dock"), 1)
+        self.assertEqual(self.inventory_manager.section_total("Aisle 1"), 12)
+        self.assertEqual(self.inventory_manager.total_units(), 14)
+        self.assertEqual(self.inventory_manager.check_aggregates(), [])
+
+    def test_low_stock(self):
+        self.inventory_manager.set_reorder_point("Milk", 12)
+        self.assertFalse(self.inventory_manager.is_low_stock("Milk"))
+        self.inventory_manager.transfer("Dock", "Aisle 1", "Milk", 5)
+        self.assertFalse(self.inventory_manager.is_low_stock("Milk"))
+        self.inventory_manager.modify_item_quantity("Aisle 1", "Milk", 0)
+        self.assertEqual(self.inventory_manager.low_stock_items(), {"Milk"})
+        self.inventory_manager.set_default_reorder_point(4)
+        self.assertEqual(self.inventory_manager.low_stock_items(), {"Milk", "Rice"})
+        self.inventory_manager.set_reorder_point("Milk", None)
+        self.assertEqual(self.inventory_manager.low_stock_count(), 1)
+        self.assertEqual(self.inventory_manager.check_aggregates(), [])
+
+    def test_random_operations_match_full_recompute(self):
+        rng = random.Random(7)
+        sections = ["Dock", "Aisle 1", "Aisle 2"]
+        self.inventory_manager.add_section("Aisle 2")
+        self.inventory_manager.set_default_reorder_point(5)
+        self.inventory_manager.total_units()
+        for _ in range(2000):
+            section = rng.choice(sections)
+            item = f"SKU{rng.randrange(20)}"
+            action = rng.randrange(4)
+            try:
+                if action == 0:
+                    self.inventory_manager.add_item(section, item, rng.randint(1, 9))
+                elif action == 1:
+                    self.inventory_manager.modify_item_quantity(section, item, rng.randint(0, 9))
+                elif action == 2:
+                    self.inventory_manager.increment(section, item, rng.randint(-5, 5) or 1)
+                else:
+                    self.inventory_manager.transfer(section, rng.choice(sections), item, rng.randint(1, 5))
+            except ValueError:
+                pass
+        self.assertEqual(self.inventory_manager.check_aggregates(), [])
+
+
+class TestForecast(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.history = MovementHistory(self.temp_dir.name, outbound_sections={"Dispatch"})
+        self.addCleanup(self.history.close)
+        self.inventory_manager = InventoryManager(history=self.history)
+        self.inventory_manager.add_section("Dock")
+
+    def test_consumption_counts_removals_and_outbound_moves(self):
+        manager = self.inventory_manager
+        undo_stack = UndoStack(manager, coalesce_seconds=0)
+        manager.add_item("Dock", "Milk", 20)
+        manager.increment("Dock", "Milk", -3)
+        manager.modify_item_quantity("Dock", "Milk", 15)   # a count correction
+        manager.transfer("Dock", "Chiller", "Milk", 2)
+        manager.transfer("Dock", "Dispatch", "Milk", 4)
+        undo_stack.increment("Dock", "Milk", -5)
+        undo_stack.undo()
+        [(day, consumed)] = self.history.daily_consumption(time.time())
+        self.assertEqual(consumed, {"Milk": 7})
+
+        self.history.close()
+        reopened = MovementHistory(self.temp_dir.name)
+        self.addCleanup(reopened.close)
+        reopened.compact(time.time() + SECONDS_PER_DAY)
+        self.assertEqual(reopened.days(), [])
+        self.assertEqual(reopened.daily_consumption(time.time()), [(day, {"Milk": 7})])
+
+    def test_undo_only_reverses_consumption_it_counted(self):
+        manager = self.inventory_manager
+        undo_stack = UndoStack(manager, coalesce_seconds=0)
+        manager.add_item("Dock", "Bolt", 100)
+        undo_stack.transfer("Dock", "Aisle 1", "Bolt", 30)
+        undo_stack.undo()
+        undo_stack.modify_item_quantity("Dock", "Bolt", 10)
+        undo_stack.undo()
+        self.assertEqual(self.history.daily_consumption(time.time())[0][1], {})
+
+        undo_stack.transfer("Dock", "Dispatch", "Bolt", 8)
+        undo_stack.increment("Dock", "Bolt", -2)
+        undo_stack.undo()
+        undo_stack.undo()
+        undo_stack.redo()
+        self.assertEqual(self.history.daily_consumption(time.time())[0][1], {"Bolt": 8})
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_forecast_matches_per_item_calculation(self):
+        from Forecast import consumption_matrix, forecast
+
+        rng = random.Random(3)
+        daily = [(str(day), {f"SKU{i}": rng.randint(0, 9) for i in range(50) if rng.random() < 0.7})
+                 for day in range(40)]
+        items, days, matrix = consumption_matrix(daily)
+        self.assertEqual(len(days), 40)
+        stock = [rng.randint(0, 100) for _ in items]
+        result = forecast(items, matrix, stock, window=14, smoothing=0.3, lead_days=5, review_days=7)
+        for row, item in enumerate(items):
+            use = [consumed.get(item, 0) for _, consumed in daily]
+            smoothed = use[0]
+            for units in use[1:]:
+                smoothed = 0.3 * units + 0.7 * smoothed
+            self.assertAlmostEqual(result.demand[row], smoothed, places=3)
+            self.assertAlmostEqual(result.moving_average[row], sum(use[-14:]) / 14, places=4)
+            if smoothed > 0:
+                self.assertAlmostEqual(result.days_of_cover[row], stock[row] / smoothed, places=2)
+        suggestions = result.suggestions()
+        for row, item in enumerate(items):
+            if stock[row] <= result.reorder_point[row] and result.demand[row] > 0:
+                self.assertGreaterEqual(stock[row] + suggestions[item], result.order_up_to[row])
+            else:
+                self.assertNotIn(item, suggestions)
+        with self.assertRaises(ValueError):
+            forecast(items, matrix, stock, smoothing=0)
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_suggestions_follow_stock(self):
+        manager = self.inventory_manager
+        manager.add_item("Dock", "Rice", 60)
+        manager.add_item("Dock", "Salt", 5)
+        now = time.time()
+        for days_ago in range(1, 29):
+            self.history.record("Rice", "Dock", None, 10, "remove", timestamp=now - days_ago * SECONDS_PER_DAY)
+        self.assertEqual(manager.suggested_order("Rice"), 0)
+
+        result = manager.update_reorder_forecast(lead_days=7, review_days=7)
+        self.assertEqual(result.items, ["Rice"])
+        self.assertAlmostEqual(result.days_of_cover[0], 6, places=3)
+        self.assertEqual(result.suggestions(), {"Rice": 80})
+        self.assertEqual(manager.suggested_order("Rice"), 80)
+        self.assertEqual(manager.suggested_order("Salt"), 0)
+
+        model = InventoryTableModel(manager)
+        self.assertEqual(model.row_values(("Dock", "Rice"))[4], 80)
+        self.assertEqual(model.row_values(("Dock", "Salt"))[4], "")
+        manager.add_item("Dock", "Rice", 20)
+        self.assertEqual(manager.suggested_order("Rice"), 0)
+        model.close()
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_forecast_leaves_unopened_sections_unloaded(self):
+        path = os.path.join(self.temp_dir.name, "inventory.db")
+        manager = InventoryManager(SQLiteStorage(path))
+        for section, quantity in (("Aisle 1", 30), ("Aisle 2", 20), ("Aisle 3", 10)):
+            manager.add_section(section)
+            manager.add_item(section, "Rice", quantity)
+            manager.add_item(section, "Salt", 1)
+        manager.close()
+        now = time.time()
+        for days_ago in range(1, 29):
+            self.history.record("Rice", "Aisle 1", None, 10, "remove", timestamp=now - days_ago * SECONDS_PER_DAY)
+
+        reopened = InventoryManager(SQLiteStorage(path), history=self.history)
+        self.addCleanup(reopened.storage.close)
+        reopened.get_item_names_in_section("Aisle 1")
+        reopened.add_item("Aisle 1", "Rice", 5)
+        result = reopened.update_reorder_forecast(lead_days=7, review_days=7)
+        self.assertEqual(result.stock.tolist(), [65])
+        self.assertEqual([reopened.sections.is_loaded(name) for name in ("Aisle 1", "Aisle 2", "Aisle 3")],
+                         [True, False, False])
+        self.assertEqual(reopened.suggested_order("Rice"), 75)
+        reopened.transfer("Aisle 2", "Dispatch", "Rice", 20)
+        self.assertEqual(reopened.suggested_order("Rice"), 75)
+        reopened.increment("Aisle 3", "Rice", -10)
+        self.assertEqual(reopened.suggested_order("Rice"), 85)
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        for section in ("Dairy", "Dry Goods"):
+            self.inventory_manager.add_section(section)
+        self.inventory_manager.add_item("Dairy", "Milk", 5, "2025-03-02")
+        self.inventory_manager.add_item("Dairy", "Buttermilk", 2, "2025-04-10")
+        self.inventory_manager.add_item("Dry Goods", "Millet", 8)
+        self.inventory_manager.add_item("Dry Goods", "milk powder", 4, "2025-03-20")
+
+    def test_prefix_and_substring_ignore_case(self):
+        self.assertEqual(
+            self.inventory_manager.search_items("MIL", mode="prefix"),
+            [("Dairy", "Milk"), ("Dry Goods", "milk powder"), ("Dry Goods", "Millet")]
+        )
+        self.assertEqual(
+            self.inventory_manager.search_items("milk"),
+            [("Dairy", "Buttermilk"), ("Dairy", "Milk"), ("Dry Goods", "milk powder")]
+        )
+        self.assertEqual(self.inventory_manager.search_items("ml"), [])
+        with self.assertRaises(ValueError):
+            self.inventory_manager.search_items("milk", mode="fuzzy")
+
+    def test_section_and_expiry_filters_and_paging(self):
+        self.assertEqual(
+            self.inventory_manager.search_items("milk", section="Dairy"),
+            [("Dairy", "Buttermilk"), ("Dairy", "Milk")]
+        )
+        self.assertEqual(
+            self.inventory_manager.search_items(expiry_bucket="2025-03"),
+            [("Dairy", "Milk"), ("Dry Goods", "milk powder")]
+        )
+        self.assertEqual(self.inventory_manager.search_items(expiry_bucket=NO_EXPIRY), [("Dry Goods", "Millet")])
+        self.assertEqual(
+            self.inventory_manager.search_items("i", offset=1, limit=2),
+            [("Dairy", "Milk"), ("Dry Goods", "milk powder")]
+        )
+
+    def test_index_follows_changes(self):
+        self.inventory_manager.search_items()
+        self.inventory_manager.transfer("Dairy", "Cold Room", "Milk", 1)
+        self.inventory_manager.add_item("Dry Goods", "Oat Milk", 6)
+        self.assertEqual(
+            self.inventory_manager.search_items("milk", mode="prefix"),
+            [("Cold Room", "Milk"), ("Dairy", "Milk"), ("Dry Goods", "milk powder")]
+        )
+        self.assertEqual(self.inventory_manager.search_items("oat"), [("Dry Goods", "Oat Milk")])
+
+    def test_matches_brute_force_on_larger_inventory(self):
+        rng = random.Random(3)
+        index = SearchIndex()
+        rows = [
+            (f"S{rng.randrange(40)}", f"Item-{rng.randrange(5000):04d}", rng.choice([None, "2025-01-05", "2025-02-07"]))
+            for _ in range(3000)
+        ]
+        index.rebuild((section, item, [expiry]) for section, item, expiry in rows[:2000])
+        for section, item, expiry in rows[2000:]:
+            index.update(section, item, [expiry])
+        expected = {}
+        for section, item, expiry in rows:
+            expected.setdefault((section, item), expiry)
+        for text, mode, section, bucket in [
+            ("12", "contains", None, None), ("item-01", "prefix", None, None),
+            ("234", "contains", "S7", None), ("", "contains", None, "2025-02"),
+        ]:
+            matches = sorted(
+                (item.lower(), (row_section, item))
+                for (row_section, item), expiry in expected.items()
+                if (item.lower().startswith(text) if mode == "prefix" else text in item.lower())
+                and section in (None, row_section) and bucket in (None, expiry_bucket(expiry))
+            )
+            self.assertEqual(index.search(text, mode, section, bucket, offset=5, limit=20),
+                             [key for _, key in matches][5:25])
+
+    def test_table_model_filter(self):
+        model = InventoryTableModel(self.inventory_manager)
+        model.set_filter("milk", section="Dairy")
+        self.assertEqual(model.keys, [("Dairy", "Buttermilk"), ("Dairy", "Milk")])
+        self.assertTrue(model.take_changes()[0])
+
+        self.inventory_manager.add_item("Dairy", "Goat Milk", 1)
+        self.inventory_manager.add_item("Dairy", "Cream", 1)
+        self.assertTrue(model.take_changes()[0])
+        self.assertEqual(model.keys, [("Dairy", "Buttermilk"), ("Dairy", "Goat Milk"), ("Dairy", "Milk")])
+
+        model.set_filter("")
+        self.assertEqual(len(model), 6)
+
+
+class TestNamePickers(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        for section in ("dock", "Aisle 2", "Aisle 1"):
+            self.inventory_manager.add_section(section)
+        for item in ("Tape", "bolts", "Twine", "Tarp"):
+            self.inventory_manager.add_item("Aisle 1", item, 1)
+
+    def test_names_are_sorted_paged_and_matched_by_prefix(self):
+        self.assertEqual(self.inventory_manager.match_section_names(), ["Aisle 1", "Aisle 2", "dock"])
+        self.assertEqual(self.inventory_manager.match_section_names("AISLE"), ["Aisle 1", "Aisle 2"])
+        self.assertEqual(self.inventory_manager.match_item_names("Aisle 1", "t", offset=1, limit=1), ["Tarp"])
+        self.assertEqual(self.inventory_manager.match_item_names("Aisle 1", "tw"), ["Twine"])
+        self.assertEqual(self.inventory_manager.match_item_names("Nowhere"), [])
+        self.assertNotIn("Nowhere", self.inventory_manager._item_name_caches)
+
+    def test_cache_is_rebuilt_only_after_names_are_added(self):
+        self.inventory_manager.match_item_names("Aisle 1")
+        cache = self.inventory_manager._item_name_caches["Aisle 1"]
+        self.inventory_manager.modify_item_quantity("Aisle 1", "Tape", 9)
+        self.inventory_manager.match_item_names("Aisle 1")
+        self.assertIs(self.inventory_manager._item_name_caches["Aisle 1"], cache)
+
+        self.inventory_manager.transfer("Aisle 1", "Aisle 2", "Tape", 1)
+        self.assertEqual(self.inventory_manager.match_item_names("Aisle 1"), ["bolts", "Tape", "Tarp", "Twine"])
+        self.assertIs(self.inventory_manager._item_name_caches["Aisle 1"], cache)
+        self.assertEqual(self.inventory_manager.match_item_names("Aisle 2"), ["Tape"])
+
+        self.inventory_manager.add_section("Cold Room")
+        self.assertIn("Cold Room", self.inventory_manager.match_section_names("c"))
+
+
+class TestSortedPages(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        for section in ("Dry", "chiller"):
+            self.inventory_manager.add_section(section)
+        self.inventory_manager.add_item("Dry", "Rice", 20)
+        self.inventory_manager.add_item("Dry", "Beans", 5)
+        self.inventory_manager.add_item("chiller", "Milk", 5, "2025-01-03")
+        self.inventory_manager.add_item("chiller", "Butter", 9, "2025-02-01")
+
+    def test_sorted_by_each_column(self):
+        manager = self.inventory_manager
+        self.assertEqual(manager.sorted_rows("section", limit=2), [("chiller", "Butter"), ("chiller", "Milk")])
+        self.assertEqual(manager.sorted_rows("item", limit=2), [("Dry", "Beans"), ("chiller", "Butter")])
+        self.assertEqual(
+            manager.sorted_rows("quantity"),
+            [("Dry", "Beans"), ("chiller", "Milk"), ("chiller", "Butter"), ("Dry", "Rice")]
+        )
+        self.assertEqual(
+            manager.sorted_rows("expiry_date", descending=True),
+            [("Dry", "Rice"), ("Dry", "Beans"), ("chiller", "Butter"), ("chiller", "Milk")]
+        )
+        self.assertEqual(manager.sorted_rows("quantity", descending=True, offset=3, limit=5), [("Dry", "Beans")])
+        with self.assertRaises(ValueError):
+            manager.sorted_rows("colour")
+
+    def test_order_follows_changes(self):
+        manager = self.inventory_manager
+        manager.sorted_rows("quantity")
+        manager.modify_item_quantity("Dry", "Rice", 1)
+        manager.add_item("Dry", "Flour", 5)
+        manager.transfer("chiller", "Dry", "Butter", 4)
+        self.assertEqual(manager.row_count(), 6)
+        self.assertEqual(
+            manager.sorted_rows("quantity"),
+            [("Dry", "Rice"), ("Dry", "Butter"), ("Dry", "Beans"), ("Dry", "Flour"),
+             ("chiller", "Butter"), ("chiller", "Milk")]
+        )
+
+    def test_model_shows_one_page(self):
+        model = InventoryTableModel(self.inventory_manager)
+        model.page_size = 3
+        model.set_sort("quantity", descending=True)
+        self.assertEqual(model.keys, [("Dry", "Rice"), ("chiller", "Butter"), ("chiller", "Milk")])
+        self.assertEqual(model.page_count(), 2)
+        model.set_page(5)
+        self.assertEqual((model.page, model.keys), (1, [("Dry", "Beans")]))
+        model.take_changes()
+
+        self.inventory_manager.modify_item_quantity("Dry", "Rice", 2)
+        structure_changed, _ = model.take_changes()
+        self.assertTrue(structure_changed)
+        self.assertEqual(model.keys, [("Dry", "Rice")])
+
+        model.set_filter("i")
+        self.assertFalse(model.is_sorted())
+        self.assertEqual(model.page_count(), 1)
+        model.set_sort(None)
+        model.set_filter("")
+        self.assertEqual(len(model), 4)
+
+class TestInventoryView(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Cold Room")
+        self.inventory_manager.add_section("Dry Goods")
+        self.inventory_manager.add_item("Cold Room", "Milk", 4, "2025-03-01")
+        self.inventory_manager.add_item("Dry Goods", "Rice", 10)
+        self.inventory_manager.add_item("Dry Goods", "Beans", 3)
+
+    def test_rows_projection_and_section_filter(self):
+        view = self.inventory_manager.inventory_view()
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view)[0], ("Cold Room", "Milk", 4, datetime.date(2025, 3, 1)))
+        projected = self.inventory_manager.inventory_view(columns=("quantity", "item"), section="Dry Goods")
+        self.assertEqual(list(projected), [(10, "Rice"), (3, "Beans")])
+        self.assertEqual(list(self.inventory_manager.inventory_view(section="Nowhere")), [])
+        with self.assertRaises(ValueError):
+            self.inventory_manager.inventory_view(columns=("price",))
+
+    def test_named_rows_and_compatibility_wrapper(self):
+        row = next(iter(self.inventory_manager.inventory_view(columns=("item", "expiry_date"), named=True)))
+        self.assertEqual((row.item, row.expiry_date), ("Milk", datetime.date(2025, 3, 1)))
+        self.assertEqual(self.inventory_manager.get_inventory_data(section="Dry Goods")[1], {
+            "Section Name": "Dry Goods", "Item Name": "Beans", "Quantity": 3, "Expiry Date": "N/A",
+        })
+
+    def test_rows_are_captured_per_section(self):
+        rows = iter(self.inventory_manager.inventory_view(section="Dry Goods"))
+        next(rows)
+        self.inventory_manager.modify_item_quantity("Dry Goods", "Beans", 99)
+        self.inventory_manager.add_item("Dry Goods", "Oats", 1)
+        self.assertEqual(list(rows), [("Dry Goods", "Beans", 3, None)])
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_numpy_structured_array(self):
+        array = self.inventory_manager.inventory_view().to_numpy()
+        self.assertEqual(array.dtype.names, ("section", "item", "quantity", "expiry_date"))
+        self.assertEqual(int(array["quantity"].sum()), 17)
+        self.assertEqual(str(array["expiry_date"][0]), "2025-03-01")
+        self.assertTrue(numpy.isnat(array["expiry_date"][1]))
+        self.assertEqual(list(array[array["section"] == "Dry Goods"]["item"]), ["Rice", "Beans"])
+
+
+class TestShardedInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = ShardedInventoryManager(shards=2, placement={"Leeds": 0, "Hull": 1})
+        self.addCleanup(self.inventory_manager.close)
+        for section in ("Leeds", "Hull"):
+            self.inventory_manager.add_section(section)
+        self.inventory_manager.add_item("Leeds", "Milk", 5, "2025-03-01")
+        self.inventory_manager.add_item("Hull", "Rice", 3)
+
+    def test_calls_are_routed_and_queries_gathered(self):
+        self.assertEqual(self.inventory_manager.shard_for("Hull"), 1)
+        self.assertEqual(self.inventory_manager.shard_for("Dock"), shard_number("Dock", 2))
+        self.assertEqual(self.inventory_manager.increment("Hull", "Rice", 2), 5)
+        self.assertEqual(self.inventory_manager.get_item("Leeds", "Milk").quantity, 5)
+        self.assertEqual(self.inventory_manager.get_section_names(), ["Leeds", "Hull"])
+        self.assertEqual(self.inventory_manager.total_units(), 10)
+        self.assertEqual(
+            self.inventory_manager.expiring_before("2025-12-31"), [(datetime.date(2025, 3, 1), "Leeds", "Milk")]
+        )
+        with self.assertRaises(ValueError):
+            self.inventory_manager.modify_item_quantity("Hull", "Milk", 1)
+
+    def test_cross_shard_move_commits_on_both_shards(self):
+        self.inventory_manager.transfer("Leeds", "Hull", "Milk", 2)
+        self.assertEqual(self.inventory_manager.get_item("Leeds", "Milk").quantity, 3)
+        moved = self.inventory_manager.get_item("Hull", "Milk")
+        self.assertEqual((moved.quantity, moved.expiry_date), (2, datetime.date(2025, 3, 1)))
+        self.assertEqual(self.inventory_manager.item_total("Milk"), 5)
+
+    def test_failed_prepare_puts_held_stock_back(self):
+        with self.assertRaises(ValueError):
+            self.inventory_manager.transfer_many([("Leeds", "Hull", "Milk", 4), ("Hull", "Leeds", "Rice", 9)])
+        self.assertEqual(self.inventory_manager.get_item("Leeds", "Milk").quantity, 5)
+        self.assertIsNone(self.inventory_manager.get_item("Hull", "Milk"))
+        self.assertEqual(self.inventory_manager.total_units(), 8)
+
+    def test_placement_must_name_existing_shards(self):
+        with self.assertRaises(ValueError):
+            ShardedInventoryManager(shards=2, placement={"Leeds": 2})
+
+
+class FakeTkRoot:
+    """Just enough of a Tk root for BackgroundWorker: after() callbacks run when pump() is called."""
+    def __init__(self):
+        self.scheduled = []
+        self.reported = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+        return callback
+
+    def after_cancel(self, job):
+        self.scheduled.remove(job)
+
+    def report_callback_exception(self, exc_type, exc, tb):
+        self.reported.append(exc)
+
+    def pump(self):
+        due, self.scheduled = self.scheduled, []
+        for callback in due:
+            callback()
+
+
+class TestBackgroundWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.root = FakeTkRoot()
+        self.progress = []
+        self.worker = BackgroundWorker(self.root, on_progress=lambda *report: self.progress.append(report))
+        self.inventory_manager = InventoryManager(concurrent=True)
+        self.inventory_manager.add_section("Dock")
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def wait_and_pump(self, future):
+        future.exception(timeout=5)
+        deadline = time.monotonic() + 5
+        while self.worker.busy and time.monotonic() < deadline:
+            self.root.pump()
+            time.sleep(0.001)
+
+    def test_results_and_errors_arrive_on_the_ui_thread(self):
+        results, errors = [], []
+        ui_thread = threading.current_thread()
+
+        def on_done(result):
+            self.assertIs(threading.current_thread(), ui_thread)
+            results.append(result)
+
+        done = self.worker.submit(self.inventory_manager.increment, "Dock", "Crate", 4, on_done=on_done)
+        failed = self.worker.submit(
+            self.inventory_manager.increment, "Dock", "Pallet", -1, on_error=errors.append
+        )
+        self.assertTrue(self.worker.busy)
+        self.wait_and_pump(done)
+        self.wait_and_pump(failed)
+        self.assertEqual(results, [4])
+        self.assertIsInstance(errors[0], ValueError)
+        self.assertFalse(self.worker.busy)
+        self.assertEqual(self.progress[-1], (None, 0, None))
+
+    def test_unhandled_errors_are_reported(self):
+        self.wait_and_pump(self.worker.submit(self.inventory_manager.increment, "Nowhere", "Crate", 1))
+        self.assertIsInstance(self.root.reported[0], ValueError)
+
+    def test_bulk_import_reports_progress(self):
+        rows = [{"section": "Dock", "item": f"SKU{n}", "quantity": 1} for n in range(25)]
+        future = self.worker.submit(
+            self.inventory_manager.bulk_import, rows, chunk_size=10, description="Importing", with_progress=True
+        )
+        self.wait_and_pump(future)
+        self.assertIn(("Importing", 20, None), self.progress)
+        self.assertEqual(future.result().imported, 25)
+
+    def test_table_model_applies_worker_changes_on_take_changes(self):
+        model = InventoryTableModel(self.inventory_manager)
+        model.take_changes()
+        self.wait_and_pump(self.worker.submit(self.inventory_manager.add_item, "Dock", "Crate", 2))
+        structure_changed, _ = model.take_changes()
+        self.assertTrue(structure_changed)
+        self.assertEqual(model.keys, [("Dock", "Crate")])
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory_manager = InventoryManager()
+        self.inventory_manager.add_section("Dock")
+        self.metrics = Metrics()
+        self.metrics.instrument(self.inventory_manager, ["add_item", "modify_item_quantity"], "manager")
+
+    def test_disabled_metrics_leave_methods_untouched(self):
+        self.assertNotIn("add_item", vars(self.inventory_manager))
+        self.inventory_manager.add_item("Dock", "Crate", 1)
+        self.metrics.count("ignored")
+        self.assertEqual((self.metrics.summary(), self.metrics.counters), ([], {}))
+
+    def test_enabled_metrics_time_calls_and_count_errors(self):
+        self.metrics.enable()
+        for _ in range(10):
+            self.inventory_manager.add_item("Dock", "Crate", 1)
+        with self.assertRaises(ValueError):
+            self.inventory_manager.modify_item_quantity("Dock", "Missing", 1)
+        summary = {row[0]: row for row in self.metrics.summary()}
+        operation, calls, errors, p50, p95, p99 = summary["manager.add_item"]
+        self.assertEqual((calls, errors), (10, 0))
+        self.assertTrue(0 < p50 <= p95 <= p99)
+        self.assertEqual(summary["manager.modify_item_quantity"][1:3], (1, 1))
+
+        self.metrics.disable()
+        self.assertNotIn("add_item", vars(self.inventory_manager))
+        self.assertEqual(self.inventory_manager.get_item("Dock", "Crate").quantity, 10)
+
+    def test_histogram_percentiles_and_prometheus_export(self):
+        histogram = LatencyHistogram()
+        for seconds in [0.001] * 95 + [0.1] * 5:
+            histogram.observe(seconds)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.001, delta=0.0002)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.1, delta=0.02)
+
+        self.metrics.enable()
+        self.inventory_manager.add_item("Dock", "Crate", 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.metrics.write_prometheus(os.path.join(directory, "metrics.prom"))
+            with open(path) as f:
+                text = f.read()
+        self.assertIn('warehouse_operation_seconds_count{operation="manager.add_item"} 1', text)
+        self.assertIn('warehouse_operation_seconds_bucket{operation="manager.add_item",le="+Inf"} 1', text)
+
+    def test_profiler_writes_reports(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = Profiler(directory)
+            for kind, suffix in (("cpu", ".prof"), ("memory", ".txt")):
+                profiler.start(kind)
+                self.inventory_manager.add_item("Dock", "Crate", 1)
+                path = profiler.stop()
+                self.assertTrue(path.endswith(suffix) and os.path.getsize(path) > 0)
+            with self.assertRaises(ValueError):
+                profiler.start("disk")
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_synthetic_warehouse_is_reproducible_and_skewed(self):
+        rows = Benchmarks.synthetic_warehouse(2000)
+        self.assertEqual(rows, Benchmarks.synthetic_warehouse(2000))
+        counts = {}
+        for section, _, _, _ in rows:
+            counts[section] = counts.get(section, 0) + 1
+        self.assertGreater(counts["Section 0000"], counts["Section 0009"])
+
+    def test_startup_benchmark_reports_stages(self):
+        try:
+            results = Benchmarks.measure_startup(items=20, runs=1, budget=60)
+        except RuntimeError as e:
+            # Without a display the benchmark must refuse rather than time something else.
+            self.assertIn("no display", str(e))
+            self.skipTest("no display or Xvfb to start the window on")
+        self.assertLessEqual(results["warm"]["first_frame"], results["warm"]["rows_loaded"])
+        self.assertEqual(results["time_to_window_seconds"], results["warm"]["first_frame"])
+        self.assertFalse(results["over_budget"])
+
+    def test_overview_frame_timing_loads_rows_first(self):
+        # Stands in for Tk and the real frame, which need a display, with the frame's contract.
+        class StubRoot:
+            def withdraw(self): pass
+            def after(self, ms, callback): return "job"
+            def after_cancel(self, job): pass
+            def update_idletasks(self): pass
+            def destroy(self): self.destroyed = True
+
+        class StubFrame:
+            def __init__(self, parent, inventory_manager, worker):
+                self.model = InventoryTableModel(inventory_manager, load=False)
+                self.redrawn = []
+                frames.append(self)
+
+            def update_inventory(self):
+                if self.model.loaded:
+                    self.redrawn.append(len(self.model.take_changes()[1]))
+
+        frames = []
+        manager = Benchmarks.build_manager(Benchmarks.synthetic_warehouse(50))
+        edits = [(section, item) for section, item, _, _ in Benchmarks.synthetic_warehouse(50)[:3]]
+        app = types.SimpleNamespace(ctk=types.SimpleNamespace(CTk=StubRoot), InventoryOverviewFrame=StubFrame)
+        with mock.patch.dict("sys.modules", main=app):
+            seconds = Benchmarks.time_overview_frame(manager, edits)
+        self.assertGreater(seconds, 0)
+        [frame] = frames
+        self.assertEqual(len(frame.model), 50)
+        self.assertGreater(len(frame.redrawn), 1)
+        self.assertTrue(all(frame.redrawn[1:]))
+
+    def test_suite_results_compare_against_baseline(self):
+        results = Benchmarks.run_suite([10])
+        self.assertIn("add_item[n=10]", results["seconds_per_op"])
+        self.assertIn("overview_refresh[n=10]", results["seconds_per_op"])
+        self.assertEqual(Benchmarks.compare_to_baseline(results, results), [])
+
+        baseline = {"seconds_per_op": {name: seconds / 2 for name, seconds in results["seconds_per_op"].items()}}
+        slower = Benchmarks.compare_to_baseline(results, baseline, threshold=0.25)
+        self.assertEqual(len(slower), len(results["seconds_per_op"]))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+
+# Commands kept for undo; older ones drop off the end of the ring.
+DEFAULT_CAPACITY = 200
+# A change to the same rows within this many seconds of the last one joins its step.
+COALESCE_SECONDS = 3.0
+
+
+class Command:
+    """
+    One undoable step: how much each lot of every row it touched went up or
+    down, rather than the rows' states, so undoing it leaves changes made
+    since (by an import, the server or another window) in place.
+    """
+    __slots__ = ("description", "reason", "changes", "time")
+
+    def __init__(self, description, reason, changes, when):
+        self.description = description
+        self.reason = reason     # the movement reason of the change: "add", "remove", "adjust" or "move"
+        self.changes = changes   # (section, item) -> {expiry_date: change}
+        self.time = when
+
+
+def lot_changes(before, after):
+    """{expiry_date: change} between two InventoryManager.row_lots() results (None for no row)."""
+    before = before or {}
+    after = after or {}
+    changes = {}
+    for expiry_date in before.keys() | after.keys():
+        change = after.get(expiry_date, 0) - before.get(expiry_date, 0)
+        if change:
+            changes[expiry_date] = change
+    return changes
+
+
+class UndoStack:
+    """
+    InventoryManager changes that can be undone and redone.
+
+    Make changes through the UndoStack's methods, which mirror the manager's,
+    instead of calling the manager directly. Repeated changes to the same
+    rows in quick succession (within coalesce_seconds) are merged into one
+    step, and only the last capacity steps are kept. undo() and redo()
+    reverse or re-apply just the touched lots through
+    InventoryManager.change_lots(), so only those rows redraw; they raise
+    ValueError, keeping the step, when the stock to take back is gone.
+    """
+    def __init__(self, inventory_manager, capacity=DEFAULT_CAPACITY, coalesce_seconds=COALESCE_SECONDS):
+        self.inventory_manager = inventory_manager
+        self.coalesce_seconds = coalesce_seconds
+        self._undo = deque(maxlen=capacity)
+        self._redo = []
+        self._lock = threading.Lock()
+
+    # ---- CHANGES ----
+    def add_item(self, section_name, item_name, quantity, expiry_date=None):
+        self._run(f"add {quantity} {item_name}", "add", [(section_name, item_name)],
+                  self.inventory_manager.add_item, section_name, item_name, quantity, expiry_date)
+
+    def modify_item_quantity(self, section_name, item_name, new_quantity):
+        self._run(f"set {item_name} to {new_quantity}", "adjust", [(section_name, item_name)],
+                  self.inventory_manager.modify_item_quantity, section_name, item_name, new_quantity)
+
+    def increment(self, section_name, item_name, delta):
+        reason = "add" if delta > 0 else "remove"
+        return self._run(f"change {item_name} by {delta}", reason, [(section_name, item_name)],
+                         self.inventory_manager.increment, section_name, item_name, delta)
+
+    def transfer(self, source_section, target_section, item_name, quantity):
+        self.transfer_many([(source_section, target_section, item_name, quantity)])
+
+    def transfer_many(self, moves):
+        moves = list(moves)
+        keys = list(dict.fromkeys(key for source, target, item_name, _ in moves
+                                  for key in ((source, item_name), (target, item_name))))
+        description = f"move {moves[0][3]} {moves[0][2]}" if len(moves) == 1 else f"{len(moves)} moves"
+        self._run(description, "move", keys, self.inventory_manager.transfer_many, moves)
+
+    def _run(self, description, reason, keys, change, *args):
+        manager = self.inventory_manager
+        with self._lock:
+            before = {key: manager.row_lots(*key) for key in keys}
+            result = change(*args)
+            changes = {key: lot_changes(before[key], manager.row_lots(*key)) for key in keys}
+            now = time.monotonic()
+            top = self._undo[-1] if self._undo else None
+            if (top is not None and top.reason == reason and top.changes.keys() == changes.keys()
+                    and now - top.time <= self.coalesce_seconds):
+                for key, row_changes in changes.items():
+                    merged = top.changes[key]
+                    for expiry_date, amount in row_changes.items():
+                        merged[expiry_date] = merged.get(expiry_date, 0) + amount
+                top.description = description
+                top.time = now
+            else:
+                self._undo.append(Command(description, reason, changes, now))
+            self._redo.clear()
+        return result
+
+    # ---- UNDO / REDO ----
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        """Revert the last step; returns its description, or None if there is nothing to undo."""
+        with self._lock:
+            if not self._undo:
+                return None
+            command = self._undo[-1]
+            self._apply(command, -1, "undo")
+            self._undo.pop()
+            self._redo.append(command)
+            return command.description
+
+    def redo(self):
+        """Re-apply the last undone step; returns its description, or None if there is nothing to redo."""
+        with self._lock:
+            if not self._redo:
+                return None
+            command = self._redo[-1]
+            self._apply(command, 1, "redo")
+            self._redo.pop()
+            command.time = float("-inf")   # a redone step never absorbs the next change
+            self._undo.append(command)
+            return command.description
+
+    def _apply(self, command, sign, action):
+        # Logged as e.g. "undo:move", so the history can tell what kind of change was reversed.
+        self.inventory_manager.change_lots(
+            [(section_name, item_name, {expiry_date: sign * amount for expiry_date, amount in changes.items()})
+             for (section_name, item_name), changes in command.changes.items()],
+            f"{action}:{command.reason}",
+        )
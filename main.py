@@ -1,67 +1,72 @@
+import os
+import time
+
 import customtkinter as ctk
-from PIL import Image  # for loading the logo image
 
-# ---------------------------
-# INVENTORY MANAGER LOGIC
-# ---------------------------
-class InventoryManager:
-    def __init__(self):
-        self.sections = {}
-
-    def add_section(self, name):
-        """Add a new section if it doesn't already exist."""
-        if name not in self.sections:
-            self.sections[name] = {}
-
-    def add_item(self, section_name, item_name, quantity, expiry_date=None):
-        """Add or increase quantity of an item in the given section."""
-        if section_name not in self.sections:
-            raise ValueError(f"Section '{section_name}' not found.")
-        if item_name in self.sections[section_name]:
-            self.sections[section_name][item_name]["quantity"] += quantity
-        else:
-            self.sections[section_name][item_name] = {
-                "quantity": quantity,
-                "expiry_date": expiry_date,
-            }
-
-    def modify_item_quantity(self, section_name, item_name, new_quantity):
-        """Set an item's quantity in a section to a new value."""
-        if section_name not in self.sections:
-            raise ValueError(f"Section '{section_name}' not found.")
-        if item_name not in self.sections[section_name]:
-            raise ValueError(f"Item '{item_name}' not found in section '{section_name}'.")
-        self.sections[section_name][item_name]["quantity"] = new_quantity
-
-    def get_inventory_data(self):
-        """Return a list of dictionaries for displaying in the UI."""
-        data = []
-        for section, items in self.sections.items():
-            for item_name, details in items.items():
-                data.append({
-                    "Section Name": section,
-                    "Item Name": item_name,
-                    "Quantity": details["quantity"],
-                    "Expiry Date": details["expiry_date"] or "N/A",
-                })
-        return data
-
-    def get_section_names(self):
-        """For dropdowns: return all section names."""
-        return list(self.sections.keys())
-
-    def get_item_names_in_section(self, section_name):
-        """For dropdowns: return all item names in the given section."""
-        if section_name in self.sections:
-            return list(self.sections[section_name].keys())
-        return []
+import BulkIO
+from BackgroundWorker import BackgroundWorker
+from EventBus import SectionCreated
+from ImageCache import load_scaled_image
+from InventoryManagement import InventoryManager
+from Metrics import PROFILE_ENV, Metrics, Profiler
+from MovementHistory import SECONDS_PER_DAY, MovementHistory
+from OverviewModel import InventoryTableModel
+from SortIndex import SORT_COLUMNS
+from Storage import SQLiteStorage
+from UndoStack import UndoStack
+
+# Inventory is saved here between runs (override with WAREHOUSE_DB)
+DATABASE_PATH = os.environ.get("WAREHOUSE_DB", "warehouse.db")
+
+# Every stock movement is logged here (override with WAREHOUSE_HISTORY); days older
+# than HISTORY_DETAIL_DAYS are rolled into daily summaries at start-up
+HISTORY_DIR = os.environ.get("WAREHOUSE_HISTORY", "history")
+HISTORY_DETAIL_DAYS = 90
+
+# Reorder suggestions are forecast from the history at start-up and then once a day;
+# moves into these sections (comma-separated WAREHOUSE_OUTBOUND) count as consumption
+FORECAST_INTERVAL_MS = 24 * 60 * 60 * 1000
+OUTBOUND_SECTIONS = [name.strip() for name in os.environ.get("WAREHOUSE_OUTBOUND", "").split(",") if name.strip()]
+
+# Welcome screen logo, decoded on the worker and cached at this size (see ImageCache)
+LOGO_PATH = "Assets/light_logo.png"
+LOGO_SIZE = (500, 200)
+
+# Overview table sizing (pixels / rows)
+ROW_HEIGHT = 40
+HEADER_HEIGHT = 50
+DEFAULT_VISIBLE_ROWS = 15
+ROW_SLOTS_MAX = 60
+
+# Overview column headers, in SORT_COLUMNS order; clicking one sorts by it.
+# The suggested reorder quantity follows them and isn't sortable.
+HEADERS = ("Section Name", "Item Name", "Quantity", "Expiry Date")
+REORDER_HEADER = "Reorder"
+COLUMN_COUNT = len(HEADERS) + 1
+SORT_ARROWS = {False: " \u25b2", True: " \u25bc"}
+
+# Wait this long after the last keystroke before searching (milliseconds)
+SEARCH_DELAY_MS = 150
+ALL_SECTIONS = "All sections"
+
+# Section/item pickers list this many matching names at a time
+PICKER_PAGE_SIZE = 50
+MORE_MATCHES = "More matches..."
+
+# Timed when metrics are on (WAREHOUSE_METRICS=1, or the switch in the F9 diagnostics panel)
+MANAGER_OPERATIONS = (
+    "add_section", "add_item", "modify_item_quantity", "increment", "transfer", "transfer_many",
+    "bulk_import", "get_inventory_data", "search_items", "sorted_rows", "change_lots",
+)
+DIAGNOSTICS_REFRESH_MS = 1000
+METRICS_EXPORT_MS = 15000
 
 
 # ---------------------------
 # WELCOME SCREEN
 # ---------------------------
 class WelcomeScreen(ctk.CTkToplevel):
-    def __init__(self, parent):
+    def __init__(self, parent, worker):
         super().__init__(parent)
         self.geometry("600x400")
         self.title("Welcome")
@@ -75,12 +80,13 @@ class WelcomeScreen(ctk.CTkToplevel):
         welcome_frame = ctk.CTkFrame(self)
         welcome_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
 
-        img = Image.open("Assets/light_logo.png")
-        self.logo_image = ctk.CTkImage(light_image=img, size=(500, 200))  # Example: setting size to 200x200
-
-        # Label for the logo
-        logo_label = ctk.CTkLabel(welcome_frame, text="", image=self.logo_image)
-        logo_label.pack(pady=10)
+        # Label for the logo; the image is filled in once the worker has decoded it
+        self.logo_label = ctk.CTkLabel(welcome_frame, text="", width=LOGO_SIZE[0], height=LOGO_SIZE[1])
+        self.logo_label.pack(pady=10)
+        worker.submit(
+            load_scaled_image, LOGO_PATH, LOGO_SIZE,
+            on_done=self.show_logo, on_error=lambda e: None, description="Loading logo"
+        )
 
         # Welcome Text
         ctk.CTkLabel(
@@ -99,6 +105,11 @@ class WelcomeScreen(ctk.CTkToplevel):
             width=150
         ).pack(pady=20)
 
+    def show_logo(self, image):
+        if self.winfo_exists():
+            self.logo_image = ctk.CTkImage(light_image=image, size=LOGO_SIZE)
+            self.logo_label.configure(image=self.logo_image)
+
     def close_screen(self):
         self.destroy()
 
@@ -112,19 +123,38 @@ class WarehouseApp(ctk.CTk):
         self.title("Light Logistics Inventory Management")
         self.geometry("1000x700")
 
-        self.inventory_manager = InventoryManager()
+        # Changes run on a worker thread (see BackgroundWorker), so the
+        # manager has to lock sections against the Tk thread's reads.
+        self.inventory_manager = InventoryManager(
+            SQLiteStorage(DATABASE_PATH), concurrent=True,
+            history=MovementHistory(HISTORY_DIR, outbound_sections=OUTBOUND_SECTIONS),
+        )
+        self.worker = BackgroundWorker(self, on_progress=self.on_progress)
+        # Manage / Move changes go through here so Ctrl+Z / Ctrl+Y can take them back
+        self.undo_stack = UndoStack(self.inventory_manager)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Main layout
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+        # Status bar: progress of background jobs and the last import report
+        status_frame = ctk.CTkFrame(self, fg_color="transparent")
+        status_frame.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
+        status_frame.grid_columnconfigure(0, weight=1)
+        self.status_label = ctk.CTkLabel(status_frame, text="", anchor="w")
+        self.status_label.grid(row=0, column=0, sticky="ew")
+        self.progress_bar = ctk.CTkProgressBar(status_frame, width=200)
+        self.progress_bar.grid(row=0, column=1, padx=(10, 0))
+        self.progress_bar.grid_remove()
+
         # Overview Frame
-        self.inventory_overview_frame = InventoryOverviewFrame(self, self.inventory_manager)
+        self.inventory_overview_frame = InventoryOverviewFrame(self, self.inventory_manager, self.worker)
         self.inventory_overview_frame.grid(row=0, column=0, sticky="nsew")
 
         # Buttons at the bottom
         button_frame = ctk.CTkFrame(self.inventory_overview_frame)
-        button_frame.grid(row=2, column=0, pady=(10, 20), sticky="s")
+        button_frame.grid(row=3, column=0, pady=(10, 20), sticky="s")
 
         ctk.CTkButton(
             button_frame,
@@ -140,23 +170,186 @@ class WarehouseApp(ctk.CTk):
             width=150
         ).grid(row=0, column=1, padx=10)
 
+        ctk.CTkButton(
+            button_frame,
+            text="Import File",
+            command=self.open_import_dialog,
+            width=150
+        ).grid(row=0, column=2, padx=10)
+
+        self.undo_button = ctk.CTkButton(
+            button_frame, text="Undo", command=self.undo, width=70, state="disabled"
+        )
+        self.undo_button.grid(row=0, column=3, padx=(10, 5))
+        self.redo_button = ctk.CTkButton(
+            button_frame, text="Redo", command=self.redo, width=70, state="disabled"
+        )
+        self.redo_button.grid(row=0, column=4, padx=(5, 10))
+        self.bind("<Control-z>", lambda event: self.undo())
+        self.bind("<Control-y>", lambda event: self.redo())
+        self.bind("<Control-Z>", lambda event: self.redo())
+
+        # Diagnostics: F9 opens the panel, Ctrl+F9 / Shift+F9 start and stop CPU / memory profiling
+        self.metrics = Metrics.from_environment()
+        self.profiler = Profiler()
+        self.metrics.instrument(self.inventory_manager, MANAGER_OPERATIONS, "manager")
+        self.metrics.instrument(self.inventory_overview_frame, ["update_inventory", "apply_search"], "ui.overview")
+        self.metrics.instrument(ManageInventoryModal, ["submit_action", "on_saved"], "ui.manage_inventory")
+        self.metrics.instrument(MoveInventoryModal, ["move_inventory", "on_saved"], "ui.move_inventory")
+        self.diagnostics_panel = None
+        self.bind("<F9>", lambda event: self.open_diagnostics())
+        self.bind("<Control-F9>", lambda event: self.toggle_profile("cpu"))
+        self.bind("<Shift-F9>", lambda event: self.toggle_profile("memory"))
+        if os.environ.get(PROFILE_ENV):
+            try:
+                self.profiler.start(os.environ[PROFILE_ENV])
+            except ValueError as e:
+                self.status_label.configure(text=f"Error: {e}")
+        self.after(METRICS_EXPORT_MS, self.export_metrics)
+
+    def start(self):
+        """
+        Call once the main window has been drawn: shows the welcome screen
+        and loads the inventory in the background.
+        """
+        WelcomeScreen(self, self.worker)
+        self.inventory_overview_frame.load_inventory()
+        self.worker.submit(
+            self.inventory_manager.history.compact, time.time() - HISTORY_DETAIL_DAYS * SECONDS_PER_DAY,
+            description="Compacting movement history",
+        )
+        self.update_forecast()
+
+    def update_forecast(self):
+        """Forecast reorder quantities on the worker, then again every FORECAST_INTERVAL_MS."""
+        self.worker.submit(
+            self.inventory_manager.update_reorder_forecast,
+            on_done=lambda _: self.inventory_overview_frame.render_rows(),
+            on_error=lambda e: self.status_label.configure(text=f"Forecast failed: {e}"),
+            description="Forecasting reorders",
+        )
+        self.after(FORECAST_INTERVAL_MS, self.update_forecast)
+
+    def on_close(self):
+        self.worker.shutdown()
+        self.inventory_manager.close()
+        if self.profiler.running:
+            self.profiler.stop()
+        if self.metrics.enabled:
+            self.metrics.write_prometheus()
+        self.destroy()
+
+    def export_metrics(self):
+        """Rewrite the Prometheus text file every METRICS_EXPORT_MS while metrics are on."""
+        if self.metrics.enabled:
+            try:
+                self.metrics.write_prometheus()
+            except OSError as e:
+                self.status_label.configure(text=f"Metrics export failed: {e}")
+        self.after(METRICS_EXPORT_MS, self.export_metrics)
+
+    def toggle_profile(self, kind):
+        """Start a CPU or memory profile, or stop the running one and save its report."""
+        if self.profiler.running:
+            running = self.profiler.kind
+            self.status_label.configure(text=f"Profile saved to {self.profiler.stop()}")
+            if running == kind:
+                return
+        self.profiler.start(kind)
+        self.status_label.configure(text=f"Capturing {kind} profile (press again to stop)...")
+
+    def open_diagnostics(self):
+        if self.diagnostics_panel is not None and self.diagnostics_panel.winfo_exists():
+            self.diagnostics_panel.lift()
+            return
+        self.diagnostics_panel = DiagnosticsPanel(self, self.metrics)
+
+    def on_progress(self, description, done, total):
+        """Show what the worker is doing; hide the bar once it is idle."""
+        if description is None:
+            self.progress_bar.stop()
+            self.progress_bar.grid_remove()
+            if self.status_label.cget("text").endswith("..."):
+                self.status_label.configure(text="")
+            return
+        self.progress_bar.grid()
+        if total:
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+            self.progress_bar.set(done / total)
+        else:
+            self.progress_bar.configure(mode="indeterminate")
+            self.progress_bar.start()
+        self.status_label.configure(text=f"{description} ({done:,} rows)..." if done else f"{description}...")
+
     def open_manage_inventory_modal(self):
-        ManageInventoryModal(self, self.inventory_manager, self.inventory_overview_frame).grab_set()
+        ManageInventoryModal(
+            self, self.inventory_manager, self.undo_stack, self.worker
+        ).grab_set()
 
     def open_move_inventory_modal(self):
-        MoveInventoryModal(self, self.inventory_manager, self.inventory_overview_frame).grab_set()
+        MoveInventoryModal(
+            self, self.inventory_manager, self.undo_stack, self.worker
+        ).grab_set()
+
+    def undo(self):
+        self.worker.submit(self.undo_stack.undo, on_done=lambda done: self.on_undo_done("Undid", done),
+                           on_error=lambda e: self.on_undo_failed("undo", e), description="Undoing")
+
+    def redo(self):
+        self.worker.submit(self.undo_stack.redo, on_done=lambda done: self.on_undo_done("Redid", done),
+                           on_error=lambda e: self.on_undo_failed("redo", e), description="Redoing")
+
+    def on_undo_done(self, verb, description):
+        # The overview redraws the restored rows from their change events.
+        if description is not None:
+            self.status_label.configure(text=f"{verb} {description}")
+        self.update_undo_buttons()
+
+    def on_undo_failed(self, verb, error):
+        if not isinstance(error, ValueError):
+            raise error
+        self.status_label.configure(text=f"Can't {verb}: {error}")
+
+    def update_undo_buttons(self):
+        self.undo_button.configure(state="normal" if self.undo_stack.can_undo else "disabled")
+        self.redo_button.configure(state="normal" if self.undo_stack.can_redo else "disabled")
+
+    def open_import_dialog(self):
+        from tkinter import filedialog  # only needed here, so kept out of start-up
+
+        path = filedialog.askopenfilename(
+            title="Import inventory",
+            filetypes=[("Inventory feeds", "*.csv *.jsonl *.ndjson")]
+        )
+        if not path:
+            return
+        try:
+            rows = BulkIO.read_rows(path)
+        except ValueError as e:
+            self.status_label.configure(text=f"Error: {e}")
+            return
+        self.worker.submit(
+            self.inventory_manager.bulk_import,
+            rows,
+            on_done=lambda report: self.status_label.configure(text=str(report)),
+            on_error=lambda e: self.status_label.configure(text=f"Import failed: {e}"),
+            description=f"Importing {os.path.basename(path)}",
+            with_progress=True,
+        )
 
 
 # ---------------------------
 # INVENTORY OVERVIEW FRAME
 # ---------------------------
 class InventoryOverviewFrame(ctk.CTkFrame):
-    def __init__(self, parent, inventory_manager):
+    def __init__(self, parent, inventory_manager, worker):
         super().__init__(parent)
         self.inventory_manager = inventory_manager
+        self.worker = worker
 
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=1)
 
         # Title
         ctk.CTkLabel(
@@ -165,6 +358,35 @@ class InventoryOverviewFrame(ctk.CTkFrame):
             font=("Arial", 20, "bold")
         ).grid(row=0, column=0, pady=10)
 
+        # Search bar
+        search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        search_frame.grid(row=1, column=0, padx=20, sticky="ew")
+        search_frame.grid_columnconfigure(0, weight=1)
+        self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search items")
+        self.search_entry.grid(row=0, column=0, padx=(0, 10), sticky="ew")
+        self.search_entry.bind("<KeyRelease>", self.on_search_typed)
+        self.section_filter_var = ctk.StringVar(value=ALL_SECTIONS)
+        self.section_filter_menu = ctk.CTkOptionMenu(
+            search_frame,
+            variable=self.section_filter_var,
+            values=[ALL_SECTIONS, *inventory_manager.get_section_names()],
+            command=lambda _: self.apply_search(),
+        )
+        self.section_filter_menu.grid(row=0, column=1)
+        self._search_job = None
+
+        # Pager, used while the table is sorted by a column
+        self.previous_page_button = ctk.CTkButton(
+            search_frame, text="\u25c0", width=30, command=lambda: self.change_page(-1)
+        )
+        self.previous_page_button.grid(row=0, column=2, padx=(10, 0))
+        self.page_label = ctk.CTkLabel(search_frame, text="", width=110)
+        self.page_label.grid(row=0, column=3)
+        self.next_page_button = ctk.CTkButton(
+            search_frame, text="\u25b6", width=30, command=lambda: self.change_page(1)
+        )
+        self.next_page_button.grid(row=0, column=4)
+
         # Table Frame (dark background for contrast)
         self.table_frame = ctk.CTkFrame(
             self,
@@ -173,61 +395,299 @@ class InventoryOverviewFrame(ctk.CTkFrame):
             border_width=2,
             border_color="gray"
         )
-        self.table_frame.grid(row=1, column=0, padx=20, pady=20, sticky="nsew")
-        self.table_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        self.table_frame.grid(row=2, column=0, padx=20, pady=20, sticky="nsew")
+        self.table_frame.grid_columnconfigure(tuple(range(COLUMN_COUNT)), weight=1)
 
-        # Table Headers
-        headers = ["Section Name", "Item Name", "Quantity", "Expiry Date"]
-        for col, header in enumerate(headers):
-            ctk.CTkLabel(
+        # Table Headers (click to sort)
+        self.header_labels = []
+        for col, header in enumerate(HEADERS):
+            label = ctk.CTkLabel(
                 self.table_frame,
                 text=header,
                 font=("Arial", 14, "bold"),
-                text_color="white"
-            ).grid(row=0, column=col, padx=10, pady=5, sticky="ew")
+                text_color="white",
+                cursor="hand2",
+            )
+            label.grid(row=0, column=col, padx=10, pady=5, sticky="ew")
+            label.bind("<Button-1>", lambda event, column=SORT_COLUMNS[col]: self.on_header_clicked(column))
+            self.header_labels.append(label)
+        ctk.CTkLabel(
+            self.table_frame,
+            text=REORDER_HEADER,
+            font=("Arial", 14, "bold"),
+            text_color="white",
+        ).grid(row=0, column=len(HEADERS), padx=10, pady=5, sticky="ew")
 
         # Header divider
         ctk.CTkFrame(self.table_frame, fg_color="gray", height=2).grid(
-            row=1, column=0, columnspan=4, sticky="ew", padx=5, pady=(0, 5)
+            row=1, column=0, columnspan=COLUMN_COUNT, sticky="ew", padx=5, pady=(0, 5)
         )
 
-        # Data rows
-        self.rows = []
+        # Scrollbar for the virtualized rows
+        self.scrollbar = ctk.CTkScrollbar(self.table_frame, command=self.on_scrollbar)
+        self.scrollbar.grid(row=2, column=COLUMN_COUNT, rowspan=ROW_SLOTS_MAX * 2, sticky="ns", padx=(0, 5), pady=5)
+        self.table_frame.bind("<Configure>", self.on_table_resized)
+        self.table_frame.bind("<Enter>", self._bind_mousewheel)
+        self.table_frame.bind("<Leave>", self._unbind_mousewheel)
+
+        # Data rows: only enough row widgets to fill the viewport are created,
+        # and they are re-used as the user scrolls. Rows are read by
+        # load_inventory() once the window is on screen.
+        self.model = InventoryTableModel(inventory_manager, load=False)
+        self.row_slots = []
+        self.visible_slots = {}
+        self.first_row = 0
+        self.visible_count = DEFAULT_VISIBLE_ROWS
+        self._refresh_pending = False
+        inventory_manager.events.subscribe(self.on_inventory_changed, batched=True)
+
+    def load_inventory(self):
+        """Read the rows on the worker, keeping the window responsive; searches index what they need later."""
+        self.worker.submit(self.model.read_rows, on_done=self.on_rows_loaded, description="Loading inventory")
+
+    def on_rows_loaded(self, rows):
+        self.model.set_rows(rows)
         self.update_inventory()
+        if self.search_entry.get().strip() or self.section_filter_var.get() != ALL_SECTIONS:
+            self.apply_search()
+
+    def _create_slot(self, slot_idx):
+        labels = []
+        for col_idx in range(COLUMN_COUNT):
+            label = ctk.CTkLabel(
+                self.table_frame,
+                text="",
+                font=("Arial", 12),
+                text_color="white",
+                anchor="center",
+            )
+            label.grid(row=slot_idx * 2 + 2, column=col_idx, padx=10, pady=5, sticky="ew")
+            labels.append(label)
+
+        # Divider
+        divider = ctk.CTkFrame(self.table_frame, fg_color="gray", height=2)
+        divider.grid(row=slot_idx * 2 + 3, column=0, columnspan=COLUMN_COUNT, sticky="ew", padx=0, pady=(0, 0))
+
+        return {"labels": labels, "divider": divider, "values": None, "shown": True}
+
+    def _fill_slot(self, slot, values):
+        if slot["values"] == values:
+            return
+        for label, old, new in zip(slot["labels"], slot["values"] or (None,) * COLUMN_COUNT, values):
+            if old != new:
+                label.configure(text=new)
+        slot["values"] = values
+        if not slot["shown"]:
+            for widget in slot["labels"] + [slot["divider"]]:
+                widget.grid()
+            slot["shown"] = True
+
+    def _hide_slot(self, slot):
+        if slot["shown"]:
+            for widget in slot["labels"] + [slot["divider"]]:
+                widget.grid_remove()
+            slot["shown"] = False
+            slot["values"] = None
+
+    def render_rows(self):
+        """Fill the recycled row widgets with the rows currently in view."""
+        total = len(self.model)
+        self.first_row = max(0, min(self.first_row, total - self.visible_count))
+        while len(self.row_slots) < self.visible_count:
+            self.row_slots.append(self._create_slot(len(self.row_slots)))
+
+        rows = self.model.visible_rows(self.first_row, self.visible_count)
+        self.visible_slots = {}
+        for slot_idx, slot in enumerate(self.row_slots):
+            if slot_idx < len(rows):
+                key, values = rows[slot_idx]
+                self._fill_slot(slot, values)
+                self.visible_slots[key] = slot_idx
+            else:
+                self._hide_slot(slot)
+
+        if total:
+            self.scrollbar.set(self.first_row / total, (self.first_row + len(rows)) / total)
+        else:
+            self.scrollbar.set(0, 1)
 
     def update_inventory(self):
-        # Clear old row widgets
-        for row in self.rows:
-            for widget in row:
-                widget.destroy()
-        self.rows.clear()
-
-        # Load current data
-        inventory_data = self.inventory_manager.get_inventory_data()
-        for row_idx, item in enumerate(inventory_data, start=1):
-            row_widgets = []
-            values = [
-                item["Section Name"],
-                item["Item Name"],
-                item["Quantity"],
-                item["Expiry Date"] or "N/A",
-            ]
-            for col_idx, val in enumerate(values):
-                label = ctk.CTkLabel(
-                    self.table_frame,
-                    text=val,
-                    font=("Arial", 12),
-                    text_color="white",
-                    anchor="center",
-                )
-                label.grid(row=row_idx * 2, column=col_idx, padx=10, pady=5, sticky="ew")
-                row_widgets.append(label)
-
-            # Divider
-            divider = ctk.CTkFrame(self.table_frame, fg_color="gray", height=2)
-            divider.grid(row=row_idx * 2 + 1, column=0, columnspan=4, sticky="ew", padx=0, pady=(0, 0))
-
-            self.rows.append(row_widgets)
+        """Redraw only the rows that changed since the last refresh."""
+        self._refresh_pending = False
+        if not self.model.loaded:
+            return   # changes stay queued until on_rows_loaded()
+        structure_changed, dirty_keys = self.model.take_changes()
+        if structure_changed:
+            self.render_rows()
+            self.update_pager()
+            return
+        # The reorder column follows the item's total, so its rows in other sections change too.
+        changed_items = {item_name for _, item_name in dirty_keys}
+        for key, slot_idx in self.visible_slots.items():
+            if key[1] in changed_items:
+                self._fill_slot(self.row_slots[slot_idx], self.model.row_values(key))
+
+    def update_section_filter(self):
+        self.section_filter_menu.configure(values=[ALL_SECTIONS, *self.inventory_manager.get_section_names()])
+
+    def on_inventory_changed(self, events):
+        """
+        Coalesce bursts of manager events into one refresh on the Tk thread.
+        Called on whichever thread made the change.
+        """
+        if any(type(event) is SectionCreated for event in events):
+            self.worker.call_in_ui(self.update_section_filter)
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.worker.call_in_ui(self.update_inventory)
+
+    def on_search_typed(self, event):
+        """Search once typing pauses instead of on every keystroke."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self.apply_search)
+
+    def apply_search(self):
+        self._search_job = None
+        if not self.model.loaded:
+            return   # on_rows_loaded() searches once the rows are in
+        section = self.section_filter_var.get()
+        section = None if section == ALL_SECTIONS else section
+        text = self.search_entry.get()
+        if (text.strip() or section is not None) and not self.inventory_manager.is_search_indexed(section):
+            # The first search over a section reads its rows, so index them on the worker.
+            self.worker.submit(
+                self.inventory_manager.search_items, section=section, limit=0,
+                on_done=lambda _: self.apply_search(), description="Indexing inventory",
+            )
+            return
+        self.model.set_filter(text, section)
+        self.first_row = 0
+        self.update_inventory()
+
+    def on_header_clicked(self, column):
+        """Sort by column ascending, then descending, then go back to the unsorted order."""
+        if not self.model.loaded:
+            return
+        if self.model.sort_column != column:
+            sort = (column, False)
+        elif not self.model.descending:
+            sort = (column, True)
+        else:
+            self.apply_sort(None, False)
+            return
+        # The first sort by a column builds its index from every row, so run it on the worker.
+        self.worker.submit(
+            self.inventory_manager.sorted_rows, column, limit=0,
+            on_done=lambda _: self.apply_sort(*sort), description="Sorting inventory",
+        )
+
+    def apply_sort(self, column, descending):
+        self.model.set_sort(column, descending)
+        for label, header, header_column in zip(self.header_labels, HEADERS, SORT_COLUMNS):
+            arrow = SORT_ARROWS[descending] if header_column == column else ""
+            label.configure(text=header + arrow)
+        self.first_row = 0
+        self.update_inventory()
+
+    def change_page(self, step):
+        self.model.set_page(self.model.page + step)
+        self.first_row = 0
+        self.update_inventory()
+
+    def update_pager(self):
+        pages = self.model.page_count()
+        self.page_label.configure(text=f"Page {self.model.page + 1} of {pages}" if self.model.is_sorted() else "")
+        self.previous_page_button.configure(state="normal" if self.model.page > 0 else "disabled")
+        self.next_page_button.configure(state="normal" if self.model.page < pages - 1 else "disabled")
+
+    def scroll_to(self, first_row):
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.render_rows()
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.model)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_count
+            self.scroll_to(self.first_row + step)
+
+    def on_mousewheel(self, event):
+        if event.num == 5 or event.delta < 0:
+            self.scroll_to(self.first_row + 3)
+        else:
+            self.scroll_to(self.first_row - 3)
+
+    def _bind_mousewheel(self, event):
+        self.table_frame.bind_all("<MouseWheel>", self.on_mousewheel)
+        self.table_frame.bind_all("<Button-4>", self.on_mousewheel)
+        self.table_frame.bind_all("<Button-5>", self.on_mousewheel)
+
+    def _unbind_mousewheel(self, event):
+        self.table_frame.unbind_all("<MouseWheel>")
+        self.table_frame.unbind_all("<Button-4>")
+        self.table_frame.unbind_all("<Button-5>")
+
+    def on_table_resized(self, event):
+        rows_that_fit = (event.height - HEADER_HEIGHT) // ROW_HEIGHT
+        rows_that_fit = max(1, min(rows_that_fit, ROW_SLOTS_MAX))
+        if rows_that_fit != self.visible_count:
+            self.visible_count = rows_that_fit
+            self.render_rows()
+
+
+# ---------------------------
+# TYPE-AHEAD PICKER
+# ---------------------------
+class TypeAheadCombobox(ctk.CTkComboBox):
+    """
+    Combobox for picking one of thousands of names. The list only holds names
+    starting with what has been typed, fetched PICKER_PAGE_SIZE at a time from
+    lookup(prefix, offset, limit); choosing "More matches..." loads the next page.
+
+    command(text) is called whenever the text changes, by picking or typing.
+    """
+    def __init__(self, parent, lookup, variable, command=None, **kwargs):
+        super().__init__(parent, variable=variable, values=[], command=self.on_pick, **kwargs)
+        self.lookup = lookup
+        self.on_change = command
+        self.prefix = ""
+        self.matches = []
+        self.bind("<KeyRelease>", self.on_typed)
+        self.load_matches("")
+
+    def load_matches(self, prefix):
+        """Show the first page of names starting with prefix."""
+        self.prefix = prefix
+        self.matches = []
+        self.load_next_page()
+
+    def load_next_page(self):
+        page = self.lookup(self.prefix, len(self.matches), PICKER_PAGE_SIZE + 1)
+        self.matches += page[:PICKER_PAGE_SIZE]
+        more = len(page) > PICKER_PAGE_SIZE
+        self.configure(values=self.matches + [MORE_MATCHES] if more else self.matches)
+
+    def first_match(self):
+        return self.matches[0] if self.matches else ""
+
+    def on_typed(self, event):
+        text = self.get()
+        if text != self.prefix:
+            self.load_matches(text)
+            if self.on_change is not None:
+                self.on_change(text)
+
+    def on_pick(self, value):
+        if value == MORE_MATCHES:
+            self.set(self.prefix)
+            self.load_next_page()
+            return
+        if self.on_change is not None:
+            self.on_change(value)
 
 
 # ---------------------------
@@ -237,13 +697,15 @@ class ManageInventoryModal(ctk.CTkToplevel):
     """
     A single modal to add or update inventory.
     """
-    def __init__(self, parent, inventory_manager, overview_frame):
+    def __init__(self, parent, inventory_manager, undo_stack, worker):
         super().__init__(parent)
         self.title("Manage Inventory")
         self.geometry("450x450")
 
+        self.parent = parent
         self.inventory_manager = inventory_manager
-        self.overview_frame = overview_frame
+        self.undo_stack = undo_stack
+        self.worker = worker
 
         self.grid_columnconfigure(0, weight=1)
 
@@ -261,14 +723,11 @@ class ManageInventoryModal(ctk.CTkToplevel):
             row=2, column=0, padx=20, pady=(10, 0), sticky="w"
         )
         self.section_var = ctk.StringVar()
-        sections = self.inventory_manager.get_section_names()
-        if sections:
-            self.section_var.set(sections[0])
-
-        self.section_optionmenu = ctk.CTkOptionMenu(
-            self, variable=self.section_var, values=sections, command=self.on_section_changed
+        self.section_picker = TypeAheadCombobox(
+            self, self.inventory_manager.match_section_names, self.section_var, command=self.on_section_changed
         )
-        self.section_optionmenu.grid(row=3, column=0, padx=20, pady=5, sticky="ew")
+        self.section_picker.grid(row=3, column=0, padx=20, pady=5, sticky="ew")
+        self.section_var.set(self.section_picker.first_match())
 
         self.new_section_entry = ctk.CTkEntry(self, placeholder_text="Or type new section name", width=300)
         self.new_section_entry.grid(row=4, column=0, padx=20, pady=5)
@@ -278,8 +737,14 @@ class ManageInventoryModal(ctk.CTkToplevel):
             row=5, column=0, padx=20, pady=(10, 0), sticky="w"
         )
         self.item_var = ctk.StringVar()
-        self.item_optionmenu = ctk.CTkOptionMenu(self, variable=self.item_var, values=[])
-        self.item_optionmenu.grid(row=6, column=0, padx=20, pady=5, sticky="ew")
+        self.item_picker = TypeAheadCombobox(
+            self,
+            lambda prefix, offset, limit: self.inventory_manager.match_item_names(
+                self.section_var.get().strip(), prefix, offset, limit
+            ),
+            self.item_var,
+        )
+        self.item_picker.grid(row=6, column=0, padx=20, pady=5, sticky="ew")
 
         self.new_item_entry = ctk.CTkEntry(self, placeholder_text="Or type new item name", width=300)
         self.new_item_entry.grid(row=7, column=0, padx=20, pady=5)
@@ -289,30 +754,23 @@ class ManageInventoryModal(ctk.CTkToplevel):
         self.quantity_entry.grid(row=8, column=0, padx=20, pady=10)
 
         # Expiry (optional)
-        self.expiry_entry = ctk.CTkEntry(self, placeholder_text="Expiry Date (optional)", width=300)
+        self.expiry_entry = ctk.CTkEntry(self, placeholder_text="Expiry Date, YYYY-MM-DD (optional)", width=300)
         self.expiry_entry.grid(row=9, column=0, padx=20, pady=10)
 
         # Buttons
         button_frame = ctk.CTkFrame(self)
         button_frame.grid(row=10, column=0, pady=(20, 10))
-        ctk.CTkButton(button_frame, text="Submit", command=self.submit_action, width=100).grid(row=0, column=0, padx=10)
+        self.submit_button = ctk.CTkButton(button_frame, text="Submit", command=self.submit_action, width=100)
+        self.submit_button.grid(row=0, column=0, padx=10)
         ctk.CTkButton(button_frame, text="Cancel", command=self.destroy, width=100).grid(row=0, column=1, padx=10)
 
         # Initialize item dropdown for the first section
-        self.on_section_changed(self.section_var.get() if sections else "")
+        self.on_section_changed(self.section_var.get())
 
     def on_section_changed(self, selected_section):
-        """Update item dropdown whenever user picks a different existing section."""
-        if not selected_section:
-            self.item_optionmenu.configure(values=[])
-            self.item_var.set("")
-            return
-        items = self.inventory_manager.get_item_names_in_section(selected_section)
-        self.item_optionmenu.configure(values=items)
-        if items:
-            self.item_var.set(items[0])
-        else:
-            self.item_var.set("")
+        """Update item dropdown whenever the section changes."""
+        self.item_picker.load_matches("")
+        self.item_var.set(self.item_picker.first_match())
 
     def submit_action(self):
         """Validate user input and apply changes."""
@@ -342,36 +800,41 @@ class ManageInventoryModal(ctk.CTkToplevel):
 
         expiry = self.expiry_entry.get().strip() or None
 
-        try:
-            self.inventory_manager.add_section(section_name)
-            existing_items = self.inventory_manager.get_item_names_in_section(section_name)
-            if item_name in existing_items:
-                # Add to existing quantity
-                curr_qty = self.inventory_manager.sections[section_name][item_name]["quantity"]
-                new_total = curr_qty + quantity
-                self.inventory_manager.modify_item_quantity(section_name, item_name, new_total)
-            else:
-                # Create new item
-                self.inventory_manager.add_item(section_name, item_name, quantity, expiry)
+        def add_stock():
+            with self.inventory_manager.batch():
+                self.inventory_manager.add_section(section_name)
+                # Adds to the existing quantity, or creates the item, in one locked step
+                self.undo_stack.add_item(section_name, item_name, quantity, expiry)
 
-            self.overview_frame.update_inventory()
+        self.submit_button.configure(state="disabled")
+        self.worker.submit(add_stock, on_done=self.on_saved, on_error=self.on_failed, description="Saving")
+
+    def on_saved(self, result):
+        self.parent.update_undo_buttons()
+        if self.winfo_exists():
             self.destroy()
 
-        except ValueError as e:
-            self.feedback_label.configure(text=f"Error: {e}")
+    def on_failed(self, error):
+        if not isinstance(error, ValueError):
+            raise error
+        if self.winfo_exists():
+            self.submit_button.configure(state="normal")
+            self.feedback_label.configure(text=f"Error: {error}")
 
 
 # ---------------------------
 # MOVE INVENTORY MODAL
 # ---------------------------
 class MoveInventoryModal(ctk.CTkToplevel):
-    def __init__(self, parent, inventory_manager, overview_frame):
+    def __init__(self, parent, inventory_manager, undo_stack, worker):
         super().__init__(parent)
         self.title("Move Inventory")
         self.geometry("400x400")
 
+        self.parent = parent
         self.inventory_manager = inventory_manager
-        self.overview_frame = overview_frame
+        self.undo_stack = undo_stack
+        self.worker = worker
 
         self.grid_columnconfigure(0, weight=1)
 
@@ -386,34 +849,39 @@ class MoveInventoryModal(ctk.CTkToplevel):
             row=2, column=0, padx=20, pady=(10, 0), sticky="w"
         )
         self.source_section_var = ctk.StringVar()
-        section_list = self.inventory_manager.get_section_names()
-        if section_list:
-            self.source_section_var.set(section_list[0])
-        self.source_section_menu = ctk.CTkOptionMenu(
+        self.source_section_picker = TypeAheadCombobox(
             self,
-            variable=self.source_section_var,
-            values=section_list,
+            self.inventory_manager.match_section_names,
+            self.source_section_var,
             command=self.on_source_section_changed
         )
-        self.source_section_menu.grid(row=3, column=0, padx=20, pady=5, sticky="ew")
+        self.source_section_picker.grid(row=3, column=0, padx=20, pady=5, sticky="ew")
+        self.source_section_var.set(self.source_section_picker.first_match())
 
         # Source Item
         ctk.CTkLabel(self, text="Item to Move:", font=("Arial", 12)).grid(
             row=4, column=0, padx=20, pady=(10, 0), sticky="w"
         )
         self.source_item_var = ctk.StringVar()
-        self.source_item_menu = ctk.CTkOptionMenu(self, variable=self.source_item_var, values=[])
-        self.source_item_menu.grid(row=5, column=0, padx=20, pady=5, sticky="ew")
+        self.source_item_picker = TypeAheadCombobox(
+            self,
+            lambda prefix, offset, limit: self.inventory_manager.match_item_names(
+                self.source_section_var.get().strip(), prefix, offset, limit
+            ),
+            self.source_item_var,
+        )
+        self.source_item_picker.grid(row=5, column=0, padx=20, pady=5, sticky="ew")
 
         # Target Section
         ctk.CTkLabel(self, text="Target Section:", font=("Arial", 12)).grid(
             row=6, column=0, padx=20, pady=(10, 0), sticky="w"
         )
         self.target_section_var = ctk.StringVar()
-        self.target_section_menu = ctk.CTkOptionMenu(self, variable=self.target_section_var, values=section_list)
-        if section_list:
-            self.target_section_var.set(section_list[0])
-        self.target_section_menu.grid(row=7, column=0, padx=20, pady=5, sticky="ew")
+        self.target_section_picker = TypeAheadCombobox(
+            self, self.inventory_manager.match_section_names, self.target_section_var
+        )
+        self.target_section_picker.grid(row=7, column=0, padx=20, pady=5, sticky="ew")
+        self.target_section_var.set(self.target_section_picker.first_match())
 
         # Quantity
         self.quantity_entry = ctk.CTkEntry(self, placeholder_text="Quantity to Move", width=300)
@@ -423,22 +891,15 @@ class MoveInventoryModal(ctk.CTkToplevel):
         button_frame = ctk.CTkFrame(self)
         button_frame.grid(row=9, column=0, pady=(20, 10))
 
-        ctk.CTkButton(button_frame, text="Move", command=self.move_inventory, width=100).grid(row=0, column=0, padx=10)
+        self.submit_button = ctk.CTkButton(button_frame, text="Move", command=self.move_inventory, width=100)
+        self.submit_button.grid(row=0, column=0, padx=10)
         ctk.CTkButton(button_frame, text="Cancel", command=self.destroy, width=100).grid(row=0, column=1, padx=10)
 
-        self.on_source_section_changed(self.source_section_var.get() if section_list else "")
+        self.on_source_section_changed(self.source_section_var.get())
 
     def on_source_section_changed(self, selected_section):
-        if not selected_section:
-            self.source_item_menu.configure(values=[])
-            self.source_item_var.set("")
-            return
-        items = self.inventory_manager.get_item_names_in_section(selected_section)
-        self.source_item_menu.configure(values=items)
-        if items:
-            self.source_item_var.set(items[0])
-        else:
-            self.source_item_var.set("")
+        self.source_item_picker.load_matches("")
+        self.source_item_var.set(self.source_item_picker.first_match())
 
     def move_inventory(self):
         self.feedback_label.configure(text="")
@@ -463,28 +924,98 @@ class MoveInventoryModal(ctk.CTkToplevel):
             self.feedback_label.configure(text="Error: Quantity must be greater than zero.")
             return
 
-        try:
-            self.inventory_manager.add_section(target_section)
-
-            current_qty = self.inventory_manager.sections[source_section][item_name]["quantity"]
-            new_source_qty = current_qty - quantity
-            if new_source_qty < 0:
-                raise ValueError("Not enough stock to move.")
-            self.inventory_manager.modify_item_quantity(source_section, item_name, new_source_qty)
-
-            if item_name in self.inventory_manager.sections[target_section]:
-                target_qty = self.inventory_manager.sections[target_section][item_name]["quantity"]
-                new_target_qty = target_qty + quantity
-                self.inventory_manager.modify_item_quantity(target_section, item_name, new_target_qty)
-            else:
-                expiry = self.inventory_manager.sections[source_section][item_name]["expiry_date"]
-                self.inventory_manager.add_item(target_section, item_name, quantity, expiry)
+        self.submit_button.configure(state="disabled")
+        self.worker.submit(
+            self.undo_stack.transfer, source_section, target_section, item_name, quantity,
+            on_done=self.on_saved, on_error=self.on_failed, description="Moving stock"
+        )
 
-            self.overview_frame.update_inventory()
+    def on_saved(self, result):
+        self.parent.update_undo_buttons()
+        if self.winfo_exists():
             self.destroy()
 
-        except ValueError as e:
-            self.feedback_label.configure(text=f"Error: {e}")
+    def on_failed(self, error):
+        if not isinstance(error, ValueError):
+            raise error
+        if self.winfo_exists():
+            self.submit_button.configure(state="normal")
+            self.feedback_label.configure(text=f"Error: {error}")
+
+
+# ---------------------------
+# DIAGNOSTICS PANEL
+# ---------------------------
+class DiagnosticsPanel(ctk.CTkToplevel):
+    """Live per-operation timings, with switches for metrics and profiling."""
+    def __init__(self, parent, metrics):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.geometry("640x420")
+        self.app = parent
+        self.metrics = metrics
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.metrics_switch = ctk.CTkSwitch(self, text="Collect metrics", command=self.on_metrics_switched)
+        self.metrics_switch.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
+        if metrics.enabled:
+            self.metrics_switch.select()
+
+        self.table = ctk.CTkTextbox(self, font=("Courier", 12), wrap="none")
+        self.table.grid(row=1, column=0, padx=20, pady=5, sticky="nsew")
+
+        button_frame = ctk.CTkFrame(self)
+        button_frame.grid(row=2, column=0, pady=10)
+        ctk.CTkButton(
+            button_frame, text="CPU Profile", command=lambda: self.app.toggle_profile("cpu"), width=140
+        ).grid(row=0, column=0, padx=5)
+        ctk.CTkButton(
+            button_frame, text="Memory Profile", command=lambda: self.app.toggle_profile("memory"), width=140
+        ).grid(row=0, column=1, padx=5)
+        ctk.CTkButton(button_frame, text="Export Metrics", command=self.export, width=140).grid(row=0, column=2, padx=5)
+
+        self.status_label = ctk.CTkLabel(self, text="", anchor="w")
+        self.status_label.grid(row=3, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.refresh()
+
+    def on_metrics_switched(self):
+        if self.metrics_switch.get():
+            self.metrics.enable()
+        else:
+            self.metrics.disable()
+        self.refresh()
+
+    def export(self):
+        try:
+            self.status_label.configure(text=f"Metrics written to {self.metrics.write_prometheus()}")
+        except OSError as e:
+            self.status_label.configure(text=f"Error: {e}")
+
+    def refresh(self):
+        """Redraw the timing table, then again every DIAGNOSTICS_REFRESH_MS while the panel is open."""
+        def ms(seconds):
+            return "-" if seconds is None else f"{seconds * 1000:.2f}"
+
+        lines = [f"{'Operation':<36}{'Calls':>8}{'Errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+        for operation, calls, errors, p50, p95, p99 in self.metrics.summary():
+            lines.append(f"{operation:<36}{calls:>8}{errors:>8}{ms(p50):>9}{ms(p95):>9}{ms(p99):>9}")
+        if not self.metrics.enabled:
+            lines.append("")
+            lines.append("Metrics are off: switch them on above, or start with WAREHOUSE_METRICS=1.")
+        if self.app.profiler.running:
+            lines.append("")
+            lines.append(f"A {self.app.profiler.kind} profile is being captured.")
+        self.table.configure(state="normal")
+        self.table.delete("1.0", "end")
+        self.table.insert("1.0", "\n".join(lines))
+        self.table.configure(state="disabled")
+        self._refresh_job = self.after(DIAGNOSTICS_REFRESH_MS, self.refresh)
+
+    def destroy(self):
+        self.after_cancel(self._refresh_job)
+        super().destroy()
 
 
 # ---------------------------
@@ -496,12 +1027,6 @@ if __name__ == "__main__":
     ctk.set_default_color_theme("blue")
 
     app = WarehouseApp()
-    app.withdraw()
-
-    # Show the welcome screen as a Toplevel
-    welcome_screen = WelcomeScreen(app)
-    welcome_screen.wait_window()  # Wait until closed
-
-    # Reveal the main app
-    app.deiconify()
+    app.update()  # draw the main window before anything slow happens
+    app.start()
     app.mainloop()